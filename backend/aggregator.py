@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Fleet aggregator
+Subscribes to many headless backends (nbfc_control_api.py --listen) over one persistent
+connection each, keeps the latest state of every host and republishes merged and
+per-host views through the same telemetry/command protocol
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import Dict, List, Optional
+
+from server import TelemetryServer, open_connection
+from telemetry import ENCODINGS, TelemetryDecoder
+
+# Commands queued per host while its connection is busy; the oldest are dropped beyond this
+COMMAND_QUEUE_SIZE = 32
+
+
+class HostLink:
+    """
+    One backend: a persistent connection carrying both the subscription and the commands.
+    Forwarded commands are fire-and-forget: replies (history, stats) are not relayed
+    """
+
+    def __init__(self, name: str, address: str, connect_timeout: float = 5.0,
+                 max_backoff: float = 30.0):
+        self.name = name
+        self.address = address
+        self.connect_timeout = connect_timeout
+        self.max_backoff = max_backoff
+        self.decoder = TelemetryDecoder()
+        self.state: Optional[Dict] = None
+        self.last_update = 0.0
+        self.connected = False
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.commands: asyncio.Queue = asyncio.Queue(maxsize=COMMAND_QUEUE_SIZE)
+        self.frames = 0
+        self.bytes_received = 0
+        self.reconnects = 0
+        self.dropped_commands = 0
+
+    def send(self, command: str) -> None:
+        """Queue a command line for the backend (dropping the oldest if the queue is full)"""
+        if self.commands.full():
+            self.commands.get_nowait()
+            self.dropped_commands += 1
+        self.commands.put_nowait(command.rstrip('\n') + '\n')
+
+    async def run(self) -> None:
+        """Connect, read frames and reconnect with exponential backoff, until cancelled"""
+        backoff = 0.5
+        while True:
+            try:
+                reader, writer = await asyncio.wait_for(open_connection(self.address), self.connect_timeout)
+            except (OSError, asyncio.TimeoutError):
+                self.connected = False
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+
+            backoff = 0.5
+            self.connected = True
+            self.writer = writer
+            # Nouveau flux: le serveur commence par une trame complète
+            self.decoder = TelemetryDecoder()
+            sender = asyncio.create_task(self._send_commands(writer))
+            try:
+                await self._read_frames(reader)
+            except (OSError, asyncio.IncompleteReadError):
+                pass
+            finally:
+                sender.cancel()
+                self.connected = False
+                self.writer = None
+                writer.close()
+                self.reconnects += 1
+            await asyncio.sleep(backoff)
+
+    async def _read_frames(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                return
+            self.bytes_received += len(chunk)
+            for state in self.decoder.feed(chunk):
+                self.state = state
+                self.last_update = time.monotonic()
+                self.frames += 1
+            if self.decoder.needs_keyframe:
+                # Delta perdu: redemander une trame complète sur la même connexion
+                self.decoder.needs_keyframe = False
+                self.send('resync')
+
+    async def _send_commands(self, writer: asyncio.StreamWriter) -> None:
+        while True:
+            command = await self.commands.get()
+            writer.write(command.encode())
+            # Contre-pression: attendre que le noyau ait absorbé les commandes déjà écrites
+            await writer.drain()
+
+
+class Aggregator:
+    """Latest state of every host, with merged and per-host views"""
+
+    def __init__(self, hosts: Dict[str, str], stale_after: float = 5.0):
+        self.links = {name: HostLink(name, address) for name, address in hosts.items()}
+        self.stale_after = stale_after
+        self.tasks: List[asyncio.Task] = []
+
+    def online(self, link: HostLink, now: float) -> bool:
+        return link.connected and link.state is not None and now - link.last_update <= self.stale_after
+
+    def host_view(self, name: str) -> Optional[Dict]:
+        """Full telemetry state of one host"""
+        link = self.links.get(name)
+        return link.state if link is not None else None
+
+    def merged_view(self) -> Dict:
+        """Fleet summary plus a compact line per host"""
+        now = time.monotonic()
+        hosts = {}
+        hottest_host, hottest = None, 0.0
+        cpu_temps, gpu_temps = [], []
+        for name, link in self.links.items():
+            state = link.state or {}
+            cpu = state.get('cpu', {}).get('temperature', 0.0)
+            gpu = state.get('gpu', {}).get('temperature', 0.0)
+            online = self.online(link, now)
+            hosts[name] = {
+                'online': online,
+                'cpu': cpu,
+                'gpu': gpu,
+                'fanSpeed': state.get('fanSpeed', 0),
+                'status': state.get('status'),
+                'profile': state.get('profile')
+            }
+            if not online:
+                continue
+            cpu_temps.append(cpu)
+            gpu_temps.append(gpu)
+            if max(cpu, gpu) > hottest:
+                hottest_host, hottest = name, max(cpu, gpu)
+        return {
+            'fleet': {
+                'hosts': len(self.links),
+                'online': len(cpu_temps),
+                'cpu_mean': sum(cpu_temps) / len(cpu_temps) if cpu_temps else 0.0,
+                'gpu_mean': sum(gpu_temps) / len(gpu_temps) if gpu_temps else 0.0,
+                'hottest_host': hottest_host,
+                'hottest': hottest
+            },
+            'hosts': hosts
+        }
+
+    def get_stats(self) -> Dict:
+        return {
+            'frames': sum(link.frames for link in self.links.values()),
+            'bytes_received': sum(link.bytes_received for link in self.links.values()),
+            'reconnects': sum(link.reconnects for link in self.links.values()),
+            'dropped_commands': sum(link.dropped_commands for link in self.links.values())
+        }
+
+    async def start(self) -> None:
+        """Start one connection task per host"""
+        self.tasks = [asyncio.create_task(link.run()) for link in self.links.values()]
+
+    async def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def publish(self, server: TelemetryServer, interval: float = 0.5) -> None:
+        """Send the merged view to the server's clients every interval (deltas: only changed hosts)"""
+        while True:
+            server.write(self.merged_view())
+            await asyncio.sleep(interval)
+
+
+def handle_aggregator_command(aggregator: Aggregator, command: str, server: TelemetryServer) -> None:
+    """
+    Commands from the aggregator's clients:
+      host NAME COMMAND...  forward a backend command (set_mode, apply_profile...) to one host
+      all COMMAND...        forward to every host
+      view NAME             reply with the full state of one host
+      stats                 reply with the aggregator counters
+      resync                resend a full merged frame
+    """
+    parts = command.strip().split(maxsplit=2)
+    if not parts:
+        return
+    try:
+        if parts[0] == 'host' and len(parts) == 3 and parts[1] in aggregator.links:
+            aggregator.links[parts[1]].send(parts[2])
+        elif parts[0] == 'all' and len(parts) >= 2:
+            forwarded = command.strip().split(maxsplit=1)[1]
+            for link in aggregator.links.values():
+                link.send(forwarded)
+        elif parts[0] == 'view' and len(parts) >= 2:
+            server.write_message({'type': 'host', 'host': parts[1], 'data': aggregator.host_view(parts[1])})
+        elif parts[0] == 'stats':
+            server.write_message(dict(aggregator.get_stats(), type='stats', server=server.get_stats()))
+        elif parts[0] == 'resync':
+            server.request_keyframe()
+    except Exception as e:
+        print(f"Error processing command {parts[0]}: {e}", file=sys.stderr)
+
+
+def load_hosts(path: str) -> Dict[str, str]:
+    """Read a hosts file: one 'NAME ADDRESS' per line, # comments allowed"""
+    hosts = {}
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                name, address = line.split()
+                hosts[name] = address
+    return hosts
+
+
+async def serve(hosts: Dict[str, str], listen: str, interval: float, encoding: str) -> None:
+    aggregator = Aggregator(hosts)
+    server = TelemetryServer(aggregator, listen, encoding=encoding)
+    server.handle_command = lambda target, line: handle_aggregator_command(target, line, server)
+    await server.start()
+    await aggregator.start()
+    try:
+        await aggregator.publish(server, interval)
+    finally:
+        await aggregator.stop()
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate the telemetry of many headless backends")
+    parser.add_argument('hosts', nargs='*', help="NAME=ADDRESS pairs (unix:PATH or [tcp:]HOST:PORT)")
+    parser.add_argument('--hosts-file', help="file with one 'NAME ADDRESS' per line")
+    parser.add_argument('--listen', required=True, help="address to serve the merged view on (TCP without a host: 127.0.0.1 only)")
+    parser.add_argument('--interval', type=float, default=0.5, help="seconds between merged frames")
+    parser.add_argument('--telemetry', choices=ENCODINGS, default='json', help="encoding of the merged stream")
+    args = parser.parse_args()
+
+    hosts = load_hosts(args.hosts_file) if args.hosts_file else {}
+    for pair in args.hosts:
+        name, _, address = pair.partition('=')
+        hosts[name] = address
+    if not hosts:
+        parser.error("no hosts given")
+    try:
+        asyncio.run(serve(hosts, args.listen, args.interval, args.telemetry))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+asyncio core for the NBFC Control API
+Sensor sources are read concurrently in the background and every frame uses their
+latest state, so a slow or hung source never holds back the telemetry. The tick and
+the frame write run off the event loop. Commands are read from an async stdin stream
+and fan writes go through the coalescing write pipeline
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from model import SensorModel
+from parsers import parse_sensors_output
+
+
+class AsyncController:
+    """Drive an NBFCController from an asyncio event loop"""
+
+    def __init__(self, controller, timeout: float = 2.0, read_budget: float = 0.1,
+                 handle_command: Optional[Callable] = None):
+        self.controller = controller
+        self.timeout = timeout
+        # Attente maximale des lectures fraîches avant de publier une trame
+        self.read_budget = read_budget
+        self.handle_command = handle_command
+        self.write_event: Optional[asyncio.Event] = None
+        self.wake_event: Optional[asyncio.Event] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        # Dernières lectures valides, réutilisées tant qu'une source n'a pas répondu
+        self.last_sensors: Optional[Dict] = None
+        self.last_nbfc_fans: List[Dict] = []
+        self.last_nbfc_time: Optional[float] = None
+        # Lecture en cours par source (une seule à la fois) et son heure de départ
+        self.reads: Dict[str, asyncio.Future] = {}
+        self.read_started: Dict[str, float] = {}
+        self.timed_out = set()
+        self.timeouts = 0
+
+    async def run_command(self, cmd: List[str]) -> Optional[str]:
+        """Run a command as an asyncio subprocess, killing it if it exceeds the timeout"""
+        self.controller.metrics.incr('subprocesses', label=cmd[0])
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        except FileNotFoundError:
+            self.controller.metrics.incr('subprocess_errors', label=cmd[0])
+            print(f"Command not found: {cmd[0]}", file=sys.stderr)
+            return None
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), self.timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            self.timeouts += 1
+            self.controller.metrics.incr('subprocess_timeouts', label=cmd[0])
+            print(f"Timeout executing {' '.join(cmd)}", file=sys.stderr)
+            return None
+        if process.returncode != 0:
+            self.controller.metrics.incr('subprocess_errors', label=cmd[0])
+            print(f"Error executing {' '.join(cmd)}: exit code {process.returncode}", file=sys.stderr)
+            return None
+        return stdout.decode(errors='replace').strip()
+
+    def run_in_thread(self, func: Callable, *args) -> asyncio.Future:
+        """
+        Run a blocking call in its own daemon thread. Unlike asyncio.to_thread, a call
+        that never returns is abandoned at shutdown instead of blocking interpreter exit
+        """
+        loop = self.loop
+        future = loop.create_future()
+
+        def settle(result, error) -> None:
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        def worker() -> None:
+            result, error = None, None
+            try:
+                result = func(*args)
+            except Exception as e:
+                error = e
+            try:
+                loop.call_soon_threadsafe(settle, result, error)
+            except RuntimeError:
+                # Boucle déjà fermée: l'appel a été abandonné à l'arrêt
+                pass
+
+        threading.Thread(target=worker, name=getattr(func, '__qualname__', 'blocking-call'),
+                         daemon=True).start()
+        return future
+
+    def refresh(self, name: str, read: Callable) -> asyncio.Task:
+        """
+        Start reading a source in the background unless a read is still in flight.
+        A hung source keeps a single read pending; the frames use its last state meanwhile
+        """
+        task = self.reads.get(name)
+        if task is None or task.done():
+            task = self.reads[name] = asyncio.ensure_future(read())
+            task.add_done_callback(self.read_done)
+            self.read_started[name] = time.monotonic()
+            self.timed_out.discard(name)
+        elif name not in self.timed_out and time.monotonic() - self.read_started[name] > self.timeout:
+            # Compté et signalé une seule fois par lecture bloquée
+            self.timed_out.add(name)
+            self.timeouts += 1
+            print(f"Timeout reading {name}, using its last state", file=sys.stderr)
+        return task
+
+    def read_done(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            self.controller.metrics.incr('errors', label='source')
+            print(f"Error reading a source: {task.exception()}", file=sys.stderr)
+
+    async def read_sensors(self) -> None:
+        """Temperatures and RPMs from sysfs/hwmon, or from an async `sensors` process"""
+        metrics = self.controller.metrics
+        start = time.perf_counter()
+        if self.controller.hwmon.inputs:
+            readings = await self.run_in_thread(self.controller.hwmon.read)
+            metrics.observe('hwmon', time.perf_counter() - start)
+        else:
+            output = await self.run_command(['sensors'])
+            parse_start = time.perf_counter()
+            metrics.observe('sensors', parse_start - start)
+            readings = parse_sensors_output(output) if output else None
+            if readings is not None:
+                metrics.observe('parse', time.perf_counter() - parse_start)
+        if readings is not None:
+            self.last_sensors = self.controller.apply_thermal_fallback(readings)
+
+    async def read_nbfc(self) -> None:
+        """Fan list from the NBFC client (state file, socket or CLI)"""
+        start = time.perf_counter()
+        fans = await self.run_in_thread(self.controller.nbfc.get_status)
+        self.controller.metrics.observe('nbfc_status', time.perf_counter() - start)
+        if fans is not None:
+            self.last_nbfc_fans = fans
+            self.last_nbfc_time = time.monotonic()
+
+    async def collect(self) -> SensorModel:
+        """
+        Poll every source concurrently and build the sample from their latest state.
+        Fresh readings are waited for at most read_budget seconds: a slow or hung source
+        (NBFC CLI, `sensors`) delays no frame, its last known state is used until it answers
+        """
+        tasks = [self.refresh('sensors', self.read_sensors), self.refresh('nbfc', self.read_nbfc)]
+        pending = [task for task in tasks if not task.done()]
+        if pending:
+            await asyncio.wait(pending, timeout=self.read_budget)
+        sensors = self.last_sensors or {
+            'cpu_temp': 0, 'gpu_temp': 0, 'cpu_fan_rpm': 0, 'gpu_fan_rpm': 0, 'sensor_data': {}
+        }
+        return self.controller.get_fan_status(sensors=dict(sensors), nbfc_fans=self.last_nbfc_fans)
+
+    def get_stats(self) -> Dict:
+        """Reads timed out so far and the age of the NBFC state the frames use"""
+        stats = {'timeouts': self.timeouts}
+        if self.last_nbfc_time is not None:
+            stats['nbfc_age_s'] = round(time.monotonic() - self.last_nbfc_time, 1)
+        return stats
+
+    def _set_soon(self, event: asyncio.Event) -> None:
+        """Set an event of the loop from its own thread or from another one"""
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self.loop:
+            event.set()
+        else:
+            self.loop.call_soon_threadsafe(event.set)
+
+    def notify_writer(self) -> None:
+        """Write pipeline hook: a speed was requested, wake the writer task"""
+        self._set_soon(self.write_event)
+
+    def wake(self) -> None:
+        """Scheduler hook: a command arrived, cut the wait for the next frame short"""
+        self._set_soon(self.wake_event)
+
+    async def writer(self) -> None:
+        """Apply buffered fan writes one batch at a time, within the pipeline's rate limit"""
+        fan_writes = self.controller.fan_writes
+        write_future = None
+        while True:
+            await self.write_event.wait()
+            self.write_event.clear()
+            while True:
+                delay = fan_writes.delay()
+                if delay is None:
+                    break
+                if delay > 0:
+                    # Les demandes qui arrivent pendant l'attente fusionnent avec celles en attente
+                    await asyncio.sleep(delay)
+                    continue
+                if write_future is not None and not write_future.done():
+                    # Une écriture précédente est toujours bloquée: l'attendre avant la suivante
+                    await asyncio.wait([write_future])
+                write_future = self.run_in_thread(fan_writes.flush)
+                try:
+                    await asyncio.wait_for(asyncio.shield(write_future), self.timeout)
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    print("Timeout writing fan speeds", file=sys.stderr)
+
+    def publish(self, fans: SensorModel, start: float) -> float:
+        """Tick, write the frame and return the wait before the next one (blocking)"""
+        controller = self.controller
+        data = controller.tick(fans)
+        data['async'] = self.get_stats()
+        serialize_start = time.perf_counter()
+        controller.telemetry.write(data)
+        controller.record_loop_timing(start, serialize_start)
+        interval = controller.scheduler.policy.next_interval({
+            'time': time.monotonic(),
+            'temperature': max(data['cpu']['temperature'], data['gpu']['temperature']),
+            'load': controller.scheduler.read_load()
+        })
+        controller.scheduler.interval = interval
+        return interval
+
+    async def telemetry(self) -> None:
+        """Collect, tick and publish frames at the scheduler's rate"""
+        while True:
+            try:
+                start = time.perf_counter()
+                fans = await self.collect()
+                # Le tick lit /proc et écrit l'historique et le journal d'événements, la trame
+                # part sur stdout: tout cela bloque, hors de la boucle d'événements
+                interval = await self.run_in_thread(self.publish, fans, start)
+            except Exception as e:
+                self.controller.metrics.incr('errors', label='update_loop')
+                print(f"Error in async update loop: {e}", file=sys.stderr)
+                interval = 1.0
+            try:
+                await asyncio.wait_for(self.wake_event.wait(), interval)
+                self.wake_event.clear()
+            except asyncio.TimeoutError:
+                pass
+
+    async def commands(self, reader: asyncio.StreamReader) -> None:
+        """Read commands line by line from an async stream"""
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            # handle_command réveille la boucle de télémétrie via scheduler.wake -> self.wake
+            self.handle_command(self.controller, line.decode(errors='replace'))
+
+    async def run(self, reader: Optional[asyncio.StreamReader] = None, server=None) -> None:
+        """
+        Run telemetry, writes and commands until the command stream closes.
+        With a TelemetryServer (headless mode) frames and commands go through its
+        socket clients instead of stdio, until the task is cancelled
+        """
+        self.loop = asyncio.get_running_loop()
+        self.write_event = asyncio.Event()
+        self.wake_event = asyncio.Event()
+        # Les écritures passent par la tâche writer, les commandes réveillent la boucle de télémétrie
+        self.controller.fan_writes.hand_off(self.notify_writer)
+        self.controller.scheduler.waker = self.wake
+
+        if server is not None:
+            await server.start()
+            self.controller.telemetry = server
+        elif reader is None:
+            reader = asyncio.StreamReader()
+            await self.loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+        tasks = [asyncio.create_task(self.telemetry()), asyncio.create_task(self.writer())]
+        try:
+            if server is not None:
+                await asyncio.gather(*tasks)
+            else:
+                await self.commands(reader)
+        finally:
+            # Lectures encore en cours: annulées, leur thread bloqué est abandonné (daemon)
+            tasks += [task for task in self.reads.values() if not task.done()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.controller.fan_writes.hand_off(None)
+            self.controller.scheduler.waker = None
+            if server is not None:
+                await server.close()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Fleet aggregation benchmark
+Runs simulated headless backends on Unix sockets in this process, subscribes an
+aggregator to all of them and checks it keeps up with every host at 2 Hz
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregator import Aggregator
+from server import TelemetryServer
+
+
+class SimulatedBackend:
+    """A TelemetryServer fed with synthetic ticks, recording the commands it receives"""
+
+    def __init__(self, name: str, address: str, seed: int):
+        self.name = name
+        self.rng = random.Random(seed)
+        self.commands = []
+        self.server = TelemetryServer(self, address, handle_command=lambda target, line: self.commands.append(line))
+        self.cpu = 45.0 + self.rng.uniform(-5, 5)
+        self.gpu = 50.0 + self.rng.uniform(-5, 5)
+        self.ticks = 0
+
+    def tick(self) -> dict:
+        self.ticks += 1
+        self.cpu += self.rng.uniform(-0.5, 0.5)
+        self.gpu += self.rng.uniform(-0.4, 0.4)
+        return {
+            "cpu": {"name": "CPU Fan", "speed": 42.0, "rpm": 3360, "temperature": self.cpu},
+            "gpu": {"name": "GPU Fan", "speed": 42.0, "rpm": 3360, "temperature": self.gpu},
+            "fanSpeed": 42.0,
+            "status": "Dynamic",
+            "profile": "Balanced",
+            "hardware": {"cpu_model": "Simulated CPU", "gpu_model": "Simulated GPU"},
+            "sensor_data": {f"temp{i + 1}": f"{40 + i:+.1f}°C" for i in range(20)}
+        }
+
+    async def run(self, rate: float) -> None:
+        # Décaler les hôtes pour ne pas émettre toutes les trames au même instant
+        await asyncio.sleep(self.rng.random() / rate)
+        while True:
+            self.server.write(self.tick())
+            await asyncio.sleep(1 / rate)
+
+
+async def run_fleet(hosts: int, rate: float, duration: float) -> dict:
+    directory = tempfile.mkdtemp(prefix='nbfc-fleet-')
+    backends = [SimulatedBackend(f'host{i}', f'unix:{directory}/host{i}.sock', seed=i) for i in range(hosts)]
+    for backend in backends:
+        await backend.server.start()
+    tickers = [asyncio.create_task(backend.run(rate)) for backend in backends]
+
+    aggregator = Aggregator({backend.name: backend.server.address for backend in backends})
+    await aggregator.start()
+
+    # Attendre que tous les hôtes soient connectés avant de mesurer
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline and aggregator.merged_view()['fleet']['online'] < hosts:
+        await asyncio.sleep(0.1)
+    connected = aggregator.merged_view()['fleet']['online']
+
+    frames_before = aggregator.get_stats()['frames']
+    cpu_before = time.process_time()
+    wall_before = time.monotonic()
+    merged_times = []
+    while time.monotonic() - wall_before < duration:
+        start = time.perf_counter()
+        merged = aggregator.merged_view()
+        merged_times.append(time.perf_counter() - start)
+        await asyncio.sleep(1 / rate)
+    wall = time.monotonic() - wall_before
+    cpu = time.process_time() - cpu_before
+    frames = aggregator.get_stats()['frames'] - frames_before
+
+    # Commande relayée sur la connexion existante
+    aggregator.links['host0'].send('set_mode dynamic')
+    await asyncio.sleep(0.2)
+
+    # Chaque hôte doit avoir exactement le dernier état émis
+    stale = sum(1 for backend in backends
+                if abs(aggregator.host_view(backend.name)['cpu']['temperature'] - round(backend.cpu, 2)) > 0.6)
+
+    await aggregator.stop()
+    for task in tickers:
+        task.cancel()
+    await asyncio.gather(*tickers, return_exceptions=True)
+    for backend in backends:
+        await backend.server.close()
+
+    return {
+        'hosts': hosts,
+        'connected': connected,
+        'online': merged['fleet']['online'],
+        'frames_per_s': round(frames / wall, 1),
+        'expected_frames_per_s': round(hosts * rate, 1),
+        'cpu_percent': round(cpu / wall * 100, 1),
+        'merged_view_ms': round(sum(merged_times) / len(merged_times) * 1000, 3),
+        'stale_hosts': stale,
+        'command_delivered': backends[0].commands == ['set_mode dynamic\n'],
+        'reconnects': aggregator.get_stats()['reconnects']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated fleet for the aggregator")
+    parser.add_argument('--hosts', type=int, default=200)
+    parser.add_argument('--rate', type=float, default=2.0, help="frames per second per host")
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    results = asyncio.run(run_fleet(args.hosts, args.rate, args.duration))
+    for key, value in results.items():
+        print(f"{key:<24}{value}")
+    # CPU includes the simulated backends, which run in the same process
+    ok = (results['connected'] == args.hosts and results['stale_hosts'] == 0
+          and results['command_delivered'] and results['frames_per_s'] >= 0.9 * results['expected_frames_per_s'])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the `sensors` / `nbfc status -a` parsers
+Compares the single-pass parser against the previous four-pass implementation
+(speedup: median of alternating rounds)
+"""
+
+import os
+import statistics
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parsers import parse_nbfc_status, parse_sensors_output
+
+
+def make_sensors_dump(cores: int = 8, chips: int = 4) -> str:
+    """Build a `sensors` dump shaped like a real machine with the given core and chip counts"""
+    blocks = []
+    lines = ['coretemp-isa-0000', 'Adapter: ISA adapter',
+             'Package id 0:  +52.0°C  (high = +100.0°C, crit = +100.0°C)']
+    for core in range(cores):
+        lines.append(f'Core {core}:        +{40 + core % 30}.0°C  (high = +100.0°C, crit = +100.0°C)')
+    blocks.append('\n'.join(lines))
+
+    blocks.append('\n'.join([
+        'acer-isa-0000', 'Adapter: ISA adapter',
+        'fan1:        2100 RPM', 'fan2:        1900 RPM',
+        'temp1:        +45.0°C', 'temp2:        +55.0°C', 'temp3:        +50.0°C'
+    ]))
+
+    for chip in range(chips):
+        blocks.append('\n'.join([
+            f'nvme-pci-{chip:04x}', 'Adapter: PCI adapter',
+            'Composite:    +38.9°C  (low  = -273.1°C, high = +84.8°C)',
+            'Sensor 1:     +38.9°C  (low  = -273.1°C, high = +65261.8°C)',
+            'Sensor 2:     +41.9°C  (low  = -273.1°C, high = +65261.8°C)'
+        ]))
+    return '\n\n'.join(blocks) + '\n'
+
+
+def make_nbfc_dump(fans: int = 2) -> str:
+    """Build a `nbfc status -a` dump with the given number of fans"""
+    lines = ['Read-only               : false', 'Selected Config Name    : Acer Nitro AN515-54',
+             'Temperature             : 55.00', '']
+    for fan in range(fans):
+        lines += [
+            f'Fan Display Name        : Fan {fan}',
+            'Auto Control Enabled    : true',
+            'Critical Mode Enabled   : false',
+            'Current Fan Speed       : 42.35',
+            'Target Fan Speed        : 42.35',
+            'Fan Speed Steps         : 100',
+            ''
+        ]
+    return '\n'.join(lines)
+
+
+def legacy_parse_sensors(sensors_output: str):
+    """The four-pass parser get_fan_status used before the single-pass parser"""
+    cpu_fan_rpm = gpu_fan_rpm = 0
+    for line in sensors_output.split('\n'):
+        try:
+            if 'fan1:' in line and 'RPM' in line:
+                parts = line.split(':')[1].strip().split()
+                if parts and parts[0].isdigit():
+                    cpu_fan_rpm = int(parts[0])
+            if 'fan2:' in line and 'RPM' in line:
+                parts = line.split(':')[1].strip().split()
+                if parts and parts[0].isdigit():
+                    gpu_fan_rpm = int(parts[0])
+        except (IndexError, ValueError):
+            pass
+    cpu_temps = []
+    for line in sensors_output.split('\n'):
+        try:
+            if 'Core' in line and '°C' in line:
+                parts = line.split('+')
+                if len(parts) > 1:
+                    temp_parts = parts[1].split('°C')
+                    if temp_parts and temp_parts[0]:
+                        cpu_temps.append(float(temp_parts[0]))
+        except (IndexError, ValueError):
+            continue
+    gpu_temps = []
+    for line in sensors_output.split('\n'):
+        try:
+            if ('temp2' in line or 'temp3' in line) and '°C' in line:
+                parts = line.split('+')
+                if len(parts) > 1:
+                    temp_parts = parts[1].split('°C')
+                    if temp_parts and temp_parts[0]:
+                        gpu_temps.append(float(temp_parts[0]))
+        except (IndexError, ValueError):
+            continue
+    sensor_data = {}
+    for line in sensors_output.split('\n'):
+        line = line.strip()
+        if line and ':' in line and not line.startswith('Adapter'):
+            sensor_data[line.split(':')[0].strip()] = line.split(':', 1)[1].strip()
+    return cpu_fan_rpm, gpu_fan_rpm, cpu_temps, gpu_temps, sensor_data
+
+
+def bench(func, arg, number: int) -> float:
+    """Best-of-5 time per call, in microseconds"""
+    return min(timeit.repeat(lambda: func(arg), number=number, repeat=5)) / number * 1e6
+
+
+def compare(legacy, single, arg, number: int, rounds: int = 15):
+    """
+    Best time per call of each parser (microseconds) and the median speedup.
+    The two run alternately in short rounds so that both see the same machine load
+    """
+    legacy_times, single_times, ratios = [], [], []
+    for _ in range(rounds):
+        legacy_time = timeit.timeit(lambda: legacy(arg), number=number) / number * 1e6
+        single_time = timeit.timeit(lambda: single(arg), number=number) / number * 1e6
+        legacy_times.append(legacy_time)
+        single_times.append(single_time)
+        ratios.append(legacy_time / single_time)
+    return min(legacy_times), min(single_times), statistics.median(ratios)
+
+
+def main():
+    print(f"{'case':<28}{'lines':>7}{'legacy us':>12}{'single us':>12}{'speedup':>9}")
+    for cores, chips in ((4, 1), (8, 4), (64, 16), (128, 32)):
+        dump = make_sensors_dump(cores, chips)
+        number = max(10, 5000 // (cores + chips * 5))
+        legacy, single, speedup = compare(legacy_parse_sensors, parse_sensors_output, dump, number)
+        print(f"{f'sensors {cores} cores/{chips} chips':<28}{dump.count(chr(10)):>7}"
+              f"{legacy:>12.1f}{single:>12.1f}{speedup:>8.1f}x")
+
+    for fans in (2, 8):
+        dump = make_nbfc_dump(fans)
+        print(f"{f'nbfc status {fans} fans':<28}{dump.count(chr(10)):>7}"
+              f"{'':>12}{bench(parse_nbfc_status, dump, 5000):>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the predictive mode
+Generates bursty batch-job traces from a reference thermal plant, fits the thermal
+model on one of them, checks its horizon prediction against persistence, then replays
+the others in closed loop with the dynamic and the predictive modes
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from predictive import MODEL_SENSORS, ThermalModel
+from replay import Replay
+
+# Plante de référence, différente du modèle par défaut: constante de temps 25 s, 40 °C
+# au repos, +70 °C à pleine charge, -45 °C ventilateurs à fond
+REFERENCE_WEIGHTS = {
+    'cpu': (40 / 25, 70 / 25, -45 / 25, -1 / 25),
+    'gpu': (36 / 30, 50 / 30, -25 / 30, -1 / 30)
+}
+
+
+def make_trace(duration: float = 1800.0, step: float = 0.5, seed: int = 1, plant: ThermalModel = None,
+               random_speed: bool = False):
+    """
+    Bursty load (idle, then batch jobs of 20-120 s at 70-100%) and the plant's response.
+    With random_speed the fan speed changes at random (training data); otherwise it is
+    left at 0 and the replay simulates it
+    """
+    rng = random.Random(seed)
+    plant = plant or ThermalModel(REFERENCE_WEIGHTS)
+    temps = {'cpu': 45.0, 'gpu': 42.0}
+    cpu_load = gpu_load = 0.05
+    speed = 30.0
+    burst_end = next_burst = 0.0
+    trace = []
+    t = 0.0
+    while t < duration:
+        if t >= next_burst:
+            burst_end = t + rng.uniform(20, 120)
+            next_burst = burst_end + rng.uniform(30, 180)
+            burst_load = rng.uniform(0.7, 1.0)
+        busy = t < burst_end
+        cpu_load = burst_load if busy else rng.uniform(0.02, 0.1)
+        gpu_load = burst_load * 0.8 if busy else 0.02
+        if random_speed and rng.random() < 0.02:
+            speed = rng.choice((20.0, 40.0, 60.0, 80.0, 100.0))
+        loads = {'cpu': cpu_load, 'gpu': gpu_load}
+        for sensor in MODEL_SENSORS:
+            temps[sensor] = plant.step(sensor, temps[sensor], loads[sensor], speed, step)
+        trace.append({
+            'time': t,
+            'cpu_temp': temps['cpu'] + rng.gauss(0, 0.3),
+            'gpu_temp': temps['gpu'] + rng.gauss(0, 0.3),
+            'cpu_rpm': 0.0,
+            'gpu_rpm': 0.0,
+            'cpu_load': cpu_load * 100,
+            'gpu_load': gpu_load * 100,
+            'fan_speed': speed if random_speed else 0.0
+        })
+        t += step
+    return trace
+
+
+def as_fractions(trace):
+    return [dict(sample, cpu_load=sample['cpu_load'] / 100, gpu_load=sample['gpu_load'] / 100)
+            for sample in trace]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit, evaluate and replay the predictive mode")
+    parser.add_argument('--traces', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=1800.0)
+    parser.add_argument('--threshold', type=float, default=85.0)
+    args = parser.parse_args()
+
+    plant = ThermalModel(REFERENCE_WEIGHTS)
+
+    training = as_fractions(make_trace(args.duration * 2, seed=100, plant=plant, random_speed=True))
+    start = time.perf_counter()
+    model = ThermalModel.fit(training)
+    print(f"fit: {len(training)} samples in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for sensor in MODEL_SENSORS:
+        fitted = ', '.join(f'{w:+.4f}' for w in model.weights[sensor])
+        reference = ', '.join(f'{w:+.4f}' for w in REFERENCE_WEIGHTS[sensor])
+        print(f"  {sensor}: fitted ({fitted})  reference ({reference})")
+
+    validation = as_fractions(make_trace(args.duration, seed=200, plant=plant, random_speed=True))
+    print("horizon prediction error on an unseen trace (°C):")
+    for name, candidate in (('default', ThermalModel()), ('fitted', model)):
+        for sensor, result in candidate.evaluate(validation).items():
+            print(f"  {name:<8}{sensor}: mae {result['mae']:.2f}  persistence {result['persistence_mae']:.2f}")
+
+    print(f"closed-loop replay ({args.traces} traces, threshold {args.threshold} °C):")
+    print(f"  {'mode':<22}{'peak °C':>9}{'above s':>10}{'writes':>8}{'osc':>6}{'us/tick':>9}")
+    traces = [make_trace(args.duration, seed=seed, plant=plant) for seed in range(args.traces)]
+    for name, options in (('dynamic', {}),
+                          ('predictive (default)', {'predictive': True}),
+                          ('predictive (fitted)', {'predictive': True, 'model': model})):
+        results = [Replay(trace, threshold=args.threshold, plant=plant, **options).run() for trace in traces]
+        print(f"  {name:<22}{max(r['peak_temp'] for r in results):>9.2f}"
+              f"{sum(r['time_above_threshold_s'] for r in results):>10.1f}"
+              f"{sum(r['fan_writes'] for r in results):>8}"
+              f"{sum(r['oscillations'] for r in results):>6}"
+              f"{sum(r['cpu_us_per_tick'] for r in results) / len(results):>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the per-process attribution stage
+Builds a fake /proc with thousands of processes, a few of them busy, and checks that
+the sampler settles on the busy ones while its reads and time per sample stay bounded.
+Also times a sample of the real /proc
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from processes import CLOCK_TICKS, ProcessSampler
+
+
+def write_stat(root: str, pid: int, name: str, ticks: int, start: int) -> None:
+    # pid (comm) state ppid ... utime stime ... starttime (champs 14, 15 et 22)
+    fields = ['S', '1'] + ['0'] * 9 + [str(ticks), '0'] + ['0'] * 6 + [str(start)] + ['0'] * 30
+    with open(os.path.join(root, str(pid), 'stat'), 'w') as f:
+        f.write(f"{pid} ({name}) {' '.join(fields)}\n")
+
+
+def make_proc(root: str, count: int):
+    for pid in range(1, count + 1):
+        os.makedirs(os.path.join(root, str(pid)))
+        write_stat(root, pid, f'proc-{pid}', 0, pid)
+
+
+def run(count: int, busy: int, samples: int, max_reads: int):
+    root = tempfile.mkdtemp(prefix='nbfc-proc-')
+    try:
+        make_proc(root, count)
+        rng = random.Random(1)
+        busy_pids = rng.sample(range(1, count + 1), busy)
+        usage = {pid: 0 for pid in busy_pids}
+        sampler = ProcessSampler(proc_root=root, max_reads=max_reads)
+        costs, reads = [], []
+        # Premier échantillon à partir duquel le top est toujours juste (processus déjà
+        # lancés au démarrage: une lecture de référence puis une lecture avec un écart)
+        converged = None
+        now = 0.0
+        for index in range(samples):
+            # Les processus occupés consomment 10 à 100 % d'un cœur par intervalle
+            for rank, pid in enumerate(busy_pids):
+                usage[pid] += int(CLOCK_TICKS * sampler.interval * (rank + 1) / busy)
+                write_stat(root, pid, f'busy-{pid}', usage[pid], pid)
+            before = sampler.reads
+            sampler.sample(now)
+            now += sampler.interval
+            if index >= 2:
+                costs.append(sampler.last_cost_ms)
+                reads.append(sampler.reads - before)
+                # Les derniers de busy_pids sont les plus gourmands
+                expected = set(busy_pids[-sampler.top_count:])
+                if {entry[0] for entry in sampler.top} != expected:
+                    converged = None
+                elif converged is None:
+                    converged = index
+        return {
+            'processes': count,
+            'busy': busy,
+            'reads_per_sample': round(statistics.mean(reads), 1),
+            'max_reads_per_sample': max(reads),
+            'ms_per_sample': round(statistics.mean(costs), 3),
+            'max_ms_per_sample': round(max(costs), 3),
+            'converged_after_samples': converged,
+            'top': sampler.top
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-process attribution cost on a fake /proc")
+    parser.add_argument('--processes', type=int, nargs='+', default=[200, 1000, 5000])
+    parser.add_argument('--busy', type=int, default=8)
+    parser.add_argument('--samples', type=int, default=20)
+    parser.add_argument('--max-reads', type=int, default=1024)
+    args = parser.parse_args()
+
+    for count in args.processes:
+        result = run(count, args.busy, args.samples, args.max_reads)
+        print(' '.join(f'{key}={value}' for key, value in result.items()))
+
+    sampler = ProcessSampler()
+    sampler.sample(0.0)
+    sampler.sample(sampler.interval)
+    print(f"real /proc: {len(sampler.table)} processes, {sampler.last_cost_ms} ms per sample")
+
+
+if __name__ == '__main__':
+    main()
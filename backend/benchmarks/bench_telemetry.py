@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the telemetry stream
+Compares bytes and CPU per tick of the delta encoder against the legacy json.dumps output
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telemetry import TelemetryDecoder, TelemetryEncoder, msgpack
+
+
+def make_ticks(count: int = 2000, sensors: int = 40, seed: int = 1):
+    """Build a sequence of telemetry dicts shaped like update_loop output"""
+    rng = random.Random(seed)
+    cpu_temp = 45.0
+    gpu_temp = 50.0
+    sensor_values = [40.0 + i % 20 for i in range(sensors)]
+    ticks = []
+    for _ in range(count):
+        cpu_temp += rng.uniform(-0.3, 0.3)
+        gpu_temp += rng.uniform(-0.2, 0.2)
+        # hwmon reports whole millidegrees, most sensors only move every few ticks
+        for i in range(sensors):
+            if rng.random() < 0.1:
+                sensor_values[i] += rng.choice((-1.0, 1.0))
+        ticks.append({
+            "cpu": {"name": "CPU Fan", "speed": 42.0, "rpm": 3360, "temperature": cpu_temp},
+            "gpu": {"name": "GPU Fan", "speed": 42.0, "rpm": 3360, "temperature": gpu_temp},
+            "fanSpeed": 42.0,
+            "status": "Dynamic",
+            "profile": "Balanced",
+            "hardware": {
+                "cpu_model": "Intel(R) Core(TM) i7-9750H CPU @ 2.60GHz",
+                "gpu_model": "NVIDIA Corporation TU117M [GeForce GTX 1650 Mobile / Max-Q] (rev a1)"
+            },
+            "sensor_data": {f"temp{i + 1}": f"{value:+.1f}°C" for i, value in enumerate(sensor_values)}
+        })
+    return ticks
+
+
+def bench_legacy(ticks, repeat: int = 5):
+    """Bytes and best-of-repeat time over the whole sequence"""
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        total = sum(len((json.dumps(tick) + '\n').encode()) for tick in ticks)
+        elapsed.append(time.perf_counter() - start)
+    return total, min(elapsed)
+
+
+def bench_encoder(ticks, encoding: str, repeat: int = 5):
+    elapsed = []
+    for _ in range(repeat):
+        encoder = TelemetryEncoder(encoding=encoding)
+        start = time.perf_counter()
+        chunks = [encoder.encode(tick) for tick in ticks]
+        elapsed.append(time.perf_counter() - start)
+    elapsed = min(elapsed)
+
+    # Check the stream decodes back to the same states when split at arbitrary points
+    decoder = TelemetryDecoder()
+    stream = b''.join(chunks)
+    states = []
+    for offset in range(0, len(stream), 1000):
+        states.extend(json.dumps(state, sort_keys=True) for state in decoder.feed(stream[offset:offset + 1000]))
+    assert len(states) == len(ticks), "frame splitting lost frames"
+    return len(stream), elapsed
+
+
+def main():
+    ticks = make_ticks()
+    results = [('legacy json.dumps',) + bench_legacy(ticks), ('json delta',) + bench_encoder(ticks, 'json')]
+    if msgpack is not None:
+        results.append(('msgpack delta',) + bench_encoder(ticks, 'msgpack'))
+
+    base_bytes, base_time = results[0][1], results[0][2]
+    print(f"{'encoding':<20}{'bytes/tick':>12}{'us/tick':>10}{'bytes ratio':>13}")
+    for name, total, elapsed in results:
+        print(f"{name:<20}{total / len(ticks):>12.0f}{elapsed / len(ticks) * 1e6:>10.1f}"
+              f"{base_bytes / total:>12.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the backend hot path
+Times parsing, a full tick on faked sysfs/subprocess sources, frame serialization and
+command floods, writes the results as JSON and compares them against a stored baseline:
+a case more than --tolerance slower than its baseline is a regression (exit status 1).
+Timings only compare on the machine the baseline was recorded on: against another one
+the comparison is printed but never fails
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_parsers import make_nbfc_dump, make_sensors_dump
+from bench_telemetry import make_ticks
+from fan_writes import FanWritePipeline
+from hwmon import HwmonReader
+from nbfc_client import SOCKET_END, FakeBackend, NBFCClient, SocketBackend
+from nbfc_control_api import NBFCController, handle_command
+from parsers import parse_nbfc_status, parse_sensors_output
+from telemetry import TelemetryEncoder, msgpack
+
+SUITE_VERSION = 1
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+
+class _NullOutput:
+    """Telemetry sink that discards frames"""
+
+    def write(self, data: bytes) -> int:
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+
+def make_sysfs(root: str, cores: int = 8, fans: int = 2) -> str:
+    """Fake /sys/class/hwmon tree: coretemp with one input per core, an EC chip with fans"""
+    coretemp = os.path.join(root, 'hwmon0')
+    os.makedirs(coretemp)
+    files = {'name': 'coretemp', 'temp1_label': 'Package id 0', 'temp1_input': '52000'}
+    for core in range(cores):
+        files[f'temp{core + 2}_label'] = f'Core {core}'
+        files[f'temp{core + 2}_input'] = str(40000 + core * 500)
+    ec = os.path.join(root, 'hwmon1')
+    os.makedirs(ec)
+    ec_files = {'name': 'acer', 'temp2_input': '55000', 'temp3_input': '50000'}
+    for fan in range(fans):
+        ec_files[f'fan{fan + 1}_input'] = str(2000 + fan * 100)
+    for directory, content in ((coretemp, files), (ec, ec_files)):
+        for name, value in content.items():
+            with open(os.path.join(directory, name), 'w') as f:
+                f.write(value + '\n')
+    return root
+
+
+class _NBFCSocketHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        request = b''
+        while not request.endswith(SOCKET_END):
+            chunk = self.request.recv(65536)
+            if not chunk:
+                return
+            request += chunk
+        message = json.loads(request[:-len(SOCKET_END)])
+        backend = self.server.backend
+        if message.get('Command') == 'status':
+            response = {'Fans': [{'Name': fan['name'], 'CurrentSpeed': fan['speed'],
+                                  'TargetSpeed': fan['target']} for fan in backend.get_status()]}
+        elif message.get('Command') == 'set-fan-speed' and message.get('Fan', 0) < len(backend.fans):
+            backend.set_speeds({message.get('Fan'): message['Speed']})
+            response = {'Status': 'OK'}
+        else:
+            response = {'Error': 'Invalid command'}
+        self.request.sendall(json.dumps(response).encode() + SOCKET_END)
+
+
+class FakeSocketService(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """nbfc-linux socket protocol served from a FakeBackend, in a background thread"""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, backend: FakeBackend):
+        super().__init__(path, _NBFCSocketHandler)
+        self.backend = backend
+        self.path = path
+
+    def start(self) -> 'FakeSocketService':
+        threading.Thread(target=self.serve_forever, name='nbfc-socket', daemon=True).start()
+        return self
+
+    def close(self) -> None:
+        """Stop serving and remove the socket (a second call does nothing)"""
+        self.shutdown()
+        self.server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def make_controller(sysfs_root=None, sensors_dump=None, fans: int = 2) -> NBFCController:
+    """A controller wired to fake sources: a sysfs tree, or a canned `sensors` output"""
+    controller = NBFCController()
+    controller.hwmon.close()
+    controller.hwmon = HwmonReader(root=sysfs_root or os.devnull, thermal_root=os.devnull)
+    if sysfs_root:
+        controller.hwmon.open()
+    controller.run_command = lambda cmd: sensors_dump if cmd[0] == 'sensors' else None
+    controller.nbfc = NBFCClient(backends=[FakeBackend([f'Fan {i}' for i in range(fans)])])
+    controller.fan_writes = FanWritePipeline(controller.nbfc, metrics=controller.metrics)
+    controller.telemetry = TelemetryEncoder(output=_NullOutput())
+    controller.set_mode(True)
+    return controller
+
+
+def command_flood(count: int = 10000, structured: bool = False):
+    """Mixed UI commands, shaped like a user dragging the speed slider; JSON requests with ids if structured"""
+    commands = []
+    for i in range(count):
+        kind = i % 10
+        if kind < 6:
+            cmd, args = 'set_all_fans_speed', [20 + i % 80]
+        elif kind < 8:
+            cmd, args = 'set_fan_speed', [i % 2, 30 + i % 70]
+        elif kind == 8:
+            cmd, args = 'set_mode', ['dynamic' if i % 20 == 8 else 'fixed']
+        else:
+            cmd, args = 'apply_profile', [('Silent', 'Balanced', 'Turbo')[i % 3]]
+        if structured:
+            commands.append(json.dumps({'id': i, 'cmd': cmd, 'args': args}) + '\n')
+        else:
+            commands.append(' '.join([cmd] + [str(arg) for arg in args]) + '\n')
+    return commands
+
+
+def measure(func, number: int, repeat: int = 7, ops: int = 1):
+    """Time per operation in microseconds (ops per call): best and median of repeat runs"""
+    runs = sorted(timeit.repeat(func, number=number, repeat=repeat))
+    scale = 1e6 / (number * ops)
+    return {'us': round(runs[0] * scale, 3),
+            'median_us': round(runs[len(runs) // 2] * scale, 3),
+            'number': number * ops}
+
+
+def build_cases(workdir: str):
+    """(name, callable, calls per run, operations per call) for every case"""
+    cases = []
+
+    # Analyse de la sortie de `sensors` et `nbfc status -a`: taille réaliste et extrême
+    for label, cores, chips in (('realistic', 8, 4), ('extreme', 128, 64)):
+        dump = make_sensors_dump(cores, chips)
+        cases.append((f'parse_sensors_{label}', lambda dump=dump: parse_sensors_output(dump),
+                      max(20, 20000 // (cores + chips * 5)), 1))
+    for label, fans in (('realistic', 2), ('extreme', 64)):
+        dump = make_nbfc_dump(fans)
+        cases.append((f'parse_nbfc_{label}', lambda dump=dump: parse_nbfc_status(dump),
+                      max(50, 10000 // fans), 1))
+
+    # Tick complet: lecture des sources simulées, filtrage, courbes et trame
+    sysfs = make_sysfs(os.path.join(workdir, 'hwmon'))
+    controller = make_controller(sysfs_root=sysfs)
+    cases.append(('get_fan_status_sysfs', controller.get_fan_status, 2000, 1))
+    cases.append(('tick_sysfs', controller.tick, 2000, 1))
+    subprocess_controller = make_controller(sensors_dump=make_sensors_dump(8, 4))
+    cases.append(('tick_sensors_subprocess', subprocess_controller.tick, 1000, 1))
+    big_sysfs = make_sysfs(os.path.join(workdir, 'hwmon_big'), cores=128, fans=8)
+    big_controller = make_controller(sysfs_root=big_sysfs, fans=8)
+    cases.append(('tick_sysfs_extreme', big_controller.tick, 200, 1))
+
+    # Lecture de l'état de NBFC par son socket Unix, sans fork (objectif: moins de 1 ms)
+    socket_path = os.path.join(workdir, 'nbfc_service.socket')
+    # Service dans un thread démon: il s'arrête avec le processus, son socket avec workdir
+    FakeSocketService(socket_path, FakeBackend()).start()
+    socket_client = NBFCClient(backends=[SocketBackend([socket_path])])
+    cases.append(('nbfc_status_socket', socket_client.get_status, 500, 1))
+
+    # Sérialisation de la trame: trame complète historique, deltas JSON et msgpack. Mêmes
+    # ticks et même chemin (TelemetryEncoder.encode, jusqu'aux octets) pour chaque encodage:
+    # l'écart entre legacy et delta est le coût du calcul des deltas, contre moins d'octets
+    ticks = make_ticks(count=500)
+    encodings = ('legacy', 'json', 'msgpack') if msgpack is not None else ('legacy', 'json')
+    for encoding in encodings:
+        encoder = TelemetryEncoder(encoding=encoding, output=_NullOutput())
+        state = {'index': 0}
+
+        def encode(encoder=encoder, state=state):
+            encoder.encode(ticks[state['index'] % len(ticks)])
+            state['index'] += 1
+        cases.append(('serialize_legacy_json' if encoding == 'legacy' else f'serialize_delta_{encoding}',
+                      encode, 500, 1))
+
+    # Rafale de 10 000 commandes: coût par commande de la réception à l'exécution (file vidée
+    # toutes les 64 commandes comme entre deux échantillons), écritures coalescées
+    flood_controller = make_controller(sysfs_root=sysfs)
+    flood_controller.fan_writes.inline = False
+    for name, structured in (('handle_command_flood', False), ('handle_command_flood_json', True)):
+        flood = command_flood(structured=structured)
+
+        def run_flood(flood=flood):
+            for i, command in enumerate(flood, 1):
+                handle_command(flood_controller, command)
+                if i % 64 == 0:
+                    flood_controller.apply_commands()
+            flood_controller.apply_commands()
+            flood_controller.fan_writes.flush()
+        cases.append((name, run_flood, 1, len(flood)))
+    return cases
+
+
+def run_suite(selected=None, repeat: int = 7):
+    workdir = tempfile.mkdtemp(prefix='nbfc-bench-')
+    try:
+        results = {}
+        for name, func, number, ops in build_cases(workdir):
+            if selected and not any(pattern in name for pattern in selected):
+                continue
+            func()  # warm-up
+            results[name] = measure(func, number, repeat, ops)
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def machine_info():
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'system': platform.system(),
+        'cpus': os.cpu_count(),
+        'msgpack': msgpack is not None
+    }
+
+
+def compare(results, baseline, tolerance: float):
+    """(name, current, baseline, ratio, status) per case; status is ok, regression, faster or new"""
+    rows = []
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            rows.append((name, result['us'], None, None, 'new'))
+            continue
+        ratio = result['us'] / base['us'] if base['us'] else 1.0
+        status = 'regression' if ratio > 1 + tolerance else 'faster' if ratio < 1 - tolerance else 'ok'
+        rows.append((name, result['us'], base['us'], ratio, status))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend hot-path benchmark suite")
+    parser.add_argument('cases', nargs='*', help="only run cases whose name contains one of these")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline to compare against")
+    parser.add_argument('--update-baseline', action='store_true', help="store the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help="allowed slowdown before a case counts as a regression (default 30%%)")
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    report = {
+        'version': SUITE_VERSION,
+        'timestamp': time.time(),
+        'machine': machine_info(),
+        'results': run_suite(args.cases, args.repeat)
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    baseline = None
+    # Référence enregistrée sur une autre machine (CPU, Python, msgpack...): comparée pour
+    # information seulement, jamais un échec
+    enforce = True
+    if not args.update_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('machine') != report['machine']:
+            enforce = False
+            print(f"warning: baseline recorded on {baseline.get('machine')}, not this machine: "
+                  f"regressions are reported but not enforced (record one here with --update-baseline)",
+                  file=sys.stderr)
+
+    regressions = 0
+    print(f"{'case':<30}{'us':>12}{'baseline':>12}{'ratio':>8}  status")
+    rows = compare(report['results'], baseline or {}, args.tolerance) if baseline else \
+        [(name, result['us'], None, None, '') for name, result in report['results'].items()]
+    for name, current, base, ratio, status in rows:
+        regressions += status == 'regression'
+        print(f"{name:<30}{current:>12.2f}{f'{base:.2f}' if base is not None else '-':>12}"
+              f"{f'{ratio:.2f}' if ratio is not None else '-':>8}  {status}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"baseline written to {args.baseline}")
+    elif regressions:
+        print(f"{regressions} case(s) regressed by more than {args.tolerance:.0%}", file=sys.stderr)
+        if enforce:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Command channel
+Parses the command lines of the frontend (or of a socket client) into requests and
+keeps them in a bounded queue that the control loop drains between ticks.
+A JSON request with an id is acked on receipt and answered with a result once
+applied; a batch runs in order within one drain. Speed commands answer "applied" once
+NBFC confirmed the write and "queued" while the write pipeline still holds it. Plain
+text lines such as `set_mode dynamic` are still accepted, without ack or result
+"""
+
+import json
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+# Commandes en attente au plus; une requête groupée compte pour chacune de ses commandes
+QUEUE_SIZE = 256
+# Commandes au plus dans une requête groupée
+MAX_BATCH = 64
+
+# Identifiant d'une requête JSON illisible, pour lui répondre malgré tout
+ID_RE = re.compile(r'"id"\s*:\s*(-?\d+|"(?:[^"\\]|\\.)*")')
+
+
+class CommandError(ValueError):
+    """Malformed request, unknown command or missing arguments"""
+
+    def __init__(self, message: str, request_id: Any = None):
+        super().__init__(message)
+        self.request_id = request_id
+
+
+class Request:
+    """One received line: its commands, its id (None: no reply), receipt time and reply target"""
+
+    __slots__ = ('request_id', 'commands', 'batch', 'received', 'reply_to')
+
+    def __init__(self, request_id: Any, commands: List[Tuple[str, List]], batch: bool = False,
+                 reply_to=None):
+        self.request_id = request_id
+        self.commands = commands
+        self.batch = batch
+        self.received = time.perf_counter()
+        # Client du socket qui a envoyé la requête (mode sans interface), None sur stdio
+        self.reply_to = reply_to
+
+
+def _parse_command(item, request_id: Any) -> Tuple[str, List]:
+    if not isinstance(item, dict) or not isinstance(item.get('cmd'), str):
+        raise CommandError("a command needs a 'cmd' string", request_id)
+    args = item.get('args', [])
+    return item['cmd'], args if isinstance(args, list) else [args]
+
+
+def _salvage_id(line: str) -> Any:
+    """The id of a request that is not valid JSON, if it can still be found"""
+    match = ID_RE.search(line)
+    if match is None:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+
+def parse_request(line: str, reply_to=None) -> Optional[Request]:
+    """
+    Parse one line: {"id": 1, "cmd": "set_fan_speed", "args": [0, 50]},
+    {"id": 2, "batch": [{"cmd": ...}, ...]} or a whitespace-split text command.
+    None for a blank line; raises CommandError, with the request id when known
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if not line.startswith('{'):
+        parts = line.split()
+        return Request(None, [(parts[0], parts[1:])], reply_to=reply_to)
+
+    try:
+        message = json.loads(line)
+    except ValueError as e:
+        raise CommandError(f"invalid JSON: {e}", _salvage_id(line)) from None
+    if not isinstance(message, dict):
+        raise CommandError("a request must be a JSON object")
+    request_id = message.get('id')
+    if 'batch' not in message:
+        return Request(request_id, [_parse_command(message, request_id)], reply_to=reply_to)
+    batch = message['batch']
+    if not isinstance(batch, list) or not batch:
+        raise CommandError("batch must be a non-empty list", request_id)
+    if len(batch) > MAX_BATCH:
+        raise CommandError(f"batch larger than {MAX_BATCH} commands", request_id)
+    return Request(request_id, [_parse_command(item, request_id) for item in batch],
+                   batch=True, reply_to=reply_to)
+
+
+class CommandQueue:
+    """Bounded FIFO of requests, filled by the command readers and drained by the control loop"""
+
+    def __init__(self, size: int = QUEUE_SIZE):
+        self.size = size
+        self.requests = deque()
+        self.pending = 0
+        # Remplie depuis le thread stdin, vidée par la boucle de contrôle
+        self.lock = threading.Lock()
+        self.received = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return self.pending
+
+    def put(self, request: Request) -> bool:
+        """Queue a request, or refuse it whole if its commands do not fit. Never blocks"""
+        count = len(request.commands)
+        with self.lock:
+            if self.pending + count > self.size:
+                self.rejected += count
+                return False
+            self.requests.append(request)
+            self.pending += count
+            self.received += count
+        return True
+
+    def take(self) -> List[Request]:
+        """Remove and return everything queued, oldest first"""
+        if not self.pending:
+            return []
+        with self.lock:
+            requests = list(self.requests)
+            self.requests.clear()
+            self.pending = 0
+        return requests
+
+    def get_stats(self) -> Dict:
+        return {'pending': self.pending, 'received': self.received, 'rejected': self.rejected}
+
+
+def ack(request_id: Any, queued: int) -> Dict:
+    return {'type': 'ack', 'id': request_id, 'ok': True, 'queued': queued}
+
+
+def error(request_id: Any, message: str) -> Dict:
+    """Negative ack: the request was not queued"""
+    return {'type': 'ack', 'id': request_id, 'ok': False, 'error': message}
+
+
+def result(request: Request, outcomes: List[Tuple[bool, Any]], queue_seconds: float) -> Dict:
+    """Reply once a request was applied: one outcome, or one per command of a batch"""
+    replies = [{'ok': True, 'result': value} if ok else {'ok': False, 'error': value}
+               for ok, value in outcomes]
+    message = {'type': 'result', 'id': request.request_id, 'ok': all(ok for ok, _ in outcomes),
+               'queue_ms': round(queue_seconds * 1000, 3)}
+    if request.batch:
+        message['results'] = replies
+    else:
+        message.update(replies[0])
+    return message
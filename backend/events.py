@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Thermal event detector
+Watches the per-tick sample stream for threshold crossings (with hysteresis),
+sustained high temperatures, fan stalls and sensor dropouts. Each sample costs O(1)
+per channel against preallocated state; events are appended to a compact binary log
+and returned to the controller, which pushes them on the telemetry stream
+"""
+
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+from model import SensorModel
+
+# Types d'événements, dans l'ordre de leur code dans le journal
+EVENT_TYPES = ('threshold', 'sustained', 'fan_stall', 'dropout')
+THRESHOLD, SUSTAINED, FAN_STALL, DROPOUT = range(len(EVENT_TYPES))
+
+EVENT_MAGIC = b'NFCEVT01'
+# time, type, state (1: start, 0: end), value, channel name (UTF-8, null-padded)
+EVENT_RECORD = struct.Struct('<dBBf16s')
+# Au-delà, le journal passe en .1 et un nouveau commence (environ 35 000 événements)
+MAX_LOG_BYTES = 1 << 20
+
+
+def default_events_path() -> str:
+    """Event log location under $XDG_DATA_HOME"""
+    data_home = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    return os.path.join(data_home, 'nitro-fan-control', 'events.log')
+
+
+class EventLog:
+    """Append-only file of fixed-size event records, rotated once it reaches max_bytes"""
+
+    def __init__(self, path: str, max_bytes: int = MAX_LOG_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.fd = -1
+        self._open()
+
+    def _open(self) -> None:
+        self.fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        size = os.fstat(self.fd).st_size
+        if size and os.pread(self.fd, len(EVENT_MAGIC), 0) != EVENT_MAGIC:
+            # Fichier d'un autre format: le garder de côté plutôt que l'écraser
+            os.close(self.fd)
+            os.replace(self.path, self.path + '.1')
+            self.fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            size = 0
+        if not size:
+            os.write(self.fd, EVENT_MAGIC)
+            size = len(EVENT_MAGIC)
+        partial = (size - len(EVENT_MAGIC)) % EVENT_RECORD.size
+        if partial:
+            # Enregistrement interrompu (arrêt brutal): le retirer
+            os.ftruncate(self.fd, size - partial)
+            size -= partial
+        self.size = size
+
+    def append(self, timestamp: float, event_type: int, state: int, value: float, channel: str) -> None:
+        record = EVENT_RECORD.pack(timestamp, event_type, state, value, channel.encode()[:16])
+        if self.size + len(record) > self.max_bytes:
+            os.close(self.fd)
+            os.replace(self.path, self.path + '.1')
+            self._open()
+        # Un seul write en O_APPEND: jamais d'enregistrement entrelacé
+        os.write(self.fd, record)
+        self.size += len(record)
+
+    def read(self, limit: int = 100) -> List[Dict]:
+        """The last limit events, oldest first"""
+        count = min(limit, (self.size - len(EVENT_MAGIC)) // EVENT_RECORD.size)
+        data = os.pread(self.fd, count * EVENT_RECORD.size, self.size - count * EVENT_RECORD.size)
+        return [event_message(timestamp, event_type, state, value, channel.rstrip(b'\0').decode(errors='replace'))
+                for timestamp, event_type, state, value, channel in EVENT_RECORD.iter_unpack(data)]
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def open_event_log(path: Optional[str] = None) -> Optional[EventLog]:
+    """Open the event log, returning None (events only pushed, not kept) if it cannot be created"""
+    path = path or default_events_path()
+    try:
+        return EventLog(path)
+    except OSError as e:
+        print(f"Event log disabled, cannot open {path}: {e}", file=sys.stderr)
+        return None
+
+
+def event_message(timestamp: float, event_type: int, state: int, value: float, channel: str) -> Dict:
+    """Telemetry message for one event"""
+    return {
+        'type': 'event',
+        'event': EVENT_TYPES[event_type],
+        'state': 'start' if state else 'end',
+        'channel': channel,
+        'value': round(value, 1),
+        'time': timestamp
+    }
+
+
+class EventDetector:
+    """
+    Incremental detector over a SensorModel sample.
+    Channel layout: [named sources..., fan temperatures...], plus one stall slot per fan.
+    Threshold and sustained events watch the fan temperatures; dropouts every channel
+    that had a reading before; stalls every fan whose tachometer reported an RPM before
+    """
+
+    def __init__(self, threshold: float = 85.0, hysteresis: float = 5.0, sustained_level: float = 80.0,
+                 sustained_time: float = 30.0, stall_time: float = 5.0, confirm: int = 2,
+                 log: Optional[EventLog] = None, wall_clock=time.time):
+        self.threshold = threshold
+        self.hysteresis = hysteresis
+        self.sustained_level = sustained_level
+        self.sustained_time = sustained_time
+        self.stall_time = stall_time
+        # Échantillons consécutifs avant d'annoncer un franchissement ou une perte de capteur
+        self.confirm = confirm
+        self.log = log
+        self.wall_clock = wall_clock
+        self.layout = (0, 0)
+        self.names: List[str] = []
+        self.counts = [0] * len(EVENT_TYPES)
+        self.active = 0
+        self._resize(0, 0)
+
+    def _resize(self, sources: int, fans: int) -> None:
+        size = sources + fans
+        self.layout = (sources, fans)
+        self.seen = bytearray(size)
+        self.misses = array('i', bytes(4 * size))
+        self.lost = bytearray(size)
+        self.over = array('i', bytes(4 * fans))
+        self.above = bytearray(fans)
+        self.rising = bytearray(fans)
+        self.rising_since = array('d', bytes(8 * fans))
+        self.sustained = bytearray(fans)
+        self.rpm_seen = bytearray(fans)
+        self.stalling = bytearray(fans)
+        self.stalling_since = array('d', bytes(8 * fans))
+        self.stalled = bytearray(fans)
+
+    def _end_active(self, events: Optional[List[Dict]]) -> Optional[List[Dict]]:
+        """End every condition still active, before the channel layout changes"""
+        sources, fans = self.layout
+        for i in range(sources + fans):
+            if self.lost[i]:
+                events = self._emit(events, DROPOUT, 0, self.names[i], 0.0)
+        for j in range(fans):
+            name = self.names[sources + j]
+            if self.above[j]:
+                events = self._emit(events, THRESHOLD, 0, name, 0.0)
+            if self.sustained[j]:
+                events = self._emit(events, SUSTAINED, 0, name, 0.0)
+            if self.stalled[j]:
+                events = self._emit(events, FAN_STALL, 0, name, 0.0)
+        return events
+
+    def _emit(self, events: Optional[List[Dict]], event_type: int, state: int, channel: str,
+              value: float) -> List[Dict]:
+        timestamp = self.wall_clock()
+        self.counts[event_type] += state
+        self.active += 1 if state else -1
+        if self.log is not None:
+            try:
+                self.log.append(timestamp, event_type, state, value, channel)
+            except OSError as e:
+                print(f"Cannot write event log: {e}", file=sys.stderr)
+        if events is None:
+            events = []
+        events.append(event_message(timestamp, event_type, state, value, channel))
+        return events
+
+    def _presence(self, i: int, value: float, events: Optional[List[Dict]]) -> Optional[List[Dict]]:
+        """Dropout tracking of channel i; returns the (possibly new) event list"""
+        if value > 0:
+            self.seen[i] = 1
+            self.misses[i] = 0
+            if self.lost[i]:
+                self.lost[i] = 0
+                events = self._emit(events, DROPOUT, 0, self.names[i], value)
+        elif self.seen[i] and not self.lost[i]:
+            self.misses[i] += 1
+            if self.misses[i] >= self.confirm:
+                self.lost[i] = 1
+                events = self._emit(events, DROPOUT, 1, self.names[i], 0.0)
+        return events
+
+    def run(self, model: SensorModel, now: float) -> Sequence[Dict]:
+        """
+        Check one raw sample (before filtering and before a missing RPM is derived from
+        the speed); now is a monotonic time in seconds. Returns the events it raised
+        """
+        fans = model.fans
+        temps = model.temps
+        sources = len(temps)
+        events = None
+        if self.layout != (sources, len(fans)):
+            # Nouvelle source ou nouveau ventilateur: clore ce qui était en cours, puis
+            # repartir d'un état vierge
+            events = self._end_active(events)
+            self.active = 0
+            self._resize(sources, len(fans))
+            self.names = list(model.sources) + [fan.name for fan in fans]
+
+        seen, misses, lost = self.seen, self.misses, self.lost
+        for i in range(sources):
+            value = temps[i]
+            # Cas courant sans appel: lecture présente, rien en attente sur ce canal
+            if value > 0 and seen[i] and not misses[i] and not lost[i]:
+                continue
+            if value > 0 or seen[i]:
+                events = self._presence(i, value, events)
+
+        low = self.threshold - self.hysteresis
+        sustained_low = self.sustained_level - self.hysteresis
+        for j, fan in enumerate(fans):
+            value = fan.temperature
+            i = sources + j
+            if not (value > 0 and seen[i] and not misses[i] and not lost[i]) and (value > 0 or seen[i]):
+                events = self._presence(i, value, events)
+            if value > 0:
+                # Franchissement du seuil: confirmé sur plusieurs échantillons, levé sous seuil - hystérésis
+                if self.above[j]:
+                    if value < low:
+                        self.above[j] = 0
+                        events = self._emit(events, THRESHOLD, 0, fan.name, value)
+                elif value >= self.threshold:
+                    self.over[j] += 1
+                    if self.over[j] >= self.confirm:
+                        self.above[j] = 1
+                        self.over[j] = 0
+                        events = self._emit(events, THRESHOLD, 1, fan.name, value)
+                else:
+                    self.over[j] = 0
+
+                # Température élevée pendant au moins sustained_time secondes
+                if value >= self.sustained_level:
+                    if not self.rising[j]:
+                        self.rising[j] = 1
+                        self.rising_since[j] = now
+                    elif not self.sustained[j] and now - self.rising_since[j] >= self.sustained_time:
+                        self.sustained[j] = 1
+                        events = self._emit(events, SUSTAINED, 1, fan.name, value)
+                elif value < sustained_low:
+                    self.rising[j] = 0
+                    if self.sustained[j]:
+                        self.sustained[j] = 0
+                        events = self._emit(events, SUSTAINED, 0, fan.name, value)
+
+            # Calage: tachymètre à 0 alors qu'une vitesse est demandée, sur un ventilateur qui
+            # a déjà rapporté un régime (sinon le régime n'est simplement pas lu). Le régime
+            # déduit de la vitesse ne compte pas: il n'est jamais nul quand la vitesse ne l'est pas
+            rpm = fan.measured_rpm
+            if rpm is None or (rpm == 0 and fan.speed <= 0):
+                # Tachymètre perdu ou ventilateur arrêté sur demande: le calage n'a plus lieu d'être
+                self.stalling[j] = 0
+                if self.stalled[j]:
+                    self.stalled[j] = 0
+                    events = self._emit(events, FAN_STALL, 0, fan.name, 0.0)
+            elif rpm > 0:
+                self.rpm_seen[j] = 1
+                self.stalling[j] = 0
+                if self.stalled[j]:
+                    self.stalled[j] = 0
+                    events = self._emit(events, FAN_STALL, 0, fan.name, rpm)
+            elif fan.speed > 0 and self.rpm_seen[j]:
+                if not self.stalling[j]:
+                    self.stalling[j] = 1
+                    self.stalling_since[j] = now
+                elif not self.stalled[j] and now - self.stalling_since[j] >= self.stall_time:
+                    self.stalled[j] = 1
+                    events = self._emit(events, FAN_STALL, 1, fan.name, fan.speed)
+
+        return events or ()
+
+    def recent(self, limit: int = 100) -> List[Dict]:
+        """Last events from the log (empty without a log)"""
+        return self.log.read(limit) if self.log is not None else []
+
+    def get_stats(self) -> Dict:
+        """Conditions currently active and events started since startup, per type"""
+        stats = dict(zip(EVENT_TYPES, self.counts))
+        stats['active'] = self.active
+        return stats
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Table-driven fan curve engine
+Per-fan piecewise-linear curves precomputed into lookup tables, with separate
+rising/falling hysteresis bands and rate limits on speed changes
+"""
+
+import json
+import os
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Lookup table range and resolution (°C)
+LUT_MIN_TEMP = 0.0
+LUT_MAX_TEMP = 120.0
+LUT_STEP = 0.1
+
+# Historical `calculate_dynamic_speed` ladder expressed as a piecewise-linear curve
+DEFAULT_POINTS = [(34.9, 0), (35, 20), (39.9, 20), (40, 30), (50, 60), (60, 90), (70, 100)]
+
+# Aggregated sensors; a fan can also follow any named temperature source (e.g. "coretemp:Package id 0")
+SENSORS = ('max', 'cpu', 'gpu')
+
+
+class CurveConfigError(ValueError):
+    """Raised when a fan curve configuration is invalid"""
+
+
+def default_curves_path() -> str:
+    """Curve configuration location under $XDG_CONFIG_HOME"""
+    config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    return os.path.join(config_home, 'nitro-fan-control', 'curves.json')
+
+
+class FanCurve:
+    """A piecewise-linear temperature -> speed curve backed by a lookup table"""
+
+    def __init__(self, points: Sequence[Tuple[float, float]], name: str = 'curve'):
+        self.name = name
+        self.points = self.validate_points(points, name)
+        self.lut = self._build_lut()
+
+    @staticmethod
+    def validate_points(points, name: str) -> List[Tuple[float, float]]:
+        try:
+            points = [(float(temp), float(speed)) for temp, speed in points]
+        except (TypeError, ValueError):
+            raise CurveConfigError(f"Curve '{name}': points must be [temperature, speed] pairs")
+        if len(points) < 2:
+            raise CurveConfigError(f"Curve '{name}': at least two points are required")
+        for (t1, _), (t2, _) in zip(points, points[1:]):
+            if t2 <= t1:
+                raise CurveConfigError(f"Curve '{name}': temperatures must be strictly increasing")
+        for temp, speed in points:
+            if not 0 <= speed <= 100:
+                raise CurveConfigError(f"Curve '{name}': speed {speed} at {temp}°C is outside 0-100")
+            if not LUT_MIN_TEMP <= temp <= LUT_MAX_TEMP:
+                raise CurveConfigError(f"Curve '{name}': temperature {temp} is outside "
+                                       f"{LUT_MIN_TEMP}-{LUT_MAX_TEMP}°C")
+        return points
+
+    def _interpolate(self, temp: float) -> float:
+        points = self.points
+        if temp <= points[0][0]:
+            return points[0][1]
+        for (t1, s1), (t2, s2) in zip(points, points[1:]):
+            if temp <= t2:
+                return s1 + (s2 - s1) * (temp - t1) / (t2 - t1)
+        return points[-1][1]
+
+    def _build_lut(self) -> array:
+        size = int(round((LUT_MAX_TEMP - LUT_MIN_TEMP) / LUT_STEP)) + 1
+        return array('d', (self._interpolate(LUT_MIN_TEMP + i * LUT_STEP) for i in range(size)))
+
+    def evaluate(self, temp: float) -> float:
+        """Speed for one temperature, from the lookup table"""
+        index = int((temp - LUT_MIN_TEMP) / LUT_STEP + 0.5)
+        if index < 0:
+            index = 0
+        elif index >= len(self.lut):
+            index = len(self.lut) - 1
+        return self.lut[index]
+
+    def evaluate_many(self, temps: Sequence[float]):
+        """Speeds for many temperatures at once (numpy array if numpy is available)"""
+        if numpy is not None:
+            indices = numpy.rint((numpy.asarray(temps, dtype=float) - LUT_MIN_TEMP) / LUT_STEP)
+            indices = numpy.clip(indices, 0, len(self.lut) - 1).astype(numpy.intp)
+            return numpy.frombuffer(self.lut, dtype=numpy.float64)[indices]
+        lut = self.lut
+        last = len(lut) - 1
+        scale = 1 / LUT_STEP
+        return array('d', (lut[min(last, max(0, int((t - LUT_MIN_TEMP) * scale + 0.5)))] for t in temps))
+
+
+class FanCurveController:
+    """Applies a curve to one fan with hysteresis, rate limiting and a minimum change"""
+
+    def __init__(self, curve: FanCurve, sensor: str = 'max', hysteresis_up: float = 0.0,
+                 hysteresis_down: float = 3.0, rate_up: float = 100.0, rate_down: float = 10.0,
+                 min_change: float = 5.0):
+        self.curve = curve
+        self.sensor = sensor
+        self.hysteresis_up = hysteresis_up  # °C
+        self.hysteresis_down = hysteresis_down  # °C
+        self.rate_up = rate_up  # % per second
+        self.rate_down = rate_down  # % per second
+        self.min_change = min_change  # %
+        self.speed: Optional[float] = None  # speed the curve is tracking
+        self.applied: Optional[float] = None  # last speed actually written
+        self.last_time: Optional[float] = None
+
+    def step(self, temp: float, now: float) -> float:
+        """Advance the controller to a new temperature reading and return the tracked speed"""
+        rising = self.curve.evaluate(temp - self.hysteresis_up)
+        falling = self.curve.evaluate(temp + self.hysteresis_down)
+        if self.speed is None:
+            self.speed = rising
+            self.last_time = now
+            return self.speed
+
+        # Bande morte: la vitesse ne monte que si la courbe décalée vers le haut l'exige,
+        # et ne descend que lorsque la température est passée sous la bande de descente
+        if rising > self.speed:
+            target = rising
+        elif falling < self.speed:
+            target = falling
+        else:
+            target = self.speed
+
+        dt = max(0.0, now - self.last_time)
+        self.last_time = now
+        if target > self.speed:
+            self.speed = min(target, self.speed + self.rate_up * dt)
+        elif target < self.speed:
+            self.speed = max(target, self.speed - self.rate_down * dt)
+        return self.speed
+
+    def pending_write(self) -> Optional[float]:
+        """Speed to write if it differs enough from the last written value, else None"""
+        if self.speed is None:
+            return None
+        if self.applied is None or abs(self.speed - self.applied) >= self.min_change \
+                or (self.speed in (0.0, 100.0) and self.speed != self.applied):
+            return self.speed
+        return None
+
+
+class CurveEngine:
+    """All fan curve controllers, keyed by fan index"""
+
+    def __init__(self, controllers: Optional[Dict[int, FanCurveController]] = None,
+                 default_curve: Optional[FanCurve] = None):
+        self.default_curve = default_curve or FanCurve(DEFAULT_POINTS, 'default')
+        if controllers is None:
+            controllers = {
+                0: FanCurveController(self.default_curve),
+                1: FanCurveController(self.default_curve)
+            }
+        self.controllers = controllers
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'CurveEngine':
+        """
+        Build an engine from a config dict, validating everything up front:
+        {"curves": {"name": [[temp, speed], ...]},
+         "fans": {"0": {"curve": "name", "sensor": "max|cpu|gpu|<source>",
+                        "hysteresis": {"up": 0, "down": 3},
+                        "rate_limit": {"up": 100, "down": 10}, "min_change": 5}}}
+        """
+        if not isinstance(config, dict):
+            raise CurveConfigError("Curve configuration must be an object")
+        curves_config = config.get('curves', {})
+        if not isinstance(curves_config, dict):
+            raise CurveConfigError("'curves' must be an object of name -> points")
+        curves = {'default': FanCurve(DEFAULT_POINTS, 'default')}
+        for name, points in curves_config.items():
+            curves[name] = FanCurve(points, name)
+
+        fans_config = config.get('fans', {'0': {}, '1': {}})
+        if not isinstance(fans_config, dict) or not fans_config:
+            raise CurveConfigError("'fans' must be a non-empty object of fan index -> settings")
+        controllers = {}
+        for fan_id, settings in fans_config.items():
+            try:
+                fan_index = int(fan_id)
+            except ValueError:
+                raise CurveConfigError(f"Invalid fan index: {fan_id}")
+            controllers[fan_index] = cls._controller_from_config(fan_index, settings, curves)
+        return cls(controllers, curves['default'])
+
+    @staticmethod
+    def _controller_from_config(fan_index: int, settings: Dict, curves: Dict) -> FanCurveController:
+        if not isinstance(settings, dict):
+            raise CurveConfigError(f"Fan {fan_index}: settings must be an object")
+        curve_name = settings.get('curve', 'default')
+        if curve_name not in curves:
+            raise CurveConfigError(f"Fan {fan_index}: unknown curve '{curve_name}'")
+        sensor = settings.get('sensor', 'max')
+        if not isinstance(sensor, str) or not sensor:
+            raise CurveConfigError(f"Fan {fan_index}: sensor must be one of {', '.join(SENSORS)} "
+                                   f"or a temperature source name")
+        hysteresis = settings.get('hysteresis', {})
+        rate_limit = settings.get('rate_limit', {})
+        try:
+            values = {
+                'hysteresis_up': float(hysteresis.get('up', 0.0)),
+                'hysteresis_down': float(hysteresis.get('down', 3.0)),
+                'rate_up': float(rate_limit.get('up', 100.0)),
+                'rate_down': float(rate_limit.get('down', 10.0)),
+                'min_change': float(settings.get('min_change', 5.0))
+            }
+        except (AttributeError, TypeError, ValueError):
+            raise CurveConfigError(f"Fan {fan_index}: hysteresis, rate_limit and min_change must be numbers")
+        if any(value < 0 for value in values.values()):
+            raise CurveConfigError(f"Fan {fan_index}: hysteresis, rate_limit and min_change must be >= 0")
+        return FanCurveController(curves[curve_name], sensor, **values)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'CurveEngine':
+        """Load the engine from a JSON file, or the default curves if the file does not exist"""
+        path = path or default_curves_path()
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, 'r') as f:
+                config = json.load(f)
+        except OSError as e:
+            raise CurveConfigError(f"{path}: cannot read: {e}")
+        except ValueError as e:
+            raise CurveConfigError(f"{path}: invalid JSON: {e}")
+        return cls.from_config(config)
+
+    def update(self, temperatures: Dict[str, float], now: float) -> Dict[int, float]:
+        """
+        Step every fan with the current temperatures ({'cpu': .., 'gpu': .., source: ..})
+        and return the {fan_index: speed} writes that are due. 'max' is the hotter of cpu
+        and gpu; a fan mapped to a source without a reading falls back to it
+        """
+        if not temperatures:
+            return {}
+        aggregated = [temperatures[sensor] for sensor in ('cpu', 'gpu') if sensor in temperatures]
+        highest = max(aggregated) if aggregated else max(temperatures.values())
+        writes = {}
+        for fan_index, controller in self.controllers.items():
+            temp = highest if controller.sensor == 'max' else temperatures.get(controller.sensor, highest)
+            controller.step(temp, now)
+            speed = controller.pending_write()
+            if speed is not None:
+                writes[fan_index] = speed
+        return writes
+
+    def ensure_fans(self, count: int) -> None:
+        """Add default-curve controllers for fans the configuration does not mention"""
+        for fan_index in range(count):
+            if fan_index not in self.controllers:
+                self.controllers[fan_index] = FanCurveController(self.default_curve)
+
+    def mark_applied(self, writes: Dict[int, Optional[float]]) -> None:
+        """Record the speeds the fans were confirmed to run at (None: unknown, write again)"""
+        for fan_index, speed in writes.items():
+            self.controllers[fan_index].applied = speed
+
+    def reset(self) -> None:
+        """Forget the tracked state, e.g. when leaving manual mode"""
+        for controller in self.controllers.values():
+            controller.speed = controller.applied = controller.last_time = None
+
+    def evaluate_batch(self, temps_by_fan: Dict[int, Sequence[float]]) -> Dict[int, Sequence[float]]:
+        """Raw curve speeds for many temperatures per fan in one call (no hysteresis or rate limit)"""
+        return {
+            fan_index: self.controllers[fan_index].curve.evaluate_many(temps)
+            for fan_index, temps in temps_by_fan.items()
+        }
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Fan write pipeline
+Coalesces speed requests per fan, skips writes equal to the last applied value and
+applies at most N writes per second through the NBFC client. A batch NBFC rejects
+goes back to the pending writes and is retried after RETRY_DELAY
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Seconds before retrying a batch NBFC rejected
+RETRY_DELAY = 1.0
+
+
+class FanWritePipeline:
+    """Latest-wins write buffer in front of an NBFCClient"""
+
+    def __init__(self, client, max_writes_per_second: float = 4.0,
+                 clock: Callable[[], float] = time.monotonic, metrics=None):
+        self.client = client
+        self.metrics = metrics
+        self.max_writes_per_second = max_writes_per_second
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        # Ordre d'insertion conservé: une écriture globale (None) passe avant les écritures par ventilateur
+        self.pending: Dict[Optional[int], float] = {}
+        # Réception de la commande en cours d'exécution (None: écriture décidée par la boucle)
+        self.origin: Optional[float] = None
+        # Réception de la commande à l'origine de chaque écriture en attente (latence commande -> NBFC)
+        self.origins: Dict[Optional[int], float] = {}
+        # Dernières vitesses appliquées: globale puis exceptions par ventilateur
+        self.applied_all: Optional[float] = None
+        self.applied: Dict[int, float] = {}
+        self.next_write_time = 0.0
+        # Serialise les écritures: un seul appel au client à la fois
+        self.write_lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+        # True tant que personne d'autre (thread ou boucle asyncio) n'applique les écritures
+        self.inline = True
+        # Appelé après chaque demande quand un autre que l'appelant applique les écritures
+        self.notify: Optional[Callable[[], None]] = None
+        self.requested = 0
+        self.applied_count = 0
+        self.coalesced = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.retried = 0
+
+    def submit(self, fan_index: Optional[int], speed: float) -> bool:
+        """Request a speed, None as fan index meaning every fan. Never blocks on NBFC"""
+        with self.condition:
+            self.requested += 1
+            if fan_index is None:
+                # Une écriture globale remplace tout ce qui est encore en attente
+                self.coalesced += len(self.pending)
+                self.pending.clear()
+                self.origins.clear()
+            elif fan_index in self.pending:
+                if self.pending[fan_index] == speed:
+                    # Même demande déjà en attente (courbe qui la redemande): rien à fusionner
+                    return True
+                self.coalesced += 1
+            self.pending[fan_index] = speed
+            if self.origin is not None:
+                self.origins[fan_index] = self.origin
+            else:
+                self.origins.pop(fan_index, None)
+            self.condition.notify()
+            notify = self.notify
+        if notify is not None:
+            notify()
+        return True
+
+    def confirmed(self, fan_index: Optional[int]) -> Optional[float]:
+        """Last speed NBFC accepted for a fan (None as index: for every fan), None if unknown"""
+        with self.lock:
+            return self._last_applied(fan_index)
+
+    def confirmed_speeds(self, fan_indices) -> Dict[int, Optional[float]]:
+        """confirmed() for several fans under one lock"""
+        with self.lock:
+            return {fan_index: self._last_applied(fan_index) for fan_index in fan_indices}
+
+    def _last_applied(self, fan_index: Optional[int]) -> Optional[float]:
+        if fan_index is None:
+            # La vitesse globale n'est connue que si aucun ventilateur n'a divergé depuis
+            return None if self.applied else self.applied_all
+        return self.applied.get(fan_index, self.applied_all)
+
+    def delay(self) -> Optional[float]:
+        """Seconds until the pending writes may be applied, or None if nothing is pending"""
+        with self.lock:
+            if not self.pending:
+                return None
+            return max(0.0, self.next_write_time - self.clock())
+
+    def _take(self) -> Tuple[Dict[Optional[int], float], List[float]]:
+        """Remove the pending writes that change something, with their commands' receipt times (lock held)"""
+        batch = {}
+        origins = []
+        for fan_index, speed in self.pending.items():
+            origin = self.origins.get(fan_index)
+            if self._last_applied(fan_index) == speed:
+                self.duplicates += 1
+                # Déjà en place: la commande est appliquée sans écriture
+                if origin is not None and self.metrics is not None:
+                    self.metrics.observe('command_apply', time.perf_counter() - origin)
+            else:
+                batch[fan_index] = speed
+                if origin is not None:
+                    origins.append(origin)
+        self.pending = {}
+        self.origins = {}
+        if batch and self.max_writes_per_second > 0:
+            self.next_write_time = self.clock() + len(batch) / self.max_writes_per_second
+        return batch, origins
+
+    def _requeue(self, batch: Dict[Optional[int], float]) -> None:
+        """Put a rejected batch back, behind nothing newer (lock held)"""
+        for fan_index, speed in batch.items():
+            # Une demande plus récente pour ce ventilateur (ou pour tous) l'emporte
+            if fan_index in self.pending or (None in self.pending and fan_index is not None):
+                continue
+            if fan_index is None:
+                # Écriture globale rejetée: passe avant les demandes par ventilateur arrivées depuis
+                self.pending = {None: speed, **self.pending}
+            else:
+                self.pending[fan_index] = speed
+            self.retried += 1
+        self.next_write_time = max(self.next_write_time, self.clock() + RETRY_DELAY)
+
+    def _record(self, batch: Dict[Optional[int], float]) -> None:
+        """Remember what was written (lock held)"""
+        for fan_index, speed in batch.items():
+            if fan_index is None:
+                self.applied_all = speed
+                self.applied.clear()
+            else:
+                self.applied[fan_index] = speed
+        self.applied_count += len(batch)
+
+    def flush(self) -> bool:
+        """
+        Apply the pending writes now if the rate limit allows it. Returns False on write
+        failure; the failed writes stay pending and are retried after RETRY_DELAY
+        """
+        with self.write_lock:
+            with self.lock:
+                if not self.pending or self.clock() < self.next_write_time:
+                    return True
+                batch, origins = self._take()
+            if not batch:
+                return True
+            start = time.perf_counter()
+            for fan_index, speed in batch.items():
+                self.client.queue_fan_speed(fan_index, speed)
+            ok = self.client.flush()
+            if self.metrics is not None:
+                end = time.perf_counter()
+                self.metrics.observe('fan_write', end - start)
+                if ok:
+                    # De la réception de la commande à l'écriture effective par NBFC
+                    for origin in origins:
+                        self.metrics.observe('command_apply', end - origin)
+            with self.lock:
+                if ok:
+                    self._record(batch)
+                else:
+                    self.failed += len(batch)
+                    self._requeue(batch)
+            return ok
+
+    def invalidate(self) -> None:
+        """Forget the applied speeds, e.g. after the NBFC service restarted"""
+        with self.lock:
+            self.applied_all = None
+            self.applied.clear()
+
+    def start(self) -> None:
+        """Apply writes from a background thread instead of the caller's"""
+        if self.running:
+            return
+        self.running = True
+        self.inline = False
+        self.thread = threading.Thread(target=self._run, name='fan-writes', daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread after applying what is pending"""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.inline = True
+        self.flush()
+
+    def hand_off(self, notify: Optional[Callable[[], None]]) -> None:
+        """
+        Let another applier (e.g. an asyncio task) flush the writes: submit() calls notify
+        instead of the caller flushing. None takes the writes back inline
+        """
+        with self.lock:
+            self.notify = notify
+            self.inline = notify is None
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                # Attendre la fin de la fenêtre du limiteur: les demandes suivantes fusionnent
+                wait = self.next_write_time - self.clock()
+                if wait > 0:
+                    self.condition.wait(wait)
+                    continue
+            self.flush()
+
+    def get_stats(self) -> Dict:
+        """Requested, applied and dropped write counts"""
+        with self.lock:
+            return {
+                'requested': self.requested,
+                'applied': self.applied_count,
+                'coalesced': self.coalesced,
+                'duplicates': self.duplicates,
+                'dropped': self.coalesced + self.duplicates,
+                'failed': self.failed,
+                'retried': self.retried,
+                'pending': len(self.pending)
+            }
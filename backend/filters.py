@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Signal filtering stage
+Denoises one sample vector per tick (every temperature source, fan temperature and
+fan RPM) with a pluggable filter. Missing readings are flagged, never invented: the
+filter state skips them and the value stays 0 for that tick
+"""
+
+from array import array
+from typing import Dict, Optional
+
+from model import SensorModel
+
+
+class SignalFilter:
+    """Identity filter; subclasses keep one state slot per channel of the vector"""
+
+    name = 'none'
+
+    def __init__(self):
+        self.size = 0
+
+    def resize(self, size: int) -> None:
+        """Start over with size channels (the vector layout changed)"""
+        self.size = size
+
+    def apply(self, values: array, valid: bytearray) -> None:
+        """Filter values in place; channels whose valid byte is 0 are left untouched"""
+
+
+class EMAFilter(SignalFilter):
+    """Exponential moving average: y = alpha * x + (1 - alpha) * y"""
+
+    name = 'ema'
+
+    def __init__(self, alpha: float = 0.7):
+        super().__init__()
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.state = array('d')
+        self.primed = bytearray()
+
+    def resize(self, size: int) -> None:
+        super().resize(size)
+        self.state = array('d', bytes(8 * size))
+        self.primed = bytearray(size)
+
+    def apply(self, values: array, valid: bytearray) -> None:
+        alpha = self.alpha
+        keep = 1.0 - alpha
+        state, primed = self.state, self.primed
+        for i in range(self.size):
+            if not valid[i]:
+                continue
+            if primed[i]:
+                state[i] = values[i] = alpha * values[i] + keep * state[i]
+            else:
+                state[i] = values[i]
+                primed[i] = 1
+
+
+class MedianFilter(SignalFilter):
+    """Median of the last window valid readings per channel: rejects isolated spikes"""
+
+    name = 'median'
+
+    def __init__(self, window: int = 5):
+        super().__init__()
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        # Une fenêtre circulaire par canal, à la suite dans un seul array
+        self.samples = array('d')
+        self.heads = array('i')
+        self.counts = array('i')
+
+    def resize(self, size: int) -> None:
+        super().resize(size)
+        self.samples = array('d', bytes(8 * size * self.window))
+        self.heads = array('i', bytes(4 * size))
+        self.counts = array('i', bytes(4 * size))
+
+    def apply(self, values: array, valid: bytearray) -> None:
+        window = self.window
+        samples, heads, counts = self.samples, self.heads, self.counts
+        for i in range(self.size):
+            if not valid[i]:
+                continue
+            base = i * window
+            samples[base + heads[i]] = values[i]
+            heads[i] = (heads[i] + 1) % window
+            if counts[i] < window:
+                counts[i] += 1
+            count = counts[i]
+            ordered = sorted(samples[base:base + count])
+            middle = count // 2
+            values[i] = ordered[middle] if count % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+class KalmanFilter(SignalFilter):
+    """
+    Scalar Kalman filter per channel on a random-walk model. Only the ratio of process
+    to measurement noise matters (the estimate variance starts at the measurement
+    noise), so the same settings suit temperatures and RPMs. A missing reading runs
+    the prediction step only: the next reading is trusted more
+    """
+
+    name = 'kalman'
+
+    def __init__(self, process_noise: float = 0.05, measurement_noise: float = 1.0):
+        super().__init__()
+        if process_noise <= 0 or measurement_noise <= 0:
+            raise ValueError("noise variances must be positive")
+        self.q = process_noise / measurement_noise
+        self.estimate = array('d')
+        self.variance = array('d')
+
+    def resize(self, size: int) -> None:
+        super().resize(size)
+        self.estimate = array('d', bytes(8 * size))
+        # Variance relative au bruit de mesure; 0 = canal pas encore initialisé
+        self.variance = array('d', bytes(8 * size))
+
+    def apply(self, values: array, valid: bytearray) -> None:
+        q = self.q
+        estimate, variance = self.estimate, self.variance
+        for i in range(self.size):
+            p = variance[i]
+            if not valid[i]:
+                if p:
+                    variance[i] = p + q
+                continue
+            if not p:
+                estimate[i] = values[i]
+                variance[i] = 1.0
+                continue
+            p += q
+            gain = p / (p + 1.0)
+            estimate[i] = values[i] = estimate[i] + gain * (values[i] - estimate[i])
+            variance[i] = (1.0 - gain) * p
+
+
+# Lectures manquantes d'un ventilateur, indexées par (température absente) * 2 + (RPM absent)
+MISSING = ((), ('rpm',), ('temperature',), ('temperature', 'rpm'))
+
+FILTERS = {
+    'none': SignalFilter,
+    'ema': EMAFilter,
+    'median': MedianFilter,
+    'kalman': KalmanFilter
+}
+
+
+def create_filter(name: str) -> SignalFilter:
+    """Filter by name with its default settings"""
+    try:
+        return FILTERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown filter {name!r}: expected one of {', '.join(FILTERS)}") from None
+
+
+class FilterStage:
+    """
+    Gather a SensorModel sample into one vector, filter it and write it back.
+    Layout: [named sources..., fan temperatures..., fan RPMs...]; a reading of 0 is missing,
+    except the RPM of a fan running at 0 % or read as 0 by its tachometer (stopped or stalled)
+    """
+
+    def __init__(self, signal_filter: Optional[SignalFilter] = None):
+        self.filter = signal_filter or EMAFilter()
+        self.values = array('d')
+        self.valid = bytearray()
+        # Canaux déjà vus valides: un manque sur l'un d'eux est une perte de capteur
+        self.seen = bytearray()
+        # Ventilateurs à l'arrêt ce tick: leur 0 RPM est une vraie lecture
+        self.stopped = bytearray()
+        self.layout = (0, 0)
+        self.missing = 0
+        self.dropouts = 0
+
+    def _resize(self, sources: int, fans: int) -> None:
+        size = sources + 2 * fans
+        self.values = array('d', bytes(8 * size))
+        self.valid = bytearray(size)
+        self.seen = bytearray(size)
+        self.stopped = bytearray(size)
+        self.layout = (sources, fans)
+        self.filter.resize(size)
+
+    def set_filter(self, signal_filter: SignalFilter) -> None:
+        """Switch to another filter; its state starts over on the next sample"""
+        if signal_filter is not self.filter:
+            self.filter = signal_filter
+            self.layout = (0, 0)
+            self.filter.resize(0)
+
+    def run(self, model: SensorModel) -> None:
+        """Filter the current sample of model in place and flag the missing readings"""
+        fans = model.fans
+        sources = len(model.temps)
+        if self.layout != (sources, len(fans)):
+            # Nouvelle source ou nouveau ventilateur: les positions changent, repartir de zéro
+            self._resize(sources, len(fans))
+        values, valid, seen, stopped = self.values, self.valid, self.seen, self.stopped
+        fan_count = len(fans)
+
+        temps = model.temps
+        for i in range(sources):
+            values[i] = temps[i]
+        for j, fan in enumerate(fans):
+            values[sources + j] = fan.temperature
+            values[sources + fan_count + j] = fan.rpm
+            stopped[sources + fan_count + j] = fan.speed == 0 or fan.measured_rpm == 0
+        for i in range(len(values)):
+            ok = values[i] > 0 or stopped[i]
+            if ok:
+                seen[i] = 1
+            else:
+                self.missing += 1
+                if valid[i]:
+                    # Perte de capteur: comptée une fois, au passage de présent à absent
+                    self.dropouts += 1
+            valid[i] = ok
+
+        self.filter.apply(values, valid)
+
+        for i in range(sources):
+            temps[i] = values[i]
+        for j, fan in enumerate(fans):
+            fan.temperature = values[sources + j]
+            fan.rpm = int(values[sources + fan_count + j])
+            fan.missing = MISSING[(not valid[sources + j]) * 2 + (not valid[sources + fan_count + j])]
+
+    def dropped_out(self, fan_index: int) -> bool:
+        """True if this fan's temperature is missing now but was read before"""
+        sources, fans = self.layout
+        i = sources + fan_index
+        return fan_index < fans and not self.valid[i] and bool(self.seen[i])
+
+    def get_stats(self) -> Dict:
+        return {'filter': self.filter.name, 'missing': self.missing, 'dropouts': self.dropouts}
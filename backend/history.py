@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+On-disk telemetry history
+Fixed-size memory-mapped ring file with 1 s, 1 min and 1 h rollup tiers (min/avg/max).
+Records must stay in time order for the binary search of query(): sample times come
+from the monotonic clock anchored to the wall clock at open, and never go backwards
+"""
+
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# cpu_load/gpu_load en pourcentage (ajustement du modèle thermique du mode prédictif)
+CHANNELS = ('cpu_temp', 'gpu_temp', 'cpu_rpm', 'gpu_rpm', 'fan_speed', 'cpu_load', 'gpu_load')
+
+# (name, resolution in seconds, capacity in records)
+DEFAULT_TIERS = (
+    ('1s', 1, 3 * 86400),   # 3 days
+    ('1m', 60, 90 * 1440),  # 90 days
+    ('1h', 3600, 5 * 8760)  # 5 years
+)
+
+MAGIC = b'NFCHIST1'
+# magic, channel count, tier count
+FILE_HEADER = struct.Struct('<8sII')
+# resolution, capacity, head (next slot), count
+TIER_HEADER = struct.Struct('<IIII')
+
+
+def default_history_path() -> str:
+    """History file location under $XDG_DATA_HOME"""
+    data_home = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    return os.path.join(data_home, 'nitro-fan-control', 'history.ring')
+
+
+class _Tier:
+    """One rollup tier: a ring of fixed-size records plus the bucket being accumulated"""
+
+    def __init__(self, name: str, resolution: int, capacity: int, header_offset: int,
+                 data_offset: int, record: struct.Struct, channels: int):
+        self.name = name
+        self.resolution = resolution
+        self.capacity = capacity
+        self.header_offset = header_offset
+        self.data_offset = data_offset
+        self.record = record
+        self.head = 0
+        self.count = 0
+        # Bucket en cours: début, nombre d'échantillons, puis min/somme/max par canal
+        self.bucket_start = None
+        self.bucket_count = 0
+        self.mins = array('d', [0.0] * channels)
+        self.sums = array('d', [0.0] * channels)
+        self.maxs = array('d', [0.0] * channels)
+
+
+class TelemetryHistory:
+    """Append samples in O(1) and query them back at 1 s, 1 min or 1 h resolution"""
+
+    def __init__(self, path: str, channels: Sequence[str] = CHANNELS, tiers=DEFAULT_TIERS):
+        self.path = path
+        self.channels = tuple(channels)
+        # start time, sample count, then min/avg/max per channel
+        self.record = struct.Struct('<dI' + 'fff' * len(self.channels))
+
+        offset = FILE_HEADER.size + TIER_HEADER.size * len(tiers)
+        self.tiers: List[_Tier] = []
+        for index, (name, resolution, capacity) in enumerate(tiers):
+            header_offset = FILE_HEADER.size + TIER_HEADER.size * index
+            self.tiers.append(_Tier(name, resolution, capacity, header_offset, offset,
+                                    self.record, len(self.channels)))
+            offset += self.record.size * capacity
+        self.size = offset
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self.fd).st_size != self.size:
+            os.ftruncate(self.fd, 0)
+            os.ftruncate(self.fd, self.size)
+        self.map = mmap.mmap(self.fd, self.size)
+        self._load_header()
+
+        # Dernier instant enregistré: aucun échantillon ne peut le précéder
+        self.last_time = max((self._time_at(tier, tier.count - 1) for tier in self.tiers if tier.count),
+                             default=0.0)
+        wall, monotonic = time.time(), time.monotonic()
+        # Horloge murale reculée depuis la dernière exécution: reprendre après le dernier enregistrement
+        self.wall_base = max(wall, self.last_time) - monotonic
+
+    def _load_header(self) -> None:
+        magic, channels, tier_count = FILE_HEADER.unpack_from(self.map, 0)
+        layout_ok = magic == MAGIC and channels == len(self.channels) and tier_count == len(self.tiers)
+        if layout_ok:
+            for tier in self.tiers:
+                resolution, capacity, head, count = TIER_HEADER.unpack_from(self.map, tier.header_offset)
+                if resolution != tier.resolution or capacity != tier.capacity or head >= capacity:
+                    layout_ok = False
+                    break
+                tier.head, tier.count = head, min(count, capacity)
+        if not layout_ok:
+            # Nouveau fichier ou disposition différente: repartir d'un historique vide
+            FILE_HEADER.pack_into(self.map, 0, MAGIC, len(self.channels), len(self.tiers))
+            for tier in self.tiers:
+                tier.head = tier.count = 0
+                self._store_tier_header(tier)
+
+    def _store_tier_header(self, tier: _Tier) -> None:
+        TIER_HEADER.pack_into(self.map, tier.header_offset, tier.resolution, tier.capacity,
+                              tier.head, tier.count)
+
+    def now(self) -> float:
+        """Epoch time for a new sample: wall clock at open plus monotonic time since, unaffected by clock steps"""
+        return self.wall_base + time.monotonic()
+
+    def append(self, timestamp: float, values: Sequence[float]) -> None:
+        """
+        Add one sample (one value per channel) to every tier. A timestamp older than the
+        last sample is clamped to it, so the records stay sorted
+        """
+        if timestamp < self.last_time:
+            timestamp = self.last_time
+        self.last_time = timestamp
+        for tier in self.tiers:
+            bucket_start = timestamp - timestamp % tier.resolution
+            if tier.bucket_start != bucket_start:
+                if tier.bucket_count:
+                    self._write_bucket(tier)
+                tier.bucket_count = 0
+                if tier.bucket_start is None:
+                    # Premier échantillon depuis l'ouverture: reprendre le dernier bucket s'il est en cours
+                    self._resume_bucket(tier, bucket_start)
+                tier.bucket_start = bucket_start
+
+            mins, sums, maxs = tier.mins, tier.sums, tier.maxs
+            if tier.bucket_count == 0:
+                for i, value in enumerate(values):
+                    mins[i] = maxs[i] = sums[i] = value
+            else:
+                for i, value in enumerate(values):
+                    if value < mins[i]:
+                        mins[i] = value
+                    if value > maxs[i]:
+                        maxs[i] = value
+                    sums[i] += value
+            tier.bucket_count += 1
+
+    def _write_bucket(self, tier: _Tier) -> None:
+        count = tier.bucket_count
+        fields = []
+        for i in range(len(self.channels)):
+            fields += (tier.mins[i], tier.sums[i] / count, tier.maxs[i])
+        self.record.pack_into(self.map, tier.data_offset + tier.head * self.record.size,
+                              tier.bucket_start, count, *fields)
+        tier.head = (tier.head + 1) % tier.capacity
+        tier.count = min(tier.count + 1, tier.capacity)
+        self._store_tier_header(tier)
+
+    def _resume_bucket(self, tier: _Tier, bucket_start: float) -> None:
+        if not tier.count or self._time_at(tier, tier.count - 1) != bucket_start:
+            return
+        tier.head = (tier.head - 1) % tier.capacity
+        tier.count -= 1
+        fields = self.record.unpack_from(self.map, tier.data_offset + tier.head * self.record.size)
+        tier.bucket_count = fields[1]
+        for i in range(len(self.channels)):
+            tier.mins[i], avg, tier.maxs[i] = fields[2 + 3 * i:5 + 3 * i]
+            tier.sums[i] = avg * tier.bucket_count
+
+    def commit(self) -> None:
+        """Write the partial buckets to the ring; the next sample resumes them"""
+        for tier in self.tiers:
+            if tier.bucket_count:
+                self._write_bucket(tier)
+                tier.bucket_start = None
+                tier.bucket_count = 0
+
+    def flush(self) -> None:
+        """Write the partial buckets and sync the mapping to disk"""
+        self.commit()
+        self.map.flush()
+
+    def close(self) -> None:
+        """Flush and release the mapping"""
+        if self.map.closed:
+            return
+        self.flush()
+        self.map.close()
+        os.close(self.fd)
+
+    def get_tier(self, name: str) -> Optional[_Tier]:
+        return next((tier for tier in self.tiers if tier.name == name), None)
+
+    def _time_at(self, tier: _Tier, index: int) -> float:
+        slot = (tier.head - tier.count + index) % tier.capacity
+        return struct.unpack_from('<d', self.map, tier.data_offset + slot * self.record.size)[0]
+
+    def query(self, tier_name: str, start: float, end: float, limit: int = 5000) -> List[Dict]:
+        """
+        Records of a tier whose bucket starts within [start, end], oldest first.
+        Each record is {'t': start time, 'n': samples, channel: [min, avg, max], ...}
+        """
+        tier = self.get_tier(tier_name)
+        if tier is None:
+            raise ValueError(f"Unknown history tier: {tier_name}")
+        self.commit()
+
+        # Les enregistrements sont chronologiques: recherche dichotomique du premier
+        low, high = 0, tier.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._time_at(tier, middle) < start:
+                low = middle + 1
+            else:
+                high = middle
+
+        results = []
+        size = self.record.size
+        for index in range(low, tier.count):
+            slot = (tier.head - tier.count + index) % tier.capacity
+            fields = self.record.unpack_from(self.map, tier.data_offset + slot * size)
+            if fields[0] > end or len(results) >= limit:
+                break
+            entry = {'t': fields[0], 'n': fields[1]}
+            for i, channel in enumerate(self.channels):
+                entry[channel] = [round(value, 2) for value in fields[2 + 3 * i:5 + 3 * i]]
+            results.append(entry)
+        return results
+
+    def __del__(self):
+        if hasattr(self, 'map'):
+            self.close()
+
+
+def open_history(path: Optional[str] = None) -> Optional[TelemetryHistory]:
+    """Open the history file, returning None (history disabled) if it cannot be created"""
+    path = path or default_history_path()
+    try:
+        return TelemetryHistory(path)
+    except OSError as e:
+        print(f"History disabled, cannot open {path}: {e}", file=sys.stderr)
+        return None
+
+
+def parse_range(args: List[str], now: float) -> Tuple[str, float, float]:
+    """
+    Parse `history [tier] [start] [end]` arguments, in epoch seconds.
+    Negative or zero bounds are relative to now; the default range is the last hour
+    """
+    tier = args[0] if args else '1m'
+    start = float(args[1]) if len(args) > 1 else -3600.0
+    end = float(args[2]) if len(args) > 2 else 0.0
+    if start <= 0:
+        start += now
+    if end <= 0:
+        end += now
+    return tier, start, end
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Direct sysfs/hwmon sensor reader
+Reads temperatures and fan RPMs from /sys/class/hwmon without forking `sensors`
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+HWMON_ROOT = '/sys/class/hwmon'
+THERMAL_ROOT = '/sys/class/thermal'
+
+# hwmon drivers reporting CPU package/core temperatures
+CPU_CHIPS = ('coretemp', 'k10temp', 'zenpower', 'cpu_thermal')
+# hwmon drivers reporting GPU temperatures
+GPU_CHIPS = ('amdgpu', 'radeon', 'nouveau', 'nvidia', 'i915', 'xe')
+
+
+def _read_text(path: str) -> Optional[str]:
+    """Read a small sysfs attribute once, returning None if it is unavailable"""
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class HwmonInput:
+    """One open sysfs input file (temp*_input or fan*_input)"""
+
+    __slots__ = ('chip', 'kind', 'index', 'label', 'path', 'fd')
+
+    def __init__(self, chip: str, kind: str, index: int, label: str, path: str, fd: int):
+        self.chip = chip
+        self.kind = kind
+        self.index = index
+        self.label = label
+        self.path = path
+        self.fd = fd
+
+    def read(self) -> Optional[int]:
+        """Re-read the raw integer value with pread, without reopening the file"""
+        try:
+            raw = os.pread(self.fd, 32, 0)
+        except OSError:
+            # Some drivers return EIO/ENODATA while the device is suspended
+            return None
+        try:
+            return int(raw)
+        except ValueError:
+            return None
+
+
+class HwmonReader:
+    """Discover hwmon inputs once and re-read them cheaply on every tick"""
+
+    def __init__(self, root: str = HWMON_ROOT, thermal_root: str = THERMAL_ROOT):
+        self.root = root
+        self.thermal_root = thermal_root
+        self.inputs: List[HwmonInput] = []
+        self.thermal_zones: List[HwmonInput] = []
+        self.opened = False
+
+    def open(self) -> bool:
+        """Scan the hwmon tree and keep the input files open. Returns True if any input was found"""
+        self.close()
+        try:
+            entries = sorted(os.listdir(self.root), key=self._hwmon_sort_key)
+        except OSError:
+            entries = []
+
+        for entry in entries:
+            chip_dir = os.path.join(self.root, entry)
+            chip = _read_text(os.path.join(chip_dir, 'name')) or entry
+            try:
+                files = os.listdir(chip_dir)
+            except OSError:
+                continue
+            for filename in sorted(files, key=self._input_sort_key):
+                kind, index = self._parse_input_name(filename)
+                if kind is None:
+                    continue
+                label = _read_text(os.path.join(chip_dir, f'{kind}{index}_label')) or f'{kind}{index}'
+                hw_input = self._open_input(chip, kind, index, label, os.path.join(chip_dir, filename))
+                if hw_input is not None:
+                    self.inputs.append(hw_input)
+
+        # Thermal zones are only used when hwmon has no CPU/GPU temperature
+        for zone in (0, 1):
+            path = os.path.join(self.thermal_root, f'thermal_zone{zone}', 'temp')
+            hw_input = self._open_input(f'thermal_zone{zone}', 'temp', zone, f'thermal_zone{zone}', path)
+            if hw_input is not None:
+                self.thermal_zones.append(hw_input)
+
+        self.opened = True
+        return bool(self.inputs)
+
+    def layout(self) -> Dict[str, List[List]]:
+        """The discovered inputs as plain lists, to be cached and reopened without a scan"""
+        return {
+            'inputs': [[i.chip, i.kind, i.index, i.label, i.path] for i in self.inputs],
+            'thermal_zones': [[i.chip, i.kind, i.index, i.label, i.path] for i in self.thermal_zones]
+        }
+
+    def open_layout(self, layout: Dict[str, List[List]]) -> bool:
+        """
+        Reopen the inputs of a cached layout without scanning the hwmon tree.
+        Returns False (and keeps nothing open) if any of them is gone
+        """
+        self.close()
+        try:
+            for target, entries in ((self.inputs, layout['inputs']),
+                                    (self.thermal_zones, layout['thermal_zones'])):
+                for chip, kind, index, label, path in entries:
+                    hw_input = self._open_input(chip, kind, index, label, path)
+                    if hw_input is None:
+                        raise OSError(f"{path} is no longer readable")
+                    target.append(hw_input)
+        except (OSError, KeyError, TypeError, ValueError):
+            # hwmonN peut être renuméroté au démarrage: il faut refaire un scan complet
+            self.close()
+            return False
+        self.opened = True
+        return True
+
+    def close(self) -> None:
+        """Close all file descriptors held by the reader"""
+        for hw_input in self.inputs + self.thermal_zones:
+            try:
+                os.close(hw_input.fd)
+            except OSError:
+                pass
+        self.inputs = []
+        self.thermal_zones = []
+        self.opened = False
+
+    def read(self) -> Dict:
+        """
+        Read every input once and return the values the controller needs:
+        cpu_temp, gpu_temp, cpu_fan_rpm, gpu_fan_rpm (0 when unknown), every
+        temperature source as temps ("chip:label" -> °C), every fan as fan_rpms
+        ("fanN" -> RPM, first chip wins) and a sensor_data map formatted like
+        the `sensors` output
+        """
+        cpu_temps = []
+        gpu_temps = []
+        temps = {}
+        fan_rpms = {}
+        sensor_data = {}
+
+        for hw_input in self.inputs:
+            value = hw_input.read()
+            if value is None:
+                continue
+
+            if hw_input.kind == 'fan':
+                sensor_data[hw_input.label] = f'{value} RPM'
+                fan_rpms.setdefault(f'fan{hw_input.index}', value)
+                continue
+
+            temp = value / 1000
+            sensor_data[hw_input.label] = f'{temp:+.1f}°C'
+            temps[f'{hw_input.chip}:{hw_input.label}'] = temp
+            if hw_input.chip in CPU_CHIPS:
+                # coretemp exposes per-core labels, AMD drivers expose Tctl/Tdie
+                if hw_input.label.startswith('Core') or hw_input.label in ('Tctl', 'Tdie'):
+                    cpu_temps.append(temp)
+            elif hw_input.chip in GPU_CHIPS:
+                gpu_temps.append(temp)
+            elif hw_input.label in ('temp2', 'temp3'):
+                # Unlabelled EC inputs, matched the same way as the `sensors` fallback
+                gpu_temps.append(temp)
+
+        cpu_temp = sum(cpu_temps) / len(cpu_temps) if cpu_temps else 0
+        gpu_temp = sum(gpu_temps) / len(gpu_temps) if gpu_temps else 0
+
+        return {
+            'cpu_temp': cpu_temp,
+            'gpu_temp': gpu_temp,
+            'cpu_fan_rpm': fan_rpms.get('fan1', 0),
+            'gpu_fan_rpm': fan_rpms.get('fan2', 0),
+            'temps': temps,
+            'fan_rpms': fan_rpms,
+            'sensor_data': sensor_data
+        }
+
+    def read_thermal_zone(self, zone: int) -> float:
+        """Read /sys/class/thermal/thermal_zone<zone>/temp in °C, 0 if unavailable"""
+        for hw_input in self.thermal_zones:
+            if hw_input.index == zone:
+                value = hw_input.read()
+                return value / 1000 if value is not None else 0
+        return 0
+
+    def _open_input(self, chip: str, kind: str, index: int, label: str, path: str) -> Optional[HwmonInput]:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return None
+        hw_input = HwmonInput(chip, kind, index, label, path, fd)
+        # Drop inputs that cannot be read at all (e.g. disconnected fan headers)
+        if hw_input.read() is None:
+            os.close(fd)
+            return None
+        return hw_input
+
+    @staticmethod
+    def _parse_input_name(filename: str) -> Tuple[Optional[str], int]:
+        for kind in ('temp', 'fan'):
+            if filename.startswith(kind) and filename.endswith('_input'):
+                index = filename[len(kind):-len('_input')]
+                if index.isdigit():
+                    return kind, int(index)
+        return None, 0
+
+    @staticmethod
+    def _hwmon_sort_key(entry: str):
+        suffix = entry[len('hwmon'):]
+        return (0, int(suffix)) if entry.startswith('hwmon') and suffix.isdigit() else (1, entry)
+
+    @staticmethod
+    def _input_sort_key(filename: str):
+        kind, index = HwmonReader._parse_input_name(filename)
+        return (kind or '', index, filename)
+
+    def __del__(self):
+        self.close()
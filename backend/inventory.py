@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Cached hardware inventory
+CPU/GPU models, hwmon layout and fan names discovered on the first start are kept
+on disk and reused as long as the board and the kernel stay the same
+"""
+
+import json
+import os
+import sys
+from typing import Callable, Dict, List, Optional
+
+INVENTORY_VERSION = 1
+DMI_ROOT = '/sys/class/dmi/id'
+# DMI attributes identifying the machine (readable without root)
+DMI_FIELDS = ('sys_vendor', 'product_name', 'product_version', 'board_vendor', 'board_name',
+              'board_version', 'bios_version')
+
+
+def default_inventory_path() -> str:
+    """Inventory cache location under $XDG_CACHE_HOME"""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache_home, 'nitro-fan-control', 'inventory.json')
+
+
+def machine_key(dmi_root: str = DMI_ROOT) -> Dict[str, str]:
+    """DMI board/BIOS identifiers plus the kernel release: the cache is only valid for these"""
+    key = {}
+    for field in DMI_FIELDS:
+        try:
+            with open(os.path.join(dmi_root, field), 'r') as f:
+                key[field] = f.read().strip()
+        except OSError:
+            key[field] = ''
+    key['kernel'] = os.uname().release
+    return key
+
+
+def read_cpu_model(path: str = '/proc/cpuinfo') -> Optional[str]:
+    """CPU model name read straight from /proc/cpuinfo"""
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return None
+
+
+def detect_gpu_model(run_command: Callable[[List[str]], Optional[str]]) -> Optional[str]:
+    """GPU model from `lspci` (only forked when the inventory is not cached)"""
+    gpu_info = run_command(['lspci'])
+    if not gpu_info:
+        return None
+    for line in gpu_info.split('\n'):
+        if 'VGA' in line or '3D controller' in line or 'NVIDIA' in line or 'AMD' in line:
+            # "01:00.0 VGA compatible controller: NVIDIA Corporation ..." -> description
+            return line.split(': ', 1)[1].strip() if ': ' in line else line
+    return None
+
+
+def load_inventory(path: str, key: Dict[str, str]) -> Optional[Dict]:
+    """Return the cached inventory if it was recorded on this machine and kernel, else None"""
+    try:
+        with open(path, 'r') as f:
+            inventory = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(inventory, dict) or inventory.get('version') != INVENTORY_VERSION \
+            or inventory.get('key') != key:
+        return None
+    return inventory
+
+
+def save_inventory(path: str, inventory: Dict) -> bool:
+    """Write the inventory atomically. Returns False if the cache cannot be written"""
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(dict(inventory, version=INVENTORY_VERSION), f, indent=2)
+        os.replace(temp_path, path)
+        return True
+    except OSError as e:
+        print(f"Cannot write hardware inventory {path}: {e}", file=sys.stderr)
+        return False
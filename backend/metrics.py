@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Backend instrumentation
+Per-stage latency histograms and counters, cheap enough to stay on in production,
+exported as a stats message or in the Prometheus text format
+"""
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Optional, Tuple
+
+# Upper bounds of the latency buckets in seconds (10 µs to 5 s, then +Inf)
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                   0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram: O(log buckets) per observation, constant memory"""
+
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (the max for the last bucket)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(LATENCY_BUCKETS[index], self.max) if index < len(LATENCY_BUCKETS) else self.max
+        return self.max
+
+    def summary(self) -> Dict:
+        return {
+            'count': self.count,
+            'mean_ms': round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.quantile(0.5) * 1000, 3),
+            'p99_ms': round(self.quantile(0.99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3)
+        }
+
+
+class Metrics:
+    """Stage histograms and counters shared by the update loop, the commands and the writers"""
+
+    def __init__(self):
+        self.stages: Dict[str, Histogram] = {}
+        # (name, label) -> value; label is None for unlabelled counters
+        self.counters: Dict[Tuple[str, Optional[str]], int] = {}
+        self.start_time = time.time()
+        # Les compteurs sont incrémentés depuis plusieurs threads (stdin, boucle, écritures)
+        self.lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record the duration of one run of a stage"""
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.stages.setdefault(stage, Histogram())
+        # Sans verrou: chaque étape n'est mesurée que par un seul thread à la fois
+        histogram.observe(seconds)
+
+    def incr(self, name: str, value: int = 1, label: Optional[str] = None) -> None:
+        """Add to a counter, optionally broken down by one label (command name...)"""
+        key = (name, label)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def snapshot(self, extra: Optional[Dict[str, int]] = None) -> Dict:
+        """Plain-dict view for the `stats` command"""
+        with self.lock:
+            stages = {name: histogram.summary() for name, histogram in sorted(self.stages.items())}
+            counters = {}
+            for (name, label), value in sorted(self.counters.items(),
+                                               key=lambda item: (item[0][0], item[0][1] or '')):
+                if label is None:
+                    counters[name] = value
+                else:
+                    counters.setdefault(name, {})[label] = value
+        if extra:
+            counters.update(extra)
+        return {'uptime_s': round(time.time() - self.start_time, 1), 'stages': stages, 'counters': counters}
+
+    def prometheus_text(self, extra: Optional[Dict[str, int]] = None, prefix: str = 'nbfc') -> str:
+        """Render everything in the Prometheus text exposition format"""
+        lines = [f'# TYPE {prefix}_stage_seconds histogram']
+        with self.lock:
+            for stage, histogram in sorted(self.stages.items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum!r}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+            counters: Dict[str, list] = {}
+            for (name, label), value in self.counters.items():
+                counters.setdefault(name, []).append((label, value))
+        for name, value in (extra or {}).items():
+            counters.setdefault(name, []).append((None, value))
+
+        for name, samples in sorted(counters.items()):
+            metric = f'{prefix}_{name}_total'
+            lines.append(f'# TYPE {metric} counter')
+            for label, value in sorted(samples, key=lambda sample: sample[0] or ''):
+                if label is None:
+                    lines.append(f'{metric} {value}')
+                else:
+                    lines.append(f'{metric}{{name="{label}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str, extra: Optional[Dict[str, int]] = None) -> bool:
+        """Atomically replace a textfile-collector file. Returns False if it cannot be written"""
+        temp_path = f'{path}.tmp'
+        try:
+            with open(temp_path, 'w') as f:
+                f.write(self.prometheus_text(extra))
+            os.replace(temp_path, path)
+            return True
+        except OSError as e:
+            print(f"Cannot write metrics to {path}: {e}", file=sys.stderr)
+            return False
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Controller data model
+N fans and M temperature sources kept in preallocated records that are updated in
+place every tick, with a sensor -> fan mapping
+"""
+
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Aggregated sources every fan can be mapped to, besides a named temperature source
+# (max is the hotter of cpu and gpu)
+CPU_SENSOR = 'cpu'
+GPU_SENSOR = 'gpu'
+MAX_SENSOR = 'max'
+
+DEFAULT_FAN_NAMES = ('CPU Fan', 'GPU Fan')
+
+
+def default_fan_sensor(index: int) -> str:
+    """Historical mapping: fan 0 follows the CPU, fan 1 the GPU, any other fan the hotter of both"""
+    return (CPU_SENSOR, GPU_SENSOR)[index] if index < 2 else MAX_SENSOR
+
+
+class FanState:
+    """
+    One fan: the latest (filtered) reading and which of its readings are missing.
+    rpm may be derived from the speed; measured_rpm is the tachometer reading of this
+    sample, None without one
+    """
+
+    __slots__ = ('index', 'name', 'sensor', 'speed', 'rpm', 'measured_rpm', 'temperature', 'missing')
+
+    def __init__(self, index: int, name: str, sensor: str):
+        self.index = index
+        self.name = name
+        self.sensor = sensor
+        self.speed = 0.0
+        self.rpm = 0
+        self.measured_rpm: Optional[int] = None
+        self.temperature = 0.0
+        self.missing: Tuple[str, ...] = ()
+
+    def to_dict(self) -> Dict:
+        data = {'name': self.name, 'speed': self.speed, 'rpm': self.rpm, 'temperature': self.temperature}
+        if self.missing:
+            # Lecture absente: valeur à 0, signalée plutôt que remplacée
+            data['missing'] = list(self.missing)
+        return data
+
+
+class SensorModel:
+    """All fans and temperature sources of the machine, reused from one tick to the next"""
+
+    def __init__(self, fan_names: Iterable[str] = DEFAULT_FAN_NAMES,
+                 fan_sensors: Optional[Dict[int, str]] = None):
+        self.fan_sensors = dict(fan_sensors or {})
+        self.fans: List[FanState] = []
+        # Sources de température: noms dans l'ordre de découverte, valeurs dans un array('d')
+        self.sources: List[str] = []
+        self.source_index: Dict[str, int] = {}
+        self.temps = array('d')
+        self.cpu_temp = 0.0
+        self.gpu_temp = 0.0
+        self.sensor_data: Dict[str, str] = {}
+        # Au moins deux ventilateurs: le frontend affiche toujours CPU et GPU
+        names = list(fan_names) or list(DEFAULT_FAN_NAMES)
+        self.ensure_fans(max(2, len(names)), names)
+
+    def ensure_fans(self, count: int, names: Iterable[str] = ()) -> None:
+        """Grow the fan list to count fans (never shrinks: indices stay stable)"""
+        names = list(names)
+        while len(self.fans) < count:
+            index = len(self.fans)
+            name = names[index] if index < len(names) and names[index] else \
+                (DEFAULT_FAN_NAMES[index] if index < 2 else f'Fan {index + 1}')
+            self.fans.append(FanState(index, name, self.fan_sensors.get(index, default_fan_sensor(index))))
+
+    def map_sensor(self, fan_index: int, sensor: str) -> None:
+        """Make a fan follow another temperature source (cpu, gpu, max or a source name)"""
+        self.fan_sensors[fan_index] = sensor
+        if fan_index < len(self.fans):
+            self.fans[fan_index].sensor = sensor
+
+    def begin_sample(self) -> None:
+        """Clear the per-sample readings before filling in a new sample"""
+        for fan in self.fans:
+            fan.speed = 0.0
+            fan.rpm = 0
+            fan.measured_rpm = None
+            fan.temperature = 0.0
+        temps = self.temps
+        for i in range(len(temps)):
+            temps[i] = 0.0
+
+    def set_temperatures(self, temps: Dict[str, float], cpu_temp: float, gpu_temp: float) -> None:
+        """Store this sample's temperatures; sources seen for the first time get a new slot"""
+        self.cpu_temp = cpu_temp
+        self.gpu_temp = gpu_temp
+        for name, value in temps.items():
+            index = self.source_index.get(name)
+            if index is None:
+                index = self.source_index[name] = len(self.sources)
+                self.sources.append(name)
+                self.temps.append(0.0)
+            self.temps[index] = value
+
+    def temperature(self, sensor: str) -> float:
+        """Current value of a mapped source, 0 if it has no reading"""
+        if sensor == CPU_SENSOR:
+            return self.cpu_temp
+        if sensor == GPU_SENSOR:
+            return self.gpu_temp
+        if sensor == MAX_SENSOR:
+            return max(self.cpu_temp, self.gpu_temp)
+        index = self.source_index.get(sensor)
+        return self.temps[index] if index is not None else 0.0
+
+    def temperatures(self) -> Dict[str, float]:
+        """Every source by name, including the cpu/gpu aggregates (0 readings left out)"""
+        values = {name: self.temps[i] for i, name in enumerate(self.sources) if self.temps[i] > 0}
+        if self.cpu_temp > 0:
+            values[CPU_SENSOR] = self.cpu_temp
+        if self.gpu_temp > 0:
+            values[GPU_SENSOR] = self.gpu_temp
+        return values
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+NBFC client layer
+Reads the NBFC service state without forking the `nbfc` CLI whenever possible
+"""
+
+import json
+import os
+import socket
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from parsers import parse_nbfc_status
+
+# nbfc-linux locations (older releases use /var/run, newer ones /run)
+STATE_FILES = ['/run/nbfc_service.state.json', '/var/run/nbfc_service.state.json']
+SOCKET_PATHS = ['/run/nbfc_service.socket', '/var/run/nbfc_service.socket']
+# End-of-message marker of the nbfc-linux socket protocol
+SOCKET_END = b'\nEND\n'
+
+
+def _fans_from_state(state: Dict) -> Optional[List[Dict]]:
+    """
+    Convert the JSON state published by the service into the client fan format.
+    None if the state has no fan list, so that the next backend is tried
+    """
+    fans = state.get('Fans') if isinstance(state, dict) else None
+    if not isinstance(fans, list) or not all(isinstance(fan, dict) for fan in fans):
+        return None
+    return [
+        {
+            'name': fan.get('Name', ''),
+            'speed': fan.get('CurrentSpeed'),
+            'target': fan.get('TargetSpeed')
+        }
+        for fan in fans
+    ]
+
+
+class NBFCBackend:
+    """Base class for the ways of talking to the NBFC service"""
+
+    name = 'base'
+    can_write = False
+    # True if talking to the service forks a process
+    forks = False
+
+    def available(self) -> bool:
+        return False
+
+    def get_status(self) -> Optional[List[Dict]]:
+        """Return the fan list, or None if this backend could not read it"""
+        return None
+
+    def set_speeds(self, speeds: Dict[Optional[int], float]) -> bool:
+        """Apply {fan_index: speed} writes, None as index meaning every fan"""
+        return False
+
+
+class StateFileBackend(NBFCBackend):
+    """Read the state file the nbfc-linux service rewrites on every cycle"""
+
+    name = 'state-file'
+
+    def __init__(self, paths: Optional[List[str]] = None, max_age: float = 5.0):
+        self.paths = paths if paths is not None else STATE_FILES
+        self.max_age = max_age
+        self.path = None
+
+    def available(self) -> bool:
+        if self.path is None:
+            self.path = next((p for p in self.paths if os.path.exists(p)), None)
+        return self.path is not None
+
+    def get_status(self) -> Optional[List[Dict]]:
+        try:
+            # A stale file means the service stopped updating it
+            if time.time() - os.stat(self.path).st_mtime > self.max_age:
+                return None
+            with open(self.path, 'rb') as f:
+                state = json.loads(f.read())
+        except (OSError, ValueError):
+            self.path = None
+            return None
+        return _fans_from_state(state)
+
+
+class SocketBackend(NBFCBackend):
+    """Talk to the nbfc-linux service over its Unix socket"""
+
+    name = 'socket'
+    can_write = True
+
+    def __init__(self, paths: Optional[List[str]] = None, timeout: float = 1.0):
+        self.paths = paths if paths is not None else SOCKET_PATHS
+        self.timeout = timeout
+        self.path = None
+
+    def available(self) -> bool:
+        if self.path is None:
+            self.path = next((p for p in self.paths if os.path.exists(p)), None)
+        return self.path is not None
+
+    def request(self, message: Dict) -> Optional[Dict]:
+        """Send one JSON request and return the decoded response"""
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.path)
+                sock.sendall(json.dumps(message).encode() + SOCKET_END)
+                response = b''
+                while not response.endswith(SOCKET_END):
+                    chunk = sock.recv(65536)
+                    if not chunk:
+                        break
+                    response += chunk
+        except OSError as e:
+            print(f"Error talking to NBFC socket {self.path}: {e}", file=sys.stderr)
+            self.path = None
+            return None
+        try:
+            return json.loads(response[:-len(SOCKET_END)] if response.endswith(SOCKET_END) else response)
+        except ValueError:
+            return None
+
+    def get_status(self) -> Optional[List[Dict]]:
+        response = self.request({'Command': 'status'})
+        if not response or 'Error' in response:
+            return None
+        return _fans_from_state(response)
+
+    def set_speeds(self, speeds: Dict[Optional[int], float]) -> bool:
+        ok = True
+        for fan_index, speed in speeds.items():
+            message = {'Command': 'set-fan-speed', 'Speed': speed}
+            if fan_index is not None:
+                message['Fan'] = fan_index
+            response = self.request(message)
+            ok = ok and response is not None and 'Error' not in response
+        return ok
+
+
+class CLIBackend(NBFCBackend):
+    """Fork the `nbfc` command line tool, used as a last resort"""
+
+    name = 'cli'
+    can_write = True
+    forks = True
+
+    def __init__(self, run_command: Callable[[List[str]], Optional[str]]):
+        self.run_command = run_command
+
+    def available(self) -> bool:
+        return True
+
+    def get_status(self) -> Optional[List[Dict]]:
+        output = self.run_command(['nbfc', 'status', '-a'])
+        if not output:
+            return None
+        return parse_nbfc_status(output)
+
+    def set_speeds(self, speeds: Dict[Optional[int], float]) -> bool:
+        ok = True
+        for fan_index, speed in speeds.items():
+            cmd = ['nbfc', 'set', '-s', str(speed)]
+            if fan_index is not None:
+                cmd = ['nbfc', 'set', '-f', str(fan_index), '-s', str(speed)]
+            ok = self.run_command(cmd) is not None and ok
+        return ok
+
+
+class FakeBackend(NBFCBackend):
+    """In-memory NBFC service, for benchmarks and running without the daemon"""
+
+    name = 'fake'
+    can_write = True
+
+    def __init__(self, fan_names: Optional[List[str]] = None, latency: float = 0.0):
+        self.fans = [
+            {'name': name, 'speed': 0.0, 'target': 0.0}
+            for name in (fan_names or ['CPU Fan', 'GPU Fan'])
+        ]
+        self.latency = latency
+        self.writes = []
+
+    def available(self) -> bool:
+        return True
+
+    def get_status(self) -> Optional[List[Dict]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [dict(fan) for fan in self.fans]
+
+    def set_speeds(self, speeds: Dict[Optional[int], float]) -> bool:
+        if self.latency:
+            time.sleep(self.latency)
+        self.writes.append(dict(speeds))
+        for fan_index, speed in speeds.items():
+            targets = self.fans if fan_index is None else self.fans[fan_index:fan_index + 1]
+            for fan in targets:
+                fan['speed'] = fan['target'] = float(speed)
+        return True
+
+
+class NBFCClient:
+    """Read and write fan speeds through the cheapest NBFC backend available"""
+
+    def __init__(self, run_command: Optional[Callable[[List[str]], Optional[str]]] = None,
+                 backends: Optional[List[NBFCBackend]] = None):
+        if backends is None:
+            backends = [SocketBackend(), StateFileBackend()]
+            if run_command is not None:
+                backends.append(CLIBackend(run_command))
+        self.backends = backends
+        self.pending: Dict[Optional[int], float] = {}
+        self.last_backend = None
+
+    def get_status(self) -> List[Dict]:
+        """Return the fan list from the first backend able to answer"""
+        for backend in self.backends:
+            if not backend.available():
+                continue
+            fans = backend.get_status()
+            if fans is not None:
+                self.last_backend = backend.name
+                return fans
+        return []
+
+    def service_ready(self) -> bool:
+        """True if the service answers through a backend that does not fork (state file, socket)"""
+        for backend in self.backends:
+            if not backend.forks and backend.available() and backend.get_status() is not None:
+                return True
+        return False
+
+    def queue_fan_speed(self, fan_index: Optional[int], speed: float) -> None:
+        """Queue a speed write, None as fan index meaning every fan"""
+        if fan_index is None:
+            # A global write supersedes any per-fan write still pending
+            self.pending.clear()
+        self.pending[fan_index] = speed
+
+    def flush(self) -> bool:
+        """Send every pending write in one batch"""
+        if not self.pending:
+            return True
+        speeds = self.pending
+        self.pending = {}
+        for backend in self.backends:
+            if backend.can_write and backend.available() and backend.set_speeds(speeds):
+                return True
+        return False
+
+    def set_fan_speed(self, fan_index: Optional[int], speed: float) -> bool:
+        """Queue a write and flush it immediately"""
+        self.queue_fan_speed(fan_index, speed)
+        return self.flush()
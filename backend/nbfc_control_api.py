@@ -4,44 +4,115 @@ NBFC Control API for Electron Interface
 Acts as a bridge between the Electron app and NBFC
 """
 
+import argparse
+import atexit
+import asyncio
 import subprocess
 import time
-import json
 import sys
 import os
 import threading
 import signal
-import re
-import random
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+from async_core import AsyncController
+from commands import CommandError, CommandQueue, ack, error, parse_request, result
+from events import EventDetector, default_events_path, open_event_log
+from fan_curve import SENSORS, CurveConfigError, CurveEngine, default_curves_path
+from fan_writes import FanWritePipeline
+from filters import FILTERS, FilterStage, create_filter
+from history import default_history_path, open_history, parse_range
+from hwmon import HwmonReader
+from metrics import Metrics
+from model import SensorModel
+from inventory import (default_inventory_path, detect_gpu_model, load_inventory, machine_key,
+                       read_cpu_model, save_inventory)
+from nbfc_client import NBFCClient
+from parsers import parse_sensors_output
+from processes import ProcessSampler
+from profiles import AUTO_PROFILE, Profile, ProfileConfigError, ProfileEngine, default_profiles_path
+from predictive import FeedForward, ThermalModel, ThermalModelError, default_thermal_model_path
+from scheduler import POLICIES, SamplingScheduler
+from server import TelemetryServer
+from telemetry import ENCODINGS, TelemetryEncoder
 
 class NBFCController:
     def __init__(self, max_rpm: int = 8000):
         self.max_rpm = max_rpm  # Valeur maximale de RPM pour les ventilateurs Nitro
         self.fan_info = {}
         self.dynamic_mode = False
+        # Mode prédictif: les courbes voient la température prévue à partir de la charge
+        self.predictive_mode = False
+        self.feed_forward = FeedForward()
         self.current_profile = "Balanced"
-        self.profiles = {
-            "Silent": {"speed": 20},
-            "Balanced": {"speed": 50},
-            "Turbo": {"speed": 100}
-        }
+        # Profils (vitesse fixe ou courbes) et règles de changement automatique
+        self.profiles = ProfileEngine()
         self.target_speed = 50  # Default speed
+        # Instrumentation: latences par étape et compteurs (commande `stats`, export Prometheus)
+        self.metrics = Metrics()
+        self.metrics_path = None
+        self.metrics_interval = 10.0
+        self.next_metrics_dump = 0.0
+        self.command_timeout = 5.0  # Un processus bloqué ne doit pas figer la boucle
+        self.clock = time.monotonic  # Horloge remplaçable (rejeu de traces plus rapide que le temps réel)
+        # Lecteur sysfs/hwmon: les fichiers sont ouverts une seule fois, par discover_hardware
+        self.hwmon = HwmonReader()
+        # Client NBFC: évite de lancer `nbfc` à chaque lecture ou écriture
+        self.nbfc = NBFCClient(run_command=self.run_command)
+        # Écritures de vitesse fusionnées par ventilateur, dédupliquées et limitées en débit
+        self.fan_writes = FanWritePipeline(self.nbfc, metrics=self.metrics)
+        # Commandes reçues, appliquées par la boucle entre deux échantillons
+        self.commands = CommandQueue()
+        # Ordonnanceur d'échantillonnage (intervalle adaptatif par défaut)
+        self.scheduler = SamplingScheduler()
+        self.hardware = ("Unknown CPU", "Unknown GPU")
+        self.fan_names = ['CPU Fan', 'GPU Fan']
+        # Inventaire matériel mis en cache (None: emplacement par défaut)
+        self.inventory_path = None
+        # Mesure du démarrage: temps jusqu'à la première trame de télémétrie
+        self.start_time = time.perf_counter()
+        self.startup = {'inventory': None, 'first_frame_ms': None}
+        # Encodeur du flux de télémétrie (trames complètes puis deltas)
+        self.telemetry = TelemetryEncoder()
+        # Moteur de courbes de ventilation (courbes par défaut tant que main() n'a rien chargé)
+        self.curves = CurveEngine()
+        # Historique sur disque (désactivé tant que main() ne l'ouvre pas)
+        self.history = None
+        # Ventilateurs et sources de température
+        self.model = SensorModel(self.fan_names)
+        # Filtrage du vecteur d'échantillons (EMA par défaut, comme l'ancien lissage 0.7/0.3)
+        self.filters = FilterStage()
+        # Détecteur d'événements thermiques (journal sur disque ouvert par main())
+        self.events = EventDetector()
+        # Attribution par processus (option --top-processes, désactivée par défaut)
+        self.processes: Optional[ProcessSampler] = None
+        self.last_top_speed = 0.0
         
     def run_command(self, cmd: List[str]) -> Optional[str]:
         """Execute a system command and return the result"""
+        self.metrics.incr('subprocesses', label=cmd[0])
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True,
+                                    timeout=self.command_timeout)
             return result.stdout.strip()
         except subprocess.CalledProcessError as e:
+            self.metrics.incr('subprocess_errors', label=cmd[0])
             print(f"Error executing {' '.join(cmd)}: {e}", file=sys.stderr)
             return None
+        except subprocess.TimeoutExpired:
+            self.metrics.incr('subprocess_timeouts', label=cmd[0])
+            print(f"Timeout executing {' '.join(cmd)}", file=sys.stderr)
+            return None
         except FileNotFoundError:
+            self.metrics.incr('subprocess_errors', label=cmd[0])
             print(f"Command not found: {cmd[0]}", file=sys.stderr)
             return None
     
     def is_service_running(self) -> bool:
         """Check if the NBFC service is running"""
+        # Fichier d'état récent ou socket qui répond: inutile de lancer systemctl
+        if self.nbfc.service_ready():
+            return True
         result = self.run_command(['systemctl', 'is-active', 'nbfc_service'])
         return result == 'active'
     
@@ -49,231 +120,216 @@ class NBFCController:
         """Start the NBFC service"""
         print("Starting NBFC service...")
         result = self.run_command(['sudo', 'systemctl', 'start', 'nbfc_service'])
-        time.sleep(2)  # Wait for the service to start
-        return self.is_service_running()
-    
-    def get_fan_status(self) -> Dict:
-        """Get the status of fans"""
-        # Créer une structure de base pour les ventilateurs
-        fans = {
-            '0': {
-                'name': 'CPU Fan',
-                'speed': 0,
-                'rpm': 0,
-                'temperature': 0
-            },
-            '1': {
-                'name': 'GPU Fan',
-                'speed': 0,
-                'rpm': 0,
-                'temperature': 0
-            }
+        # Le service redémarré n'a plus les vitesses écrites auparavant
+        self.fan_writes.invalidate()
+        return self.wait_for_service()
+    
+    def wait_for_service(self, timeout: float = 5.0) -> bool:
+        """
+        Poll the service until it answers, with exponential backoff.
+        With only the CLI backend, service_ready() never answers: systemctl decides.
+        """
+        deadline = time.monotonic() + timeout
+        delay = 0.05
+        while True:
+            if self.is_service_running():
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 1.0)
+    
+    def read_sensors(self) -> Dict:
+        """Read temperatures and fan RPMs from sysfs/hwmon, falling back to `sensors`"""
+        readings = {
+            'cpu_temp': 0,
+            'gpu_temp': 0,
+            'cpu_fan_rpm': 0,
+            'gpu_fan_rpm': 0,
+            'sensor_data': {}
         }
         
-        # Récupérer les températures et les RPM directement via sensors
-        try:
-            # Récupérer les températures CPU et GPU
-            cpu_temp = 0
-            gpu_temp = 0
-            cpu_fan_rpm = 0
-            gpu_fan_rpm = 0
-            
-            # Essayer d'abord avec sensors
+        # Lire d'abord directement sysfs/hwmon, `sensors` seulement si sysfs n'a rien
+        start = time.perf_counter()
+        if self.hwmon.inputs:
+            readings = self.hwmon.read()
+            self.metrics.observe('hwmon', time.perf_counter() - start)
+        else:
             sensors_output = self.run_command(['sensors'])
+            parse_start = time.perf_counter()
+            self.metrics.observe('sensors', parse_start - start)
             if sensors_output:
-                # Extraire les données des ventilateurs
-                for line in sensors_output.split('\n'):
-                    try:
-                        if 'fan1:' in line and 'RPM' in line:
-                            parts = line.split(':')[1].strip().split()
-                            if parts and parts[0].isdigit():
-                                cpu_fan_rpm = int(parts[0])
-                        
-                        if 'fan2:' in line and 'RPM' in line:
-                            parts = line.split(':')[1].strip().split()
-                            if parts and parts[0].isdigit():
-                                gpu_fan_rpm = int(parts[0])
-                    except (IndexError, ValueError) as e:
-                        print(f"Erreur lors de l'extraction des RPM: {e}", file=sys.stderr)
-                
-                # Rechercher la température du CPU
-                cpu_temps = []
-                for line in sensors_output.split('\n'):
-                    try:
-                        if 'Core' in line and '°C' in line:
-                            parts = line.split('+')
-                            if len(parts) > 1:
-                                temp_parts = parts[1].split('°C')
-                                if temp_parts and temp_parts[0]:
-                                    cpu_temps.append(float(temp_parts[0]))
-                    except (IndexError, ValueError) as e:
-                        continue
-                
-                if cpu_temps:
-                    cpu_temp = sum(cpu_temps) / len(cpu_temps)  # Moyenne des températures des cœurs
-                
-                # Rechercher la température du GPU
-                gpu_temps = []
-                for line in sensors_output.split('\n'):
-                    try:
-                        if ('temp2' in line or 'temp3' in line) and '°C' in line:
-                            parts = line.split('+')
-                            if len(parts) > 1:
-                                temp_parts = parts[1].split('°C')
-                                if temp_parts and temp_parts[0]:
-                                    gpu_temps.append(float(temp_parts[0]))
-                    except (IndexError, ValueError):
-                        continue
-                
-                if gpu_temps:
-                    gpu_temp = sum(gpu_temps) / len(gpu_temps)
-            
-            # Si sensors ne fournit pas les données, essayer d'autres commandes
-            if cpu_temp == 0:
-                try:
-                    cpu_info = self.run_command(['cat', '/sys/class/thermal/thermal_zone0/temp'])
-                    if cpu_info and cpu_info.strip():
-                        cpu_temp = float(cpu_info.strip()) / 1000
-                except Exception as e:
-                    print(f"Erreur lors de la lecture de thermal_zone0: {e}", file=sys.stderr)
-            
-            if gpu_temp == 0:
-                try:
-                    gpu_info = self.run_command(['cat', '/sys/class/thermal/thermal_zone1/temp'])
-                    if gpu_info and gpu_info.strip():
-                        gpu_temp = float(gpu_info.strip()) / 1000
-                except Exception as e:
-                    print(f"Erreur lors de la lecture de thermal_zone1: {e}", file=sys.stderr)
-            
-            # Assigner les températures aux ventilateurs
-            if cpu_temp > 0:
-                fans['0']['temperature'] = cpu_temp
-            
-            if gpu_temp > 0:
-                fans['1']['temperature'] = gpu_temp
-            elif cpu_temp > 0:
-                # Si pas de température GPU, utiliser CPU + une petite variation
-                fans['1']['temperature'] = cpu_temp - 2 + random.random() * 4
-            
-            # Assigner les RPM aux ventilateurs
-            if cpu_fan_rpm > 0:
-                fans['0']['rpm'] = cpu_fan_rpm
-                fans['0']['speed'] = min(100, (cpu_fan_rpm / self.max_rpm) * 100)
-            
-            if gpu_fan_rpm > 0:
-                fans['1']['rpm'] = gpu_fan_rpm
-                fans['1']['speed'] = min(100, (gpu_fan_rpm / self.max_rpm) * 100)
-            
-            # Créer un objet avec toutes les données de sensors pour l'interface
-            sensor_data = {}
-            if sensors_output:  # Vérifier que sensors_output n'est pas None
-                for line in sensors_output.split('\n'):
-                    line = line.strip()
-                    if line and ':' in line and not line.startswith('Adapter'):
-                        try:
-                            key = line.split(':')[0].strip()
-                            value = line.split(':', 1)[1].strip()
-                            sensor_data[key] = value
-                        except Exception as e:
-                            print(f"Erreur lors du parsing de la ligne sensors: {e}", file=sys.stderr)
-                            continue
-            
-            # Ajouter les données de sensors à l'objet fans
-            fans['sensor_data'] = sensor_data
+                # Un seul passage sur la sortie de sensors (RPM, températures et sensor_data)
+                readings = parse_sensors_output(sensors_output)
+                self.metrics.observe('parse', time.perf_counter() - parse_start)
+        
+        return self.apply_thermal_fallback(readings)
+    
+    def apply_thermal_fallback(self, readings: Dict) -> Dict:
+        """Fill missing CPU/GPU temperatures from the thermal zones"""
+        if readings['cpu_temp'] == 0:
+            readings['cpu_temp'] = self.hwmon.read_thermal_zone(0)
+        
+        if readings['gpu_temp'] == 0:
+            readings['gpu_temp'] = self.hwmon.read_thermal_zone(1)
         
+        return readings
+    
+    def get_fan_status(self, sensors: Optional[Dict] = None,
+                       nbfc_fans: Optional[List[Dict]] = None) -> SensorModel:
+        """
+        Get the status of fans, updating the fan records of self.model in place
+        Readings already collected by the caller (e.g. the asyncio core) can be passed in
+        """
+        model = self.model
+        model.begin_sample()
+        
+        # Lire d'abord l'état de NBFC: un ventilateur supplémentaire doit exister avant
+        # de recevoir sa température et son régime
+        try:
+            # Lire l'état du service (fichier d'état, socket, ou `nbfc status -a` en dernier recours)
+            if nbfc_fans is None:
+                start = time.perf_counter()
+                nbfc_fans = self.nbfc.get_status()
+                self.metrics.observe('nbfc_status', time.perf_counter() - start)
+            # Un ventilateur NBFC supplémentaire ajoute un enregistrement au lieu d'écraser le GPU
+            model.ensure_fans(len(nbfc_fans), [nbfc_fan['name'] for nbfc_fan in nbfc_fans])
+            for fan, nbfc_fan in zip(model.fans, nbfc_fans):
+                if nbfc_fan['name']:
+                    fan.name = nbfc_fan['name']
         except Exception as e:
-            print(f"Erreur lors de la récupération des températures: {e}", file=sys.stderr)
+            print(f"Erreur lors de la lecture des données NBFC: {e}", file=sys.stderr)
             import traceback
             traceback.print_exc(file=sys.stderr)
+            nbfc_fans = []
         
-        # Récupérer directement les données de NBFC pour les vitesses des ventilateurs
+        # Récupérer les températures et les RPM (sysfs/hwmon ou sensors)
         try:
-            # Exécuter la commande nbfc status -a et capturer la sortie
-            output = self.run_command(['nbfc', 'status', '-a'])
-            if output:
-                # Variables pour suivre les informations
-                current_fan = None
-                fan_index = -1
-                
-                for line in output.split('\n'):
-                    line = line.strip()
-                    
-                    # Détecter les sections de ventilateurs
-                    if line.startswith('Fan Display Name'):
-                        try:
-                            fan_index += 1
-                            current_fan = str(min(fan_index, 1))  # Limiter à 0 ou 1
-                            fan_name = line.split(':', 1)[1].strip()
-                            fans[current_fan]['name'] = fan_name
-                        except (IndexError, ValueError) as e:
-                            print(f"Erreur lors de l'extraction du nom du ventilateur: {e}", file=sys.stderr)
-                    
-                    # Récupérer la vitesse actuelle du ventilateur
-                    elif line.startswith('Current Fan Speed'):
-                        try:
-                            speed_parts = line.split(':', 1)
-                            if len(speed_parts) > 1:
-                                speed_str = speed_parts[1].strip()
-                                speed = float(speed_str)
-                                if current_fan is not None:
-                                    fans[current_fan]['speed'] = speed
-                                    # Calculer RPM basé sur la vitesse
-                                    rpm = int((speed / 100) * self.max_rpm)
-                                    fans[current_fan]['rpm'] = rpm
-                        except (ValueError, IndexError) as e:
-                            print(f"Erreur lors du calcul des RPM: {e}", file=sys.stderr)
+            if sensors is None:
+                sensors = self.read_sensors()
+            cpu_temp = sensors['cpu_temp']
+            gpu_temp = sensors['gpu_temp']
+            model.set_temperatures(sensors.get('temps', {}), cpu_temp, gpu_temp)
+            
+            # Assigner à chaque ventilateur la température de la source qui lui est associée
+            # (une source absente reste à 0: l'étage de filtrage la signale comme manquante)
+            for fan in model.fans:
+                fan.temperature = model.temperature(fan.sensor)
+            
+            # Assigner les RPM aux ventilateurs: fanN de hwmon/sensors correspond au ventilateur N-1
+            # (un 0 lu sur le tachymètre est une mesure: ventilateur arrêté ou calé)
+            fan_rpms = sensors.get('fan_rpms')
+            if fan_rpms is None:
+                # Ancien format: 0 veut dire « pas de lecture »
+                fan_rpms = {key: rpm for key, rpm in (('fan1', sensors['cpu_fan_rpm']),
+                                                      ('fan2', sensors['gpu_fan_rpm'])) if rpm > 0}
+            for fan in model.fans:
+                rpm = fan_rpms.get(f'fan{fan.index + 1}')
+                if rpm is None:
+                    continue
+                fan.measured_rpm = fan.rpm = rpm
+                if rpm > 0:
+                    fan.speed = min(100, (rpm / self.max_rpm) * 100)
+            
+            model.sensor_data = sensors['sensor_data']
+        
         except Exception as e:
-            print(f"Erreur lors de la lecture des données NBFC: {e}", file=sys.stderr)
+            print(f"Erreur lors de la récupération des températures: {e}", file=sys.stderr)
             import traceback
             traceback.print_exc(file=sys.stderr)
         
-        # Vérifier les données avant de les retourner
-        for fan_id in ['0', '1']:
-            if fan_id not in fans:
-                fans[fan_id] = {
-                    'name': 'CPU Fan' if fan_id == '0' else 'GPU Fan',
-                    'speed': 0,
-                    'rpm': 0,
-                    'temperature': 40.0
-                }
-            else:
-                # S'assurer que toutes les clés nécessaires sont présentes
-                required_keys = ['name', 'speed', 'rpm', 'temperature']
-                for key in required_keys:
-                    if key not in fans[fan_id]:
-                        default_value = 0
-                        if key == 'name':
-                            default_value = 'CPU Fan' if fan_id == '0' else 'GPU Fan'
-                        elif key == 'temperature':
-                            default_value = 40.0
-                        
-                        fans[fan_id][key] = default_value
-        
-        return fans
+        # La vitesse rapportée par NBFC remplace celle déduite du régime
+        for fan, nbfc_fan in zip(model.fans, nbfc_fans):
+            speed = nbfc_fan.get('speed')
+            if speed is not None:
+                fan.speed = speed
+                # RPM déduit de la vitesse seulement sans mesure: un tachymètre à 0
+                # doit rester visible pour la détection de calage
+                if fan.measured_rpm is None:
+                    fan.rpm = int((speed / 100) * self.max_rpm)
+        
+        return model
+    
+    def write_fan_speed(self, fan_id: Optional[int], speed_percent: float) -> bool:
+        """Send a speed write to NBFC, None as fan id meaning every fan"""
+        self.fan_writes.submit(fan_id, speed_percent)
+        if not self.fan_writes.inline:
+            return True
+        # Sans thread d'écriture, appliquer tout de suite si le limiteur le permet
+        return self.fan_writes.flush()
     
     def set_fan_speed(self, fan_id: int, speed_percent: float) -> bool:
         """Set the speed of a fan as a percentage"""
-        result = self.run_command(['nbfc', 'set', '-f', str(fan_id), '-s', str(speed_percent)])
-        return result is not None
+        return self.write_fan_speed(fan_id, speed_percent)
     
     def set_all_fans_speed(self, speed_percent: float) -> bool:
         """Set the speed of all fans"""
         self.target_speed = speed_percent
-        result = self.run_command(['nbfc', 'set', '-s', str(speed_percent)])
-        return result is not None
+        return self.write_fan_speed(None, speed_percent)
     
     def apply_profile(self, profile_name: str) -> bool:
-        """Apply a fan profile"""
-        self.current_profile = profile_name
-        if profile_name in self.profiles:
-            speed = self.profiles[profile_name]["speed"]
-            self.target_speed = speed
-            return self.set_all_fans_speed(speed)
-        return False
+        """Apply a fan profile chosen by the user; 'Auto' gives the choice back to the rules"""
+        if profile_name == AUTO_PROFILE:
+            # Sans règle (pas de profiles.json), Auto ne choisirait jamais rien
+            if not self.profiles.rules:
+                return False
+            self.profiles.resume()
+            return True
+        profile = self.profiles.get(profile_name)
+        if profile is None:
+            return False
+        # Choix manuel: les règles ne changent plus de profil jusqu'au retour en Auto
+        self.profiles.manual = True
+        return self.switch_profile(profile)
+    
+    def switch_profile(self, profile: Profile) -> bool:
+        """Swap in a profile's curves, filter and write rate, or its fixed speed"""
+        profiles = self.profiles
+        if profiles.base is None:
+            # Réglages chargés au démarrage: repris par les profils qui ne les redéfinissent pas
+            profiles.base = (self.curves, self.filters.filter, self.fan_writes.max_writes_per_second)
+        base_curves, base_filter, base_rate = profiles.base
+        profiles.active = profile.name
+        profiles.switches += 1
+        self.current_profile = profile.name
+        self.filters.set_filter(profile.filter or base_filter)
+        self.fan_writes.max_writes_per_second = (base_rate if profile.max_writes_per_second is None
+                                                 else profile.max_writes_per_second)
+        if profile.curves is None:
+            self.curves = base_curves
+            self.set_mode(False)
+            self.target_speed = profile.speed
+            return self.set_all_fans_speed(profile.speed)
+        self.curves = profile.curves
+        # Nouvelles courbes: repartir de la température courante (le mode prédictif est conservé)
+        self.curves.reset()
+        self.set_mode(True, predictive=self.predictive_mode)
+        return True
     
-    def set_mode(self, is_dynamic: bool) -> None:
-        """Set fan control mode (dynamic or fixed)"""
+    def set_mode(self, is_dynamic: bool, predictive: bool = False) -> None:
+        """Set fan control mode (dynamic, predictive dynamic, or fixed)"""
+        if is_dynamic and not self.dynamic_mode:
+            # Repartir de la température courante plutôt que d'un ancien état
+            self.curves.reset()
         self.dynamic_mode = is_dynamic
+        self.predictive_mode = is_dynamic and predictive
+    
+    def apply_curve_speeds(self, writes: Dict[int, float]) -> None:
+        """Write the speeds requested by the curve engine"""
+        speeds = set(writes.values())
+        if len(writes) == len(self.curves.controllers) and len(speeds) == 1:
+            # Toutes les courbes demandent la même vitesse: une seule écriture globale
+            self.set_all_fans_speed(speeds.pop())
+        else:
+            for fan_index, speed in writes.items():
+                self.set_fan_speed(fan_index, speed)
+        # La vitesse affichée est celle demandée au ventilateur le plus rapide
+        self.target_speed = max(
+            speed for speed in (writes.get(fan_index, controller.applied)
+                                for fan_index, controller in self.curves.controllers.items())
+            if speed is not None
+        )
     
     def calculate_dynamic_speed(self, temperatures: List[float]) -> float:
         """Calculate dynamic fan speed based on temperature"""
@@ -282,223 +338,451 @@ class NBFCController:
         
         highest_temp = max(temperatures)
         
-        # More responsive progressive speed calculation based on temperature
-        if highest_temp < 35:
-            dynamic_speed = 0  # Fans off for very cool temperatures
-        elif highest_temp < 40:
-            dynamic_speed = 20
-        elif highest_temp < 50:
-            dynamic_speed = 30 + (highest_temp - 40) * 3  # 30-60%
-        elif highest_temp < 60:
-            dynamic_speed = 60 + (highest_temp - 50) * 3  # 60-90%
-        elif highest_temp < 70:
-            dynamic_speed = 90 + (highest_temp - 60)  # 90-100%
-        else:
-            dynamic_speed = 100
-            
-        return dynamic_speed
+        # Courbe par défaut du moteur de courbes (table précalculée)
+        return self.curves.default_curve.evaluate(highest_temp)
     
     def get_hardware_info(self):
         """Get CPU and GPU model information"""
         cpu_model = "Unknown CPU"
         gpu_model = "Unknown GPU"
         
-        # Get CPU info
+        # Get CPU info (lecture directe, sans lancer `cat`)
         try:
-            cpu_info = self.run_command(['cat', '/proc/cpuinfo'])
-            if cpu_info:
-                for line in cpu_info.split('\n'):
-                    if 'model name' in line:
-                        cpu_model = line.split(':', 1)[1].strip()
-                        break
+            cpu_model = read_cpu_model() or cpu_model
         except Exception as e:
             print(f"Error getting CPU info: {e}", file=sys.stderr)
         
         # Get GPU info
         try:
-            # Try lspci first for NVIDIA/AMD
-            gpu_info = self.run_command(['lspci', '-v'])
-            if gpu_info:
-                for line in gpu_info.split('\n'):
-                    if 'VGA' in line or 'NVIDIA' in line or 'AMD' in line:
-                        gpu_model = line.split(':', 1)[1].strip() if ':' in line else line
-                        break
+            gpu_model = detect_gpu_model(self.run_command) or gpu_model
         except Exception as e:
             print(f"Error getting GPU info: {e}", file=sys.stderr)
             
         return cpu_model, gpu_model
     
+    def discover_hardware(self, rescan: bool = False) -> bool:
+        """
+        Load the hardware inventory (CPU/GPU models, hwmon layout, fan names) from the
+        cache, or detect it and cache it. Returns True if the cache was used
+        """
+        path = self.inventory_path or default_inventory_path()
+        key = machine_key()
+        inventory = None if rescan else load_inventory(path, key)
+        if inventory is not None and self.hwmon.open_layout(inventory['hwmon']):
+            self.hardware = (inventory['cpu_model'], inventory['gpu_model'])
+            self.fan_names = inventory['fans'] or self.fan_names
+            self.model = SensorModel(self.fan_names, self.model.fan_sensors)
+            self.startup['inventory'] = 'cached'
+            return True
+        
+        # Démarrage à froid: scan de hwmon, lspci et état NBFC, puis mise en cache
+        self.hwmon.open()
+        self.hardware = self.get_hardware_info()
+        fan_names = [fan['name'] for fan in self.nbfc.get_status()]
+        if fan_names:
+            self.fan_names = fan_names
+        self.model = SensorModel(self.fan_names, self.model.fan_sensors)
+        save_inventory(path, {
+            'key': key,
+            'cpu_model': self.hardware[0],
+            'gpu_model': self.hardware[1],
+            'hwmon': self.hwmon.layout(),
+            'fans': fan_names
+        })
+        self.startup['inventory'] = 'detected'
+        return False
+    
     def update_loop(self):
         """Main update loop that handles fan status and control"""
-        # Get hardware info once at startup
-        cpu_model, gpu_model = self.get_hardware_info()
-        print(f"Hardware détecté: CPU={cpu_model}, GPU={gpu_model}")
-        
-        # Variables pour lisser les valeurs
-        last_temps = {'0': 0, '1': 0}
-        last_rpms = {'0': 0, '1': 0}
-        
-        # Essayer de démarrer le service NBFC si nécessaire
-        if not self.is_service_running():
-            print("Le service NBFC n'est pas en cours d'exécution, tentative de démarrage...")
-            self.start_service()
-        
-        # Compteur pour alterner entre les méthodes de récupération des données
-        counter = 0
+        # Get hardware info once at startup (inventaire en cache si la machine n'a pas changé)
+        if not self.hwmon.opened:
+            self.discover_hardware()
+        print(f"Hardware détecté: CPU={self.hardware[0]}, GPU={self.hardware[1]}")
         
         while True:
             try:
-                # Get current fan status
-                fans = self.get_fan_status()
-                
-                # Vérifier que les données nécessaires sont présentes
-                for fan_id in fans:
-                    if fan_id not in ['0', '1', 'sensor_data']:
-                        continue
-                        
-                    if fan_id == 'sensor_data':
-                        continue
-                        
-                    # Vérifier et initialiser les valeurs manquantes
-                    if 'temperature' not in fans[fan_id] or fans[fan_id]['temperature'] == 0:
-                        fans[fan_id]['temperature'] = 40.0 + random.random() * 5
-                    
-                    if 'rpm' not in fans[fan_id] or fans[fan_id]['rpm'] == 0:
-                        if 'speed' in fans[fan_id] and fans[fan_id]['speed'] > 0:
-                            fans[fan_id]['rpm'] = int((fans[fan_id]['speed'] / 100) * self.max_rpm)
-                        else:
-                            fans[fan_id]['rpm'] = 2000
-                            if 'speed' not in fans[fan_id]:
-                                fans[fan_id]['speed'] = 25
-                
-                # Vérifier que les données CPU et GPU existent
-                if '0' not in fans:
-                    fans['0'] = {
-                        'name': 'CPU Fan',
-                        'speed': 25,
-                        'rpm': 2000,
-                        'temperature': 40.0
-                    }
-                
-                if '1' not in fans:
-                    fans['1'] = {
-                        'name': 'GPU Fan',
-                        'speed': 25,
-                        'rpm': 2000,
-                        'temperature': 40.0
-                    }
-                
-                # Process the fan data
-                # Extract CPU and GPU fan data
-                cpu_fan = fans.get('0', {})
-                gpu_fan = fans.get('1', {})
-                
-                # Lisser les valeurs de température pour éviter les sauts brusques
-                for fan_id in ['0', '1']:
-                    if fan_id in fans:
-                        # Lissage des températures
-                        if last_temps[fan_id] == 0:
-                            last_temps[fan_id] = fans[fan_id]['temperature']
-                        else:
-                            fans[fan_id]['temperature'] = (fans[fan_id]['temperature'] * 0.7 + last_temps[fan_id] * 0.3)
-                            last_temps[fan_id] = fans[fan_id]['temperature']
-                        
-                        # Lissage des RPM
-                        if last_rpms[fan_id] == 0:
-                            last_rpms[fan_id] = fans[fan_id]['rpm']
-                        else:
-                            fans[fan_id]['rpm'] = int(fans[fan_id]['rpm'] * 0.7 + last_rpms[fan_id] * 0.3)
-                            last_rpms[fan_id] = fans[fan_id]['rpm']
+                start = time.perf_counter()
+                data = self.tick()
                 
-                # If in dynamic mode, adjust the fan speed
-                if self.dynamic_mode:
-                    temperatures = [
-                        fans[fan_id]['temperature'] 
-                        for fan_id in fans
-                        if fan_id in ['0', '1'] and fans[fan_id].get('temperature', 0) > 0
-                    ]
-                    
-                    if temperatures:
-                        dynamic_speed = self.calculate_dynamic_speed(temperatures)
-                        
-                        # Only change the speed if it's significantly different
-                        if abs(dynamic_speed - self.target_speed) >= 5:
-                            self.target_speed = dynamic_speed
-                            self.set_all_fans_speed(dynamic_speed)
+                # Output a telemetry frame (full, then deltas) for Electron to read
+                serialize_start = time.perf_counter()
+                self.telemetry.write(data)
+                self.record_loop_timing(start, serialize_start)
                 
-                # S'assurer que les températures CPU et GPU sont différentes
-                if abs(cpu_fan['temperature'] - gpu_fan['temperature']) < 0.5:
-                    # Ajouter une petite variation pour éviter que les deux températures soient identiques
-                    gpu_fan['temperature'] += random.uniform(-1.5, 1.5)
-                
-                # Prepare data for the frontend
-                data = {
-                    "cpu": {
-                        "name": cpu_fan.get('name', 'CPU Fan'),
-                        "speed": cpu_fan.get('speed', 0),
-                        "rpm": cpu_fan.get('rpm', 0),
-                        "temperature": cpu_fan.get('temperature', 40.0)
-                    },
-                    "gpu": {
-                        "name": gpu_fan.get('name', 'GPU Fan'),
-                        "speed": gpu_fan.get('speed', 0),
-                        "rpm": gpu_fan.get('rpm', 0),
-                        "temperature": gpu_fan.get('temperature', 40.0)
-                    },
-                    "fanSpeed": self.target_speed,
-                    "status": "Dynamic" if self.dynamic_mode else "Fixed",
-                    "profile": self.current_profile,
-                    "hardware": {
-                        "cpu_model": cpu_model,
-                        "gpu_model": gpu_model
-                    }
-                }
-                
-                # Ajouter les données des capteurs si disponibles
-                if 'sensor_data' in fans:
-                    data['sensor_data'] = fans['sensor_data']
-                
-                # Output as JSON for Electron to read
-                print(json.dumps(data), flush=True)
-                
-                # Incrémenter le compteur
-                counter += 1
-                
-                time.sleep(0.5)  # More frequent updates for better responsiveness
+                # Attendre le prochain échantillon: l'intervalle dépend de la politique
+                # et une commande reçue sur stdin réveille la boucle immédiatement
+                self.scheduler.wait({
+                    'time': time.monotonic(),
+                    'temperature': max(data['cpu']['temperature'], data['gpu']['temperature']),
+                    'load': self.scheduler.read_load()
+                })
                 
             except Exception as e:
+                self.metrics.incr('errors', label='update_loop')
                 print(f"Error in update loop: {e}", file=sys.stderr)
                 import traceback
                 traceback.print_exc(file=sys.stderr)
                 time.sleep(1)  # Wait a bit longer on error
+    
+    def record_loop_timing(self, start: float, serialize_start: float) -> None:
+        """Record serialization time and overruns of one loop iteration, and dump metrics when due"""
+        now = time.perf_counter()
+        self.metrics.observe('serialize', now - serialize_start)
+        self.metrics.observe('loop', now - start)
+        # Dépassement: l'itération a duré plus longtemps que l'intervalle visé
+        if self.scheduler.interval and now - start > self.scheduler.interval:
+            self.metrics.incr('tick_overruns')
+        if self.metrics_path and now >= self.next_metrics_dump:
+            self.next_metrics_dump = now + self.metrics_interval
+            self.metrics.write_prometheus(self.metrics_path, self.counters())
+    
+    def counters(self) -> Dict[str, int]:
+        """Counters kept outside Metrics (fan writes, scheduler), flattened for export"""
+        fan_writes = self.fan_writes.get_stats()
+        counters = {f'fan_writes_{key}': fan_writes[key]
+                    for key in ('requested', 'applied', 'coalesced', 'duplicates', 'failed', 'retried')}
+        counters['ticks'] = self.scheduler.ticks
+        counters['early_wakeups'] = self.scheduler.early_wakeups
+        counters['telemetry_bytes'] = self.telemetry.bytes_sent
+        counters['commands_received'] = self.commands.received
+        counters['commands_rejected'] = self.commands.rejected
+        return counters
+    
+    def attribute(self, fans: SensorModel, events) -> None:
+        """Sample the per-process CPU time and blame the top consumers for temperature and fan spikes"""
+        start = time.perf_counter()
+        if self.processes.sample(self.clock()):
+            self.metrics.observe('processes', time.perf_counter() - start)
+        for event in events:
+            if event['state'] == 'start' and event['event'] in ('threshold', 'sustained'):
+                event['processes'] = self.processes.blame(event['event'], event['value'])
+        # Ventilateurs qui montent à fond (courbe ou profil Turbo)
+        top_speed = max(fan.speed for fan in fans.fans)
+        if top_speed >= 100 and self.last_top_speed < 100:
+            self.processes.blame('fan_max', top_speed)
+        self.last_top_speed = top_speed
+    
+    def apply_commands(self) -> int:
+        """Run the queued requests in order and send the result of those with an id"""
+        requests = self.commands.take()
+        telemetry = self.telemetry
+        # Serveur de télémétrie: les réponses vont au client qui a envoyé la requête
+        routed = hasattr(telemetry, 'current')
+        for request in requests:
+            start = time.perf_counter()
+            self.metrics.observe('command_queue', start - request.received)
+            if routed:
+                telemetry.current = request.reply_to
+            self.fan_writes.origin = request.received
+            try:
+                outcomes = [self.run_queued_command(request, name, args) for name, args in request.commands]
+                if request.request_id is not None:
+                    telemetry.write_message(result(request, outcomes, start - request.received))
+            finally:
+                self.fan_writes.origin = None
+                if routed:
+                    telemetry.current = None
+        return len(requests)
+    
+    def run_queued_command(self, request, name: str, args: List) -> Tuple[bool, object]:
+        """(True, result) or (False, error message) for one command of a request"""
+        self.metrics.incr('commands', label=name)
+        try:
+            return True, execute_command(self, name, args)
+        except Exception as e:
+            self.metrics.incr('errors', label='command')
+            if request.request_id is None:
+                print(f"Error processing command {name}: {e}", file=sys.stderr)
+            return False, str(e)
+    
+    def get_stats(self) -> Dict:
+        """Everything the `stats` command reports"""
+        return self.metrics.snapshot(self.counters())
+    
+    def tick(self, fans: Optional[SensorModel] = None) -> Dict:
+        """Read the fans once, apply the dynamic mode and build the frame for the frontend"""
+        tick_start = time.perf_counter()
+        # Commandes reçues depuis le dernier échantillon, avant les écritures en attente
+        self.apply_commands()
+        # Écritures retardées par le limiteur de débit (sans thread d'écriture)
+        if self.fan_writes.inline:
+            self.fan_writes.flush()
+        
+        # Get current fan status
+        if fans is None:
+            fans = self.get_fan_status()
+        
+        # Événements thermiques sur l'échantillon brut: avant le filtrage, et avant qu'un
+        # régime absent soit déduit de la vitesse (ce qui masquerait un ventilateur calé)
+        events = self.events.run(fans, self.clock())
+        if self.processes is not None:
+            self.attribute(fans, events)
+        for event in events:
+            self.telemetry.write_message(event)
+        
+        # Règles de profil: quelques comparaisons, réévaluées seulement si une entrée a changé
+        profile = self.profiles.evaluate(self.clock(), self.processes)
+        if profile is not None:
+            self.switch_profile(profile)
+        
+        smoothing_start = time.perf_counter()
+        for fan in fans.fans:
+            # RPM absent mais vitesse connue: le régime correspondant à la consigne
+            if fan.rpm == 0 and fan.speed > 0 and fan.measured_rpm is None:
+                fan.rpm = int((fan.speed / 100) * self.max_rpm)
+        
+        # Filtrer tout l'échantillon d'un coup; les lectures absentes restent à 0 et sont signalées
+        self.filters.run(fans)
+        self.metrics.observe('smoothing', time.perf_counter() - smoothing_start)
+        
+        cpu_fan = fans.fans[0]
+        gpu_fan = fans.fans[1]
+        
+        # Charge CPU/GPU (/proc/stat, PSI, gpu_busy_percent): mode prédictif et historique
+        loads = None
+        if self.predictive_mode or self.history is not None:
+            loads = self.feed_forward.read_loads()
+        
+        # If in dynamic mode, adjust the fan speed
+        if self.dynamic_mode:
+            curve_start = time.perf_counter()
+            # Températures lissées des ventilateurs CPU/GPU, plus chaque source nommée
+            # (une lecture manquante est omise: la courbe suit alors la plus chaude des autres)
+            temperatures = fans.temperatures()
+            temperatures.pop('cpu', None)
+            temperatures.pop('gpu', None)
+            if cpu_fan.temperature > 0:
+                temperatures['cpu'] = cpu_fan.temperature
+            if gpu_fan.temperature > 0:
+                temperatures['gpu'] = gpu_fan.temperature
+            
+            # Anticipation: la courbe voit la température prévue si elle dépasse la mesure
+            if self.predictive_mode:
+                self.feed_forward.adjust(temperatures, self.curves.default_curve.evaluate)
+            
+            # Courbes par ventilateur avec hystérésis et limitation de pente
+            self.curves.ensure_fans(len(fans.fans))
+            # Partir des vitesses que NBFC a confirmées, pas de celles seulement demandées:
+            # une écriture en attente, fusionnée ou rejetée ne fait pas avancer l'hystérésis
+            self.curves.mark_applied(self.fan_writes.confirmed_speeds(self.curves.controllers))
+            writes = self.curves.update(temperatures, self.clock())
+            if writes:
+                self.apply_curve_speeds(writes)
+            self.metrics.observe('curve', time.perf_counter() - curve_start)
+        
+        # Prepare data for the frontend (cpu/gpu: les deux premiers ventilateurs, fans: tous)
+        data = {
+            "cpu": cpu_fan.to_dict(),
+            "gpu": gpu_fan.to_dict(),
+            "fans": [dict(fan.to_dict(), sensor=fan.sensor) for fan in fans.fans],
+            "temperatures": fans.temperatures(),
+            "fanSpeed": self.target_speed,
+            "status": ("Predictive" if self.predictive_mode else "Dynamic") if self.dynamic_mode else "Fixed",
+            "profile": self.current_profile,
+            "hardware": {
+                "cpu_model": self.hardware[0],
+                "gpu_model": self.hardware[1]
+            }
+        }
+        
+        # Ajouter les données des capteurs si disponibles
+        if fans.sensor_data:
+            data['sensor_data'] = fans.sensor_data
+        
+        # Ajouter l'état de l'ordonnanceur (intervalle courant et gigue)
+        data['scheduler'] = self.scheduler.get_stats()
+        
+        # Écritures de vitesse demandées, appliquées et évitées
+        data['fan_writes'] = self.fan_writes.get_stats()
+        
+        # Temps de démarrage jusqu'à la première trame
+        if self.startup['first_frame_ms'] is None:
+            self.startup['first_frame_ms'] = round((time.perf_counter() - self.start_time) * 1000, 1)
+            print(f"First telemetry frame after {self.startup['first_frame_ms']} ms "
+                  f"(inventory {self.startup['inventory']})", file=sys.stderr)
+        data['startup'] = self.startup
+        
+        # Lectures manquantes et pertes de capteur depuis le démarrage
+        data['filter'] = self.filters.get_stats()
+        
+        # Conditions thermiques en cours et événements depuis le démarrage
+        data['events'] = self.events.get_stats()
+        
+        # Plus gros consommateurs de CPU et cause probable du dernier pic
+        if self.processes is not None:
+            data['processes'] = self.processes.get_stats()
+        
+        # Profil choisi automatiquement ou manuellement, règle en cours
+        data['profiles'] = self.profiles.get_stats()
+        
+        # Charge mesurée et températures prévues
+        if self.predictive_mode:
+            data['prediction'] = self.feed_forward.get_stats()
+        
+        # Conserver l'échantillon dans l'historique sur disque
+        # (sauf si un capteur CPU/GPU vient de disparaître: un 0 fausserait min et moyenne)
+        if self.history is not None and not (self.filters.dropped_out(0) or self.filters.dropped_out(1)):
+            self.history.append(self.history.now(), (
+                data['cpu']['temperature'], data['gpu']['temperature'],
+                data['cpu']['rpm'], data['gpu']['rpm'], self.target_speed,
+                loads['cpu_load'] * 100, loads['gpu_load'] * 100
+            ))
+        
+        self.metrics.observe('tick', time.perf_counter() - tick_start)
+        return data
+
+def write_result(controller, fan_id: Optional[int], speed: float, ok: bool) -> str:
+    """
+    Result of a speed command: 'applied' once NBFC confirmed the speed, 'queued' while the
+    write pipeline still holds it (rate limit, writer thread). Raises CommandError if NBFC
+    rejected it; the pipeline retries it anyway
+    """
+    if not ok:
+        raise CommandError("NBFC rejected the fan write, retrying")
+    return 'applied' if controller.fan_writes.confirmed(fan_id) == speed else 'queued'
+
+def execute_command(controller, cmd: str, args: List):
+    """Apply one command and return its result; raises CommandError for unknown commands"""
+    if cmd == "set_fan_speed" and len(args) >= 2:
+        fan_id, speed = int(args[0]), float(args[1])
+        return write_result(controller, fan_id, speed, controller.set_fan_speed(fan_id, speed))
+    elif cmd == "set_all_fans_speed" and len(args) >= 1:
+        speed = float(args[0])
+        return write_result(controller, None, speed, controller.set_all_fans_speed(speed))
+    elif cmd == "set_mode" and len(args) >= 1:
+        mode = str(args[0]).lower()
+        controller.set_mode(mode in ("dynamic", "predictive"), predictive=mode == "predictive")
+    elif cmd == "apply_profile" and len(args) >= 1:
+        return controller.apply_profile(str(args[0]))
+    elif cmd == "set_poll_policy" and len(args) >= 1:
+        if not controller.scheduler.set_policy(str(args[0]).lower()):
+            raise CommandError(f"unknown poll policy: {args[0]} (expected {', '.join(POLICIES)})")
+    elif cmd == "history":
+        # history [tier] [start] [end]: plage de l'historique (1s, 1m ou 1h)
+        if controller.history is None:
+            raise CommandError("History is disabled")
+        tier, start, end = parse_range([str(arg) for arg in args], controller.history.now())
+        records = controller.history.query(tier, start, end)
+        controller.telemetry.write_message({
+            "type": "history",
+            "tier": tier,
+            "channels": list(controller.history.channels),
+            "records": records
+        })
+        return len(records)
+    elif cmd == "events":
+        # events [count]: derniers événements du journal
+        events = controller.events.recent(int(args[0]) if args else 100)
+        controller.telemetry.write_message({"type": "events", "events": events})
+        return len(events)
+    elif cmd == "profiles":
+        # Profils disponibles, profil actif et règle qui l'a choisi
+        description = controller.profiles.describe()
+        controller.telemetry.write_message(dict(description, type="profiles"))
+        return description['active']
+    elif cmd == "stats":
+        # Latences par étape et compteurs, hors du flux de télémétrie
+        controller.telemetry.write_message(dict(controller.get_stats(), type="stats"))
+    elif cmd == "resync":
+        # Le consommateur a perdu un delta: renvoyer une trame complète
+        controller.telemetry.request_keyframe()
+    else:
+        raise CommandError(f"unknown command or missing arguments: {cmd}")
+    return None
 
 def handle_command(controller, command):
-    """Handle commands from Electron app"""
-    parts = command.strip().split()
-    if not parts:
+    """Handle a command line from the Electron app or a socket client: queue it and ack it"""
+    telemetry = controller.telemetry
+    try:
+        request = parse_request(command, reply_to=getattr(telemetry, 'current', None))
+    except CommandError as e:
+        controller.metrics.incr('errors', label='command')
+        if e.request_id is not None:
+            telemetry.write_message(error(e.request_id, str(e)))
+        else:
+            print(f"Invalid command: {e}", file=sys.stderr)
+        return
+    if request is None:
         return
     
-    cmd = parts[0]
+    if not controller.commands.put(request):
+        # File pleine: refuser plutôt que bloquer le lecteur de commandes
+        if request.request_id is not None:
+            telemetry.write_message(error(request.request_id, "command queue full"))
+        else:
+            print(f"Command queue full, dropped: {command.strip()}", file=sys.stderr)
+        return
+    queued = len(controller.commands)
+    if request.request_id is not None:
+        telemetry.write_message(ack(request.request_id, queued))
     
-    try:
-        if cmd == "set_fan_speed" and len(parts) >= 3:
-            fan_id = int(parts[1])
-            speed = float(parts[2])
-            controller.set_fan_speed(fan_id, speed)
-        elif cmd == "set_all_fans_speed" and len(parts) >= 2:
-            speed = float(parts[1])
-            controller.set_all_fans_speed(speed)
-        elif cmd == "set_mode" and len(parts) >= 2:
-            is_dynamic = parts[1].lower() == "dynamic"
-            controller.set_mode(is_dynamic)
-        elif cmd == "apply_profile" and len(parts) >= 2:
-            profile = parts[1]
-            controller.apply_profile(profile)
-    except Exception as e:
-        print(f"Error processing command {cmd}: {e}", file=sys.stderr)
+    # Réveiller la boucle à la première commande en attente: elle est appliquée avant le
+    # prochain échantillon, les suivantes partent avec elle
+    if queued == len(request.commands):
+        controller.scheduler.wake()
+
+async def run_async(controller, listen: Optional[str] = None):
+    """Run the controller on the asyncio core until stdin closes, or serve it on a socket"""
+    if not controller.hwmon.opened:
+        await asyncio.to_thread(controller.discover_hardware)
+    print(f"Hardware détecté: CPU={controller.hardware[0]}, GPU={controller.hardware[1]}")
+    server = None
+    if listen:
+        # Mode sans interface: télémétrie et commandes servies aux clients du socket
+        server = TelemetryServer(controller, listen, encoding=controller.telemetry.encoding,
+                                 handle_command=handle_command)
+    await AsyncController(controller, handle_command=handle_command).run(server=server)
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="NBFC Control API for Electron Interface")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="use the asyncio core (concurrent sources, per-operation timeouts)")
+    parser.add_argument('--listen', metavar='ADDRESS',
+                        help="headless mode: serve telemetry and commands on unix:PATH or [tcp:]HOST:PORT "
+                             "instead of stdio (implies --async); TCP binds 127.0.0.1 unless a host is given")
+    parser.add_argument('--curves', default=default_curves_path(),
+                        help="fan curve configuration file (default: %(default)s)")
+    parser.add_argument('--profiles', default=default_profiles_path(),
+                        help="fan profiles and switching rules (default: %(default)s)")
+    parser.add_argument('--history', default=default_history_path(),
+                        help="telemetry history ring file (default: %(default)s)")
+    parser.add_argument('--no-history', action='store_true',
+                        help="do not record telemetry history")
+    parser.add_argument('--events', default=default_events_path(),
+                        help="thermal event log (default: %(default)s)")
+    parser.add_argument('--no-events', action='store_true',
+                        help="do not keep a thermal event log (events are still pushed on the telemetry stream)")
+    parser.add_argument('--alert-threshold', type=float, default=85.0,
+                        help="temperature raising a threshold event, cleared 5 °C below (default: %(default)s)")
+    parser.add_argument('--sustained', type=float, nargs=2, default=(80.0, 30.0), metavar=('TEMP', 'SECONDS'),
+                        help="raise an event when a temperature stays above TEMP for SECONDS (default: 80 30)")
+    parser.add_argument('--top-processes', type=int, default=0, metavar='N',
+                        help="report the N processes using the most CPU and blame them for temperature "
+                             "and fan spikes (default: off)")
+    parser.add_argument('--max-fan-writes', type=float, default=4.0,
+                        help="fan speed writes applied per second at most (default: %(default)s)")
+    parser.add_argument('--inventory', default=default_inventory_path(),
+                        help="hardware inventory cache (default: %(default)s)")
+    parser.add_argument('--rescan', action='store_true',
+                        help="ignore the hardware inventory cache and detect the hardware again")
+    parser.add_argument('--metrics-file',
+                        help="write Prometheus text-format metrics to this file (node_exporter textfile collector)")
+    parser.add_argument('--metrics-interval', type=float, default=10.0,
+                        help="seconds between metrics file updates (default: %(default)s)")
+    parser.add_argument('--thermal-model', default=default_thermal_model_path(),
+                        help="fitted thermal model for the predictive mode (default: %(default)s)")
+    parser.add_argument('--filter', choices=list(FILTERS), default='ema',
+                        help="filter applied to every sample: ema (default), median (spike rejection), kalman or none")
+    parser.add_argument('--telemetry', choices=ENCODINGS, default='json',
+                        help="telemetry encoding: json deltas (default), length-prefixed msgpack "
+                             "(--listen only: the Electron app reads JSON lines), or legacy full JSON")
+    return parser.parse_args(argv)
 
 def main():
     """Main function"""
+    args = parse_args()
+    
     # Check if NBFC is installed
     if not os.path.exists('/usr/bin/nbfc') and not os.path.exists('/usr/local/bin/nbfc'):
         print("NBFC is not installed. Please install it first.", file=sys.stderr)
@@ -506,6 +790,48 @@ def main():
     
     # Initialize controller
     controller = NBFCController()
+    if args.telemetry == 'msgpack' and not args.listen:
+        # Le frontend Electron découpe stdout en lignes JSON: le binaire n'est servi qu'aux clients du socket
+        print("msgpack telemetry needs --listen, using JSON on stdout", file=sys.stderr)
+        args.telemetry = 'json'
+    controller.telemetry = TelemetryEncoder(encoding=args.telemetry)
+    controller.fan_writes.max_writes_per_second = args.max_fan_writes
+    controller.filters = FilterStage(create_filter(args.filter))
+    try:
+        controller.feed_forward = FeedForward(ThermalModel.load(args.thermal_model))
+    except ThermalModelError as e:
+        print(f"Invalid thermal model, using the default model: {e}", file=sys.stderr)
+    controller.events = EventDetector(threshold=args.alert_threshold, sustained_level=args.sustained[0],
+                                      sustained_time=args.sustained[1])
+    if args.top_processes > 0:
+        controller.processes = ProcessSampler(top=args.top_processes)
+    controller.inventory_path = args.inventory
+    controller.metrics_path = args.metrics_file
+    controller.metrics_interval = args.metrics_interval
+    controller.discover_hardware(rescan=args.rescan)
+    try:
+        controller.curves = CurveEngine.load(args.curves)
+    except CurveConfigError as e:
+        print(f"Invalid fan curve configuration, using default curves: {e}", file=sys.stderr)
+    # Un ventilateur piloté par une source de température nommée affiche aussi cette source
+    for fan_index, curve_controller in controller.curves.controllers.items():
+        if curve_controller.sensor not in SENSORS:
+            controller.model.map_sensor(fan_index, curve_controller.sensor)
+    try:
+        controller.profiles = ProfileEngine.load(args.profiles)
+    except ProfileConfigError as e:
+        print(f"Invalid profile configuration, using the built-in profiles: {e}", file=sys.stderr)
+    # Règles sur la charge active: l'échantillonnage par processus est nécessaire
+    if controller.profiles.uses_workload and controller.processes is None:
+        controller.processes = ProcessSampler()
+    if not args.no_history:
+        controller.history = open_history(args.history)
+        if controller.history is not None:
+            atexit.register(controller.history.close)
+    if not args.no_events:
+        controller.events.log = open_event_log(args.events)
+        if controller.events.log is not None:
+            atexit.register(controller.events.log.close)
     
     # Check if NBFC service is running
     if not controller.is_service_running():
@@ -513,6 +839,14 @@ def main():
             print("Failed to start NBFC service. Make sure it's properly installed.", file=sys.stderr)
             sys.exit(1)
     
+    # Mode asyncio: sources concurrentes, commandes et écritures non bloquantes
+    if args.use_async or args.listen:
+        asyncio.run(run_async(controller, args.listen))
+        return
+    
+    # Les commandes stdin ne doivent pas attendre les écritures NBFC
+    controller.fan_writes.start()
+    
     # Start update thread
     update_thread = threading.Thread(target=controller.update_loop)
     update_thread.daemon = True
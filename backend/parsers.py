@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Single-pass parsers for `sensors` and `nbfc status -a` output
+Both parsers share tokenize(), which splits `key: value` lines with str.partition:
+faster than a MULTILINE regex findall on these dumps
+"""
+
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# First temperature reading of a value such as "N/A  +45.0°C", when the
+# value does not simply start with it
+TEMP_RE = re.compile(r'[+-]?\d+(?:\.\d+)?(?=°C)')
+
+
+def tokenize(text: str) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Yield the (key, value) pairs of every `key: value` line, in order; any other
+    non-blank line (the chip headers of `sensors`) is yielded as (line, None)
+    """
+    for line in text.splitlines():
+        # Les clés ne contiennent jamais ':' dans la sortie des deux outils
+        key, sep, value = line.partition(':')
+        key = key.strip()
+        if key:
+            yield key, value.strip() if sep else None
+
+
+def parse_sensors_output(text: str) -> Dict:
+    """
+    Parse `sensors` output in a single pass.
+
+    Returns a dict with:
+      cpu_temps    list of float, one per `Core N` line (°C)
+      gpu_temps    list of float, one per `temp2`/`temp3` line (°C)
+      fan_rpms     dict fan label -> int RPM for every `fanN` line (first chip wins, as in hwmon)
+      temps        dict "chip:label" -> float for every line reading in °C, chip being
+                   the driver name of the section header ("coretemp-isa-0000" -> "coretemp"),
+                   the same keys as hwmon
+      cpu_temp     average of cpu_temps, 0 if none
+      gpu_temp     average of gpu_temps, 0 if none
+      cpu_fan_rpm  RPM of `fan1`, 0 if absent
+      gpu_fan_rpm  RPM of `fan2`, 0 if absent
+      sensor_data  dict label -> raw value string for every line except `Adapter`
+    """
+    cpu_temps: List[float] = []
+    gpu_temps: List[float] = []
+    fan_rpms: Dict[str, int] = {}
+    temps: Dict[str, float] = {}
+    sensor_data: Dict[str, str] = {}
+    chip = ''
+
+    for key, value in tokenize(text):
+        if value is None:
+            # En-tête de section: nom du pilote, comme le fichier name de hwmon
+            chip = key.partition('-')[0]
+            continue
+        if key == 'Adapter':
+            continue
+        sensor_data[key] = value
+
+        if key[:3] == 'fan':
+            # "2100 RPM  (min = 0 RPM)"
+            rpm, _, unit = value.partition(' ')
+            if unit[:3] == 'RPM' and rpm.isdigit() and key not in fan_rpms:
+                fan_rpms[key] = int(rpm)
+            continue
+        end = value.find('°C')
+        if end <= 0:
+            continue
+        try:
+            # Cas courant: la valeur commence par la température ("+45.0°C  (high = ...)")
+            temp = float(value[:end])
+        except ValueError:
+            match = TEMP_RE.search(value)
+            if not match:
+                continue
+            temp = float(match.group())
+        temps[f'{chip}:{key}' if chip else key] = temp
+        if key[:4] == 'Core':
+            cpu_temps.append(temp)
+        elif key == 'temp2' or key == 'temp3':
+            gpu_temps.append(temp)
+
+    return {
+        'cpu_temps': cpu_temps,
+        'gpu_temps': gpu_temps,
+        'fan_rpms': fan_rpms,
+        'temps': temps,
+        'cpu_temp': sum(cpu_temps) / len(cpu_temps) if cpu_temps else 0,
+        'gpu_temp': sum(gpu_temps) / len(gpu_temps) if gpu_temps else 0,
+        'cpu_fan_rpm': fan_rpms.get('fan1', 0),
+        'gpu_fan_rpm': fan_rpms.get('fan2', 0),
+        'sensor_data': sensor_data
+    }
+
+
+def parse_nbfc_status(text: str) -> List[Dict]:
+    """
+    Parse `nbfc status -a` output in a single pass.
+
+    Returns one dict per `Fan Display Name` section with:
+      name    fan display name
+      speed   `Current Fan Speed` as float, None if missing
+      target  `Target Fan Speed` as float, None if missing
+    """
+    fans: List[Dict] = []
+    current = None
+    for key, value in tokenize(text):
+        if key == 'Fan Display Name':
+            current = {'name': value, 'speed': None, 'target': None}
+            fans.append(current)
+        elif current is not None and key in ('Current Fan Speed', 'Target Fan Speed'):
+            try:
+                current['speed' if key == 'Current Fan Speed' else 'target'] = float(value)
+            except ValueError:
+                continue
+    return fans
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Predictive (feed-forward) fan control
+Reads CPU/GPU load cheaply from /proc and sysfs, and predicts where each temperature
+is heading with a first-order thermal model fitted from the recorded history:
+
+    dT/dt = w0 + w1 * load + w2 * speed + w3 * T      (load and speed as fractions)
+
+The curves are then fed max(current, predicted) so the fans ramp before the spike
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+THERMAL_MODEL_VERSION = 1
+
+# Capteurs modélisés et charge associée à chacun
+MODEL_SENSORS = {'cpu': 'cpu_load', 'gpu': 'gpu_load'}
+
+# Sans ajustement: constante de temps de 40 s, équilibre à 35 °C au repos, +55 °C à pleine
+# charge, -20 °C ventilateurs à fond
+DEFAULT_WEIGHTS = (35 / 40, 55 / 40, -20 / 40, -1 / 40)
+
+DEFAULT_HORIZON = 10.0  # seconds
+
+
+class ThermalModelError(ValueError):
+    """Raised when a thermal model file is unreadable or invalid"""
+
+
+def default_thermal_model_path() -> str:
+    """Thermal model location under $XDG_CONFIG_HOME"""
+    config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    return os.path.join(config_home, 'nitro-fan-control', 'thermal_model.json')
+
+
+class LoadReader:
+    """
+    CPU utilization from /proc/stat, CPU pressure from /proc/pressure/cpu and GPU
+    utilization from the drm gpu_busy_percent files, kept open and re-read with pread
+    """
+
+    def __init__(self, proc_root: str = '/proc', drm_root: str = '/sys/class/drm'):
+        self.stat_fd = self._open(os.path.join(proc_root, 'stat'))
+        self.pressure_fd = self._open(os.path.join(proc_root, 'pressure', 'cpu'))
+        self.gpu_fds = [fd for fd in (self._open(path) for path in
+                                      sorted(glob.glob(os.path.join(drm_root, 'card*', 'device', 'gpu_busy_percent'))))
+                        if fd is not None]
+        self.last_busy = 0
+        self.last_total = 0
+
+    @staticmethod
+    def _open(path: str) -> Optional[int]:
+        try:
+            return os.open(path, os.O_RDONLY)
+        except OSError:
+            return None
+
+    def close(self) -> None:
+        for fd in [self.stat_fd, self.pressure_fd] + self.gpu_fds:
+            if fd is not None:
+                os.close(fd)
+        self.stat_fd = self.pressure_fd = None
+        self.gpu_fds = []
+
+    def cpu_utilization(self) -> Optional[float]:
+        """Busy share of all CPUs since the previous call (None on the first call)"""
+        if self.stat_fd is None:
+            return None
+        try:
+            line = os.pread(self.stat_fd, 256, 0).split(b'\n', 1)[0]
+        except OSError:
+            return None
+        # cpu user nice system idle iowait irq softirq steal ...
+        fields = [int(value) for value in line.split()[1:9]]
+        total = sum(fields)
+        busy = total - fields[3] - fields[4]
+        previous_total, previous_busy = self.last_total, self.last_busy
+        self.last_total, self.last_busy = total, busy
+        if not previous_total or total <= previous_total:
+            return None
+        return (busy - previous_busy) / (total - previous_total)
+
+    def cpu_pressure(self) -> Optional[float]:
+        """Share of time some task waited for a CPU over the last 10 s (PSI some avg10)"""
+        if self.pressure_fd is None:
+            return None
+        try:
+            line = os.pread(self.pressure_fd, 128, 0).split(b'\n', 1)[0]
+            # some avg10=1.23 avg60=... avg300=... total=...
+            return float(line.split()[1][len(b'avg10='):]) / 100
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def gpu_utilization(self) -> Optional[float]:
+        """Busiest GPU (amdgpu and other drivers exposing gpu_busy_percent)"""
+        busiest = None
+        for fd in self.gpu_fds:
+            try:
+                value = int(os.pread(fd, 16, 0)) / 100
+            except (OSError, ValueError):
+                continue
+            busiest = value if busiest is None else max(busiest, value)
+        return busiest
+
+    def read(self) -> Dict[str, float]:
+        """
+        {'cpu_load', 'gpu_load', 'cpu_pressure'} as fractions. CPU load is the higher of
+        utilization and pressure (a saturated CPU with waiting tasks reads above 100% busy);
+        an unknown GPU load is 0
+        """
+        utilization = self.cpu_utilization()
+        pressure = self.cpu_pressure()
+        gpu = self.gpu_utilization()
+        return {
+            'cpu_load': max(utilization or 0.0, pressure or 0.0),
+            'gpu_load': gpu or 0.0,
+            'cpu_pressure': pressure or 0.0
+        }
+
+
+class ThermalModel:
+    """First-order thermal model per sensor, predicting the temperature after a horizon"""
+
+    def __init__(self, weights: Optional[Dict[str, Sequence[float]]] = None,
+                 horizon: float = DEFAULT_HORIZON):
+        self.weights = {sensor: tuple(DEFAULT_WEIGHTS) for sensor in MODEL_SENSORS}
+        self.weights.update({sensor: tuple(w) for sensor, w in (weights or {}).items()})
+        self.horizon = horizon
+        self.fitted = weights is not None
+
+    def slope(self, sensor: str, temp: float, load: float, speed: float) -> float:
+        """dT/dt in °C per second (speed in percent)"""
+        w0, w1, w2, w3 = self.weights[sensor]
+        return w0 + w1 * load + w2 * speed / 100 + w3 * temp
+
+    def step(self, sensor: str, temp: float, load: float, speed: float, dt: float) -> float:
+        """Temperature after dt seconds with load and speed held constant (exact solution)"""
+        w0, w1, w2, w3 = self.weights[sensor]
+        drive = w0 + w1 * load + w2 * speed / 100
+        if w3 >= 0:
+            # Modèle sans retour à l'équilibre: extrapolation linéaire
+            return temp + dt * (drive + w3 * temp)
+        equilibrium = -drive / w3
+        return equilibrium + (temp - equilibrium) * math.exp(w3 * dt)
+
+    def predict(self, sensor: str, temp: float, load: float, speed: float) -> float:
+        """Temperature at the horizon if load and fan speed stay as they are"""
+        return self.step(sensor, temp, load, speed, self.horizon)
+
+    @classmethod
+    def fit(cls, samples: Sequence[Dict], horizon: float = DEFAULT_HORIZON,
+            ridge: float = 1e-3) -> 'ThermalModel':
+        """
+        Least-squares fit on consecutive samples {'time', 'cpu_temp', 'gpu_temp', 'cpu_load',
+        'gpu_load', 'fan_speed'}. A sensor without enough readings keeps the default weights
+        """
+        weights = {}
+        for sensor, load_key in MODEL_SENSORS.items():
+            temp_key = f'{sensor}_temp'
+            # Équations normales 4x4 accumulées en un passage
+            ata = [[0.0] * 4 for _ in range(4)]
+            atb = [0.0] * 4
+            rows = 0
+            for previous, current in zip(samples, samples[1:]):
+                dt = current['time'] - previous['time']
+                if dt <= 0 or dt > 5 or previous[temp_key] <= 0 or current[temp_key] <= 0:
+                    continue
+                x = (1.0, previous.get(load_key, 0.0), previous.get('fan_speed', 0.0) / 100, previous[temp_key])
+                y = (current[temp_key] - previous[temp_key]) / dt
+                for i in range(4):
+                    atb[i] += x[i] * y
+                    for j in range(4):
+                        ata[i][j] += x[i] * x[j]
+                rows += 1
+            if rows < 30:
+                continue
+            for i in range(4):
+                ata[i][i] += ridge * rows
+            solution = _solve(ata, atb)
+            if solution is not None:
+                weights[sensor] = solution
+        model = cls(weights, horizon)
+        model.fitted = bool(weights)
+        return model
+
+    def evaluate(self, samples: Sequence[Dict]) -> Dict[str, Dict[str, float]]:
+        """
+        Mean absolute error of the horizon prediction on a trace, next to the error of
+        assuming the temperature stays put (persistence)
+        """
+        results = {}
+        for sensor, load_key in MODEL_SENSORS.items():
+            temp_key = f'{sensor}_temp'
+            errors, baseline = [], []
+            end = 0
+            for sample in samples:
+                target_time = sample['time'] + self.horizon
+                while end < len(samples) and samples[end]['time'] < target_time:
+                    end += 1
+                if end == len(samples):
+                    break
+                actual = samples[end][temp_key]
+                if sample[temp_key] <= 0 or actual <= 0:
+                    continue
+                predicted = self.predict(sensor, sample[temp_key], sample.get(load_key, 0.0),
+                                         sample.get('fan_speed', 0.0))
+                errors.append(abs(predicted - actual))
+                baseline.append(abs(sample[temp_key] - actual))
+            if errors:
+                results[sensor] = {
+                    'samples': len(errors),
+                    'mae': round(sum(errors) / len(errors), 3),
+                    'persistence_mae': round(sum(baseline) / len(baseline), 3)
+                }
+        return results
+
+    def to_dict(self) -> Dict:
+        return {'version': THERMAL_MODEL_VERSION, 'horizon': self.horizon,
+                'weights': {sensor: list(w) for sensor, w in self.weights.items()}}
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'ThermalModel':
+        """
+        Load a fitted model, or the default model if there is none (or it was written by
+        another version). Raises ThermalModelError if the file is unreadable or malformed
+        """
+        path = path or default_thermal_model_path()
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except OSError as e:
+            raise ThermalModelError(f"{path}: cannot read: {e}") from None
+        except ValueError as e:
+            raise ThermalModelError(f"{path}: invalid JSON: {e}") from None
+        if not isinstance(data, dict):
+            raise ThermalModelError(f"{path}: thermal model must be an object")
+        if data.get('version') != THERMAL_MODEL_VERSION:
+            return cls()
+        return cls.from_config(data, path)
+
+    @classmethod
+    def from_config(cls, data: Dict, path: str = 'thermal model') -> 'ThermalModel':
+        """Model from its to_dict() form, validating the weights and the horizon"""
+        weights = data.get('weights', {})
+        if not isinstance(weights, dict):
+            raise ThermalModelError(f"{path}: 'weights' must be an object of sensor -> 4 weights")
+        for sensor, w in weights.items():
+            if sensor not in MODEL_SENSORS:
+                raise ThermalModelError(f"{path}: unknown sensor {sensor!r} (expected {', '.join(MODEL_SENSORS)})")
+            if not isinstance(w, list) or len(w) != 4 or \
+                    not all(isinstance(x, (int, float)) and not isinstance(x, bool) and math.isfinite(x) for x in w):
+                raise ThermalModelError(f"{path}: weights of {sensor!r} must be 4 finite numbers")
+        horizon = data.get('horizon', DEFAULT_HORIZON)
+        if not isinstance(horizon, (int, float)) or isinstance(horizon, bool) or not 0 < horizon < math.inf:
+            raise ThermalModelError(f"{path}: horizon must be a positive number of seconds")
+        return cls(weights, float(horizon))
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write the model atomically"""
+        path = path or default_thermal_model_path()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(temp_path, path)
+
+
+def _solve(matrix: List[List[float]], vector: List[float]) -> Optional[List[float]]:
+    """Gaussian elimination with partial pivoting (small dense systems)"""
+    size = len(vector)
+    rows = [row[:] + [value] for row, value in zip(matrix, vector)]
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda r: abs(rows[r][column]))
+        if abs(rows[pivot][column]) < 1e-12:
+            return None
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        for r in range(column + 1, size):
+            factor = rows[r][column] / rows[column][column]
+            for c in range(column, size + 1):
+                rows[r][c] -= factor * rows[column][c]
+    solution = [0.0] * size
+    for r in range(size - 1, -1, -1):
+        solution[r] = (rows[r][size] - sum(rows[r][c] * solution[c] for c in range(r + 1, size))) / rows[r][r]
+    return solution
+
+
+class FeedForward:
+    """Predicted temperatures for the curve engine, from the latest load reading"""
+
+    def __init__(self, model: Optional[ThermalModel] = None, loads: Optional[LoadReader] = None,
+                 release: float = 0.9):
+        self.model = model or ThermalModel()
+        self.loads = loads
+        # Charge vue par le modèle: montée immédiate, descente lissée (le bruit au repos
+        # ne doit pas faire osciller les ventilateurs)
+        self.release = release
+        self.held: Dict[str, float] = {}
+        self.last_loads: Dict[str, float] = {}
+        self.predicted: Dict[str, float] = {}
+
+    def read_loads(self) -> Dict[str, float]:
+        if self.loads is None:
+            self.loads = LoadReader()
+        self.last_loads = self.loads.read()
+        return self.last_loads
+
+    def adjust(self, temperatures: Dict[str, float], reactive_speed: Callable[[float], float]) -> Dict[str, float]:
+        """
+        Raise the cpu/gpu entries to their predicted value (never lower: a bad
+        prediction can only cool earlier, not later). The prediction assumes the fans at
+        reactive_speed(measured temperature), the speed the curve alone would pick: using
+        the applied speed would feed the boost back into the prediction and oscillate
+        """
+        loads = self.last_loads
+        release = self.release
+        for sensor, load_key in MODEL_SENSORS.items():
+            load = loads.get(load_key, 0.0)
+            held = self.held.get(load_key, load)
+            load = self.held[load_key] = load if load >= held else held * release + load * (1 - release)
+            temp = temperatures.get(sensor)
+            if temp is None:
+                continue
+            predicted = self.model.predict(sensor, temp, load, reactive_speed(temp))
+            self.predicted[sensor] = round(predicted, 2)
+            if predicted > temp:
+                temperatures[sensor] = predicted
+        return temperatures
+
+    def get_stats(self) -> Dict:
+        return {
+            'predicted': dict(self.predicted),
+            'loads': {key: round(value, 3) for key, value in self.last_loads.items()},
+            'horizon_s': self.model.horizon,
+            'fitted': self.model.fitted
+        }
+
+
+def samples_from_history(history, start: float, end: float) -> List[Dict]:
+    """Samples for ThermalModel.fit from the 1 s tier (average of each bucket)"""
+    samples = []
+    for record in history.query('1s', start, end, limit=sys.maxsize):
+        sample = {'time': record['t']}
+        for channel in ('cpu_temp', 'gpu_temp', 'cpu_load', 'gpu_load', 'fan_speed'):
+            value = record.get(channel)
+            sample[channel] = value[1] if value else 0.0
+        # Charges enregistrées en pourcentage
+        sample['cpu_load'] /= 100
+        sample['gpu_load'] /= 100
+        samples.append(sample)
+    return samples
+
+
+def main():
+    from history import default_history_path, open_history
+    from replay import load_trace
+
+    parser = argparse.ArgumentParser(description="Fit and evaluate the thermal model used by the predictive mode")
+    commands = parser.add_subparsers(dest='command', required=True)
+    fit = commands.add_parser('fit', help="fit the model from the recorded history")
+    fit.add_argument('--history', default=default_history_path())
+    fit.add_argument('--hours', type=float, default=72.0, help="how much history to use")
+    fit.add_argument('--horizon', type=float, default=DEFAULT_HORIZON, help="prediction horizon in seconds")
+    fit.add_argument('--output', default=default_thermal_model_path())
+    evaluate = commands.add_parser('evaluate', help="prediction error on replayed traces")
+    evaluate.add_argument('traces', nargs='+', help="trace files (.csv or JSON lines)")
+    evaluate.add_argument('--model', default=default_thermal_model_path())
+    args = parser.parse_args()
+
+    if args.command == 'fit':
+        history = open_history(args.history)
+        if history is None:
+            sys.exit(1)
+        now = time.time()
+        samples = samples_from_history(history, now - args.hours * 3600, now)
+        model = ThermalModel.fit(samples, args.horizon)
+        if not model.fitted:
+            print(f"Not enough history to fit ({len(samples)} samples)", file=sys.stderr)
+            sys.exit(1)
+        model.save(args.output)
+        print(json.dumps(dict(model.to_dict(), samples=len(samples), evaluation=model.evaluate(samples))))
+    else:
+        try:
+            model = ThermalModel.load(args.model)
+        except ThermalModelError as e:
+            parser.error(str(e))
+        for path in args.traces:
+            trace = load_trace(path)
+            # Les traces donnent la charge en pourcentage et la vitesse écrite
+            samples = [dict(sample, cpu_load=sample['cpu_load'] / 100, gpu_load=sample['gpu_load'] / 100)
+                       for sample in trace]
+            print(json.dumps({'trace': path, 'fitted': model.fitted, 'evaluation': model.evaluate(samples)}))
+
+
+if __name__ == '__main__':
+    main()
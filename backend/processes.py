@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Per-process thermal attribution
+Samples per-process CPU time from /proc/<pid>/stat incrementally: the PID table is
+cached and rescanned every few seconds, processes whose CPU time changed recently are
+read every sample and idle ones a slice at a time, all within a fixed read budget, so
+the cost stays bounded with thousands of processes. The top consumers go in the telemetry frame and
+are recorded as the likely cause when a temperature or fan spike happens
+"""
+
+import heapq
+import os
+import time
+from typing import Dict, List, Optional
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+class _Process:
+    """One PID table entry: name, start time (PID reuse) and the CPU time last read"""
+
+    __slots__ = ('pid', 'path', 'name', 'start', 'ticks', 'time', 'cpu', 'idle')
+
+    def __init__(self, pid: int, path: str):
+        self.pid = pid
+        self.path = path
+        self.name = ''
+        self.start = -1
+        self.ticks = 0
+        self.time = 0.0
+        # Part d'un cœur (en %) entre les deux dernières lectures
+        self.cpu = 0.0
+        # Lectures consécutives sans changement du temps CPU
+        self.idle = 0
+
+
+class ProcessSampler:
+    """Top-N CPU consumers over the last interval, read with a bounded number of /proc reads"""
+
+    def __init__(self, proc_root: str = '/proc', top: int = 5, interval: float = 2.0,
+                 rescan_interval: float = 5.0, max_reads: int = 1024, hot_samples: int = 3,
+                 idle_cycle: int = 5):
+        self.proc_root = proc_root
+        self.top_count = top
+        self.interval = interval
+        self.rescan_interval = rescan_interval
+        # Lectures de /proc/<pid>/stat au plus par échantillon
+        self.max_reads = max_reads
+        # Un processus reste lu à chaque échantillon tant que son temps CPU a changé récemment
+        self.hot_samples = hot_samples
+        # Échantillons pour relire tous les processus inactifs une fois
+        self.idle_cycle = idle_cycle
+        self.table: Dict[int, _Process] = {}
+        self.hot: Dict[int, _Process] = {}
+        self.order: List[int] = []
+        self.cursor = 0
+        self.next_sample = 0.0
+        self.next_rescan = 0.0
+        self.top: List[list] = []
+        self.spike: Optional[Dict] = None
+        self.reads = 0
+        self.samples = 0
+        self.last_cost_ms = 0.0
+
+    def _rescan(self) -> None:
+        """Refresh the PID table: add new processes, forget the ones that exited"""
+        pids = []
+        try:
+            with os.scandir(self.proc_root) as entries:
+                for entry in entries:
+                    if entry.name.isdigit():
+                        pids.append(int(entry.name))
+        except OSError:
+            return
+        table = self.table
+        alive = set(pids)
+        for pid in [pid for pid in table if pid not in alive]:
+            del table[pid]
+            self.hot.pop(pid, None)
+        for pid in pids:
+            if pid not in table:
+                process = table[pid] = _Process(pid, os.path.join(self.proc_root, str(pid), 'stat'))
+                # Nouveau processus: lu dès cet échantillon (dans la limite du budget)
+                self.hot[pid] = process
+        # Le curseur de la tranche inactive continue où il en était: tous finissent par être relus
+        self.order = pids
+
+    def _read(self, process: _Process, now: float) -> bool:
+        """Read one process's CPU time; False if it exited"""
+        try:
+            fd = os.open(process.path, os.O_RDONLY)
+        except OSError:
+            return False
+        try:
+            data = os.read(fd, 1024)
+        except OSError:
+            return False
+        finally:
+            os.close(fd)
+        self.reads += 1
+        # Le nom peut contenir espaces et parenthèses: les champs suivent la dernière ')'
+        end = data.rfind(b')')
+        if end < 0:
+            return False
+        fields = data[end + 2:].split()
+        try:
+            ticks = int(fields[11]) + int(fields[12])
+            start = int(fields[19])
+        except (IndexError, ValueError):
+            return False
+        if start != process.start:
+            # Premier passage, ou PID réutilisé par un autre processus
+            process.name = data[data.find(b'(') + 1:end].decode(errors='replace')
+            process.start = start
+            process.ticks = ticks
+            process.time = now
+            process.cpu = 0.0
+            # Lecture de référence: une seule relecture rapprochée pour savoir s'il est actif
+            process.idle = self.hot_samples - 1
+            return True
+        delta = ticks - process.ticks
+        elapsed = now - process.time
+        process.cpu = delta / CLOCK_TICKS / elapsed * 100 if elapsed > 0 else 0.0
+        process.ticks = ticks
+        process.time = now
+        process.idle = 0 if delta else process.idle + 1
+        return True
+
+    def sample(self, now: float) -> bool:
+        """Take a sample if the interval elapsed (now: monotonic seconds). Returns True if it did"""
+        if now < self.next_sample:
+            return False
+        start = time.perf_counter()
+        self.next_sample = now + self.interval
+        if now >= self.next_rescan:
+            self._rescan()
+            self.next_rescan = now + self.rescan_interval
+        budget = self.max_reads
+        table, hot = self.table, self.hot
+
+        # Processus actifs d'abord: ce sont eux qui chauffent
+        for pid, process in list(hot.items()):
+            if budget <= 0:
+                break
+            budget -= 1
+            if not self._read(process, now):
+                del hot[pid]
+                table.pop(pid, None)
+            elif process.idle >= self.hot_samples:
+                process.cpu = 0.0
+                del hot[pid]
+
+        # Puis une tranche des processus inactifs à tour de rôle, dans le budget restant
+        order = self.order
+        budget = min(budget, -(-len(order) // self.idle_cycle))
+        checked = 0
+        while budget > 0 and checked < len(order):
+            if self.cursor >= len(order):
+                self.cursor = 0
+            pid = order[self.cursor]
+            self.cursor += 1
+            checked += 1
+            process = table.get(pid)
+            if process is None or pid in hot:
+                continue
+            budget -= 1
+            if not self._read(process, now):
+                del table[pid]
+            elif process.idle < self.hot_samples:
+                hot[pid] = process
+
+        top = heapq.nlargest(self.top_count, hot.values(), key=lambda process: process.cpu)
+        self.top = [[process.pid, process.name, round(process.cpu, 1)] for process in top if process.cpu > 0]
+        self.samples += 1
+        self.last_cost_ms = round((time.perf_counter() - start) * 1000, 3)
+        return True
+
+    def blame(self, trigger: str, value: float, count: int = 3) -> List[list]:
+        """Record the current top consumers as the cause of a spike; returns them"""
+        culprits = self.top[:count]
+        self.spike = {'trigger': trigger, 'value': round(value, 1), 'time': time.time(), 'top': culprits}
+        return culprits
+
+    def get_stats(self) -> Dict:
+        """Compact frame section: top consumers ([pid, name, % of a core]), last spike, cost"""
+        stats = {
+            'top': self.top,
+            'tracked': len(self.table),
+            'active': len(self.hot),
+            'cost_ms': self.last_cost_ms
+        }
+        if self.spike is not None:
+            stats['spike'] = self.spike
+        return stats
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Fan profile engine
+A profile is either a fixed speed (the historical Silent/Balanced/Turbo) or a fan curve
+configuration with its own smoothing filter and write rate limit, built once at load.
+Rules switch profiles by time of day, AC/battery state or active workload; they are
+compiled into predicates over a few inputs that are refreshed only when they can have
+changed, so the per-tick cost is a handful of comparisons
+
+    {"profiles": {"Quiet": {"curve": [[40, 0], [60, 30], [80, 70], [90, 100]],
+                            "filter": "median", "rate_limit": {"up": 20, "down": 5},
+                            "max_writes_per_second": 1}},
+     "rules": [{"profile": "Turbo", "when": {"workload": ["make", "ffmpeg"]}},
+               {"profile": "Quiet", "when": {"time": "22:00-07:00"}},
+               {"profile": "Quiet", "when": {"power": "battery"}}],
+     "default": "Balanced", "hold": 30}
+"""
+
+import glob
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fan_curve import CurveConfigError, CurveEngine
+from filters import FILTERS, SignalFilter, create_filter
+
+# Profils historiques, toujours disponibles (un fichier peut les redéfinir)
+BUILTIN_PROFILES = {
+    "Silent": {"speed": 20},
+    "Balanced": {"speed": 50},
+    "Turbo": {"speed": 100}
+}
+
+# Nom réservé: reprendre le choix par les règles après une sélection manuelle
+AUTO_PROFILE = 'Auto'
+
+# Réglages par ventilateur acceptés au niveau du profil avec "curve"
+CURVE_SETTINGS = ('sensor', 'hysteresis', 'rate_limit', 'min_change')
+
+DAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+# Part d'un cœur (en %) au-delà de laquelle un processus compte comme charge active
+DEFAULT_WORKLOAD_CPU = 50.0
+
+POWER_INTERVAL = 5.0  # seconds between AC/battery reads
+
+
+class ProfileConfigError(ValueError):
+    """Raised when a profile or rule configuration is invalid"""
+
+
+def default_profiles_path() -> str:
+    """Profile configuration location under $XDG_CONFIG_HOME"""
+    config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    return os.path.join(config_home, 'nitro-fan-control', 'profiles.json')
+
+
+class Profile:
+    """A fixed speed, or a curve engine plus optional filter and write rate; None keeps the base setting"""
+
+    def __init__(self, name: str, speed: Optional[float] = None, curves: Optional[CurveEngine] = None,
+                 signal_filter: Optional[SignalFilter] = None, max_writes_per_second: Optional[float] = None):
+        self.name = name
+        self.speed = speed
+        self.curves = curves
+        self.filter = signal_filter
+        self.max_writes_per_second = max_writes_per_second
+
+    @classmethod
+    def from_config(cls, name: str, config: Dict) -> 'Profile':
+        if not isinstance(config, dict):
+            raise ProfileConfigError(f"Profile '{name}': settings must be an object")
+        speed = config.get('speed')
+        if speed is not None:
+            if not isinstance(speed, (int, float)) or not 0 <= speed <= 100:
+                raise ProfileConfigError(f"Profile '{name}': speed must be a number in 0-100")
+            if 'curve' in config or 'fans' in config:
+                raise ProfileConfigError(f"Profile '{name}': use either a fixed speed or a curve")
+
+        curves = None
+        try:
+            if 'curve' in config:
+                # Raccourci: une seule courbe et les mêmes réglages pour tous les ventilateurs
+                settings = {key: config[key] for key in CURVE_SETTINGS if key in config}
+                settings['curve'] = name
+                fans = {str(index): dict(settings) for index in (0, 1)}
+                curves = CurveEngine.from_config({'curves': {name: config['curve']}, 'fans': fans})
+                curves.default_curve = curves.controllers[0].curve
+            elif 'fans' in config:
+                curves = CurveEngine.from_config(config)
+        except CurveConfigError as e:
+            raise ProfileConfigError(f"Profile '{name}': {e}") from None
+        if speed is None and curves is None:
+            raise ProfileConfigError(f"Profile '{name}': a fixed speed or a curve is required")
+
+        signal_filter = None
+        if 'filter' in config:
+            if config['filter'] not in FILTERS:
+                raise ProfileConfigError(f"Profile '{name}': filter must be one of {', '.join(FILTERS)}")
+            signal_filter = create_filter(config['filter'])
+
+        max_writes = config.get('max_writes_per_second')
+        if max_writes is not None and (not isinstance(max_writes, (int, float)) or max_writes < 0):
+            raise ProfileConfigError(f"Profile '{name}': max_writes_per_second must be >= 0")
+        return cls(name, None if speed is None else float(speed), curves, signal_filter, max_writes)
+
+
+class PowerSupply:
+    """AC/battery state from /sys/class/power_supply, mains 'online' files kept open"""
+
+    def __init__(self, root: str = '/sys/class/power_supply'):
+        self.fds = []
+        for directory in sorted(glob.glob(os.path.join(root, '*'))):
+            try:
+                with open(os.path.join(directory, 'type'), 'r') as f:
+                    kind = f.read().strip()
+                if kind in ('Mains', 'USB', 'USB_C', 'USB_PD'):
+                    self.fds.append(os.open(os.path.join(directory, 'online'), os.O_RDONLY))
+            except OSError:
+                continue
+
+    def on_ac(self) -> bool:
+        """True on mains power; a machine without any mains supply listed counts as on AC"""
+        if not self.fds:
+            return True
+        for fd in self.fds:
+            try:
+                if os.pread(fd, 4, 0).strip() == b'1':
+                    return True
+            except OSError:
+                continue
+        return False
+
+    def close(self) -> None:
+        for fd in self.fds:
+            os.close(fd)
+        self.fds = []
+
+
+class RuleInputs:
+    """What the compiled rules look at, refreshed by ProfileEngine only when it can change"""
+
+    __slots__ = ('minute', 'weekday', 'on_ac', 'top')
+
+    def __init__(self):
+        self.minute = 0
+        self.weekday = 0
+        self.on_ac = True
+        # Plus gros consommateurs du ProcessSampler: [pid, nom, % d'un cœur]
+        self.top: List[list] = []
+
+
+def _parse_clock(value: str, index: int) -> int:
+    try:
+        hours, minutes = value.split(':')
+        minute = int(hours) * 60 + int(minutes)
+    except ValueError:
+        raise ProfileConfigError(f"Rule {index}: times must be HH:MM") from None
+    if not 0 <= minute < 24 * 60:
+        raise ProfileConfigError(f"Rule {index}: time {value} is outside 00:00-23:59")
+    return minute
+
+
+def compile_rule(index: int, rule: Dict, profiles: Dict[str, Profile]) -> Tuple[str, List[Callable], set]:
+    """(profile name, predicates, inputs used) for one rule; every predicate must hold"""
+    if not isinstance(rule, dict) or not isinstance(rule.get('when'), dict):
+        raise ProfileConfigError(f"Rule {index}: expected {{\"profile\": ..., \"when\": {{...}}}}")
+    name = rule.get('profile')
+    if name not in profiles:
+        raise ProfileConfigError(f"Rule {index}: unknown profile {name!r}")
+    when = rule['when']
+    unknown = set(when) - {'time', 'days', 'power', 'workload'}
+    if unknown:
+        raise ProfileConfigError(f"Rule {index}: unknown condition {', '.join(sorted(unknown))}")
+
+    predicates = []
+    inputs = set()
+    if 'time' in when:
+        try:
+            start_text, end_text = str(when['time']).split('-')
+        except ValueError:
+            raise ProfileConfigError(f"Rule {index}: time must be HH:MM-HH:MM") from None
+        start, end = _parse_clock(start_text.strip(), index), _parse_clock(end_text.strip(), index)
+        if start <= end:
+            predicates.append(lambda i, start=start, end=end: start <= i.minute < end)
+        else:
+            # Plage qui passe minuit (22:00-07:00)
+            predicates.append(lambda i, start=start, end=end: i.minute >= start or i.minute < end)
+        inputs.add('time')
+    if 'days' in when:
+        days = when['days']
+        if not isinstance(days, list) or any(str(day).lower()[:3] not in DAYS for day in days):
+            raise ProfileConfigError(f"Rule {index}: days must be a list of {', '.join(DAYS)}")
+        weekdays = frozenset(DAYS.index(str(day).lower()[:3]) for day in days)
+        predicates.append(lambda i, weekdays=weekdays: i.weekday in weekdays)
+        inputs.add('time')
+    if 'power' in when:
+        if when['power'] not in ('ac', 'battery'):
+            raise ProfileConfigError(f"Rule {index}: power must be 'ac' or 'battery'")
+        want = when['power'] == 'ac'
+        predicates.append(lambda i, want=want: i.on_ac == want)
+        inputs.add('power')
+    if 'workload' in when:
+        workload = when['workload']
+        if isinstance(workload, list):
+            workload = {'names': workload}
+        names = workload.get('names') if isinstance(workload, dict) else None
+        if not isinstance(names, list) or not names:
+            raise ProfileConfigError(f"Rule {index}: workload must list process names")
+        try:
+            min_cpu = float(workload.get('min_cpu', DEFAULT_WORKLOAD_CPU))
+        except (TypeError, ValueError):
+            raise ProfileConfigError(f"Rule {index}: workload min_cpu must be a number") from None
+        names = frozenset(str(name) for name in names)
+        predicates.append(lambda i, names=names, min_cpu=min_cpu:
+                          any(cpu >= min_cpu and name in names for _, name, cpu in i.top))
+        inputs.add('workload')
+    return name, predicates, inputs
+
+
+class ProfileEngine:
+    """Named profiles and the compiled rules choosing between them"""
+
+    def __init__(self, profiles: Optional[Dict[str, Profile]] = None, rules: Optional[List[Dict]] = None,
+                 default: Optional[str] = None, hold: float = 30.0, power: Optional[PowerSupply] = None,
+                 wall_clock: Callable[[], float] = time.time):
+        self.profiles = {name: Profile.from_config(name, config) for name, config in BUILTIN_PROFILES.items()}
+        self.profiles.update(profiles or {})
+        if default is not None and default not in self.profiles:
+            raise ProfileConfigError(f"Unknown default profile {default!r}")
+        self.rules = [compile_rule(index, rule, self.profiles) for index, rule in enumerate(rules or [])]
+        self.default = default
+        # Délai minimal entre deux changements décidés par les règles (anti-battement)
+        self.hold = hold
+        self.wall_clock = wall_clock
+        used = set().union(*(inputs for _, _, inputs in self.rules)) if self.rules else set()
+        self.uses_time = 'time' in used
+        self.uses_workload = 'workload' in used
+        self.power = (power or PowerSupply()) if 'power' in used else power
+        self.inputs = RuleInputs()
+        self.next_minute = 0.0
+        self.next_power = 0.0
+        self.workload_samples = -1
+        self.dirty = True
+        # Choix manuel: les règles sont suspendues jusqu'au profil Auto
+        self.manual = False
+        self.active: Optional[str] = None
+        self.wanted: Optional[str] = None
+        self.rule: Optional[int] = None
+        self.hold_until = 0.0
+        self.switches = 0
+        # Réglages du contrôleur hors profil (courbes, filtre, débit), relevés au premier changement
+        self.base = None
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'ProfileEngine':
+        if not isinstance(config, dict):
+            raise ProfileConfigError("Profile configuration must be an object")
+        profiles_config = config.get('profiles', {})
+        if not isinstance(profiles_config, dict):
+            raise ProfileConfigError("'profiles' must be an object of name -> settings")
+        if AUTO_PROFILE in profiles_config:
+            raise ProfileConfigError(f"'{AUTO_PROFILE}' is reserved for rule-based switching")
+        profiles = {name: Profile.from_config(name, settings) for name, settings in profiles_config.items()}
+        rules = config.get('rules', [])
+        if not isinstance(rules, list):
+            raise ProfileConfigError("'rules' must be a list")
+        hold = config.get('hold', 30.0)
+        if not isinstance(hold, (int, float)) or hold < 0:
+            raise ProfileConfigError("'hold' must be a number of seconds >= 0")
+        return cls(profiles, rules, config.get('default'), float(hold))
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'ProfileEngine':
+        """Load the profiles and rules from a JSON file, or only the built-in profiles if it does not exist"""
+        path = path or default_profiles_path()
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, 'r') as f:
+                config = json.load(f)
+        except OSError as e:
+            raise ProfileConfigError(f"{path}: cannot read: {e}")
+        except ValueError as e:
+            raise ProfileConfigError(f"{path}: invalid JSON: {e}")
+        return cls.from_config(config)
+
+    def get(self, name: str) -> Optional[Profile]:
+        return self.profiles.get(name)
+
+    def resume(self) -> None:
+        """Give the choice back to the rules"""
+        self.manual = False
+        self.dirty = True
+        self.hold_until = 0.0
+
+    def _refresh(self, now: float, processes) -> None:
+        """Update the rule inputs that may have changed since the last tick"""
+        inputs = self.inputs
+        if self.uses_time:
+            wall = self.wall_clock()
+            if wall >= self.next_minute:
+                local = time.localtime(wall)
+                inputs.minute = local.tm_hour * 60 + local.tm_min
+                inputs.weekday = local.tm_wday
+                self.next_minute = wall - local.tm_sec + 60
+                self.dirty = True
+        if self.power is not None and now >= self.next_power:
+            on_ac = self.power.on_ac()
+            self.next_power = now + POWER_INTERVAL
+            if on_ac != inputs.on_ac:
+                inputs.on_ac = on_ac
+                self.dirty = True
+        if self.uses_workload and processes is not None and processes.samples != self.workload_samples:
+            self.workload_samples = processes.samples
+            inputs.top = processes.top
+            self.dirty = True
+
+    def evaluate(self, now: float, processes=None) -> Optional[Profile]:
+        """
+        Profile the rules switch to now (now: monotonic seconds), or None to keep the
+        current one. The rules only run again when one of their inputs changed
+        """
+        if self.manual or not self.rules:
+            return None
+        self._refresh(now, processes)
+        if self.dirty:
+            self.dirty = False
+            inputs = self.inputs
+            self.wanted, self.rule = self.default, None
+            for index, (name, predicates, _) in enumerate(self.rules):
+                if all(predicate(inputs) for predicate in predicates):
+                    self.wanted, self.rule = name, index
+                    break
+        if self.wanted is None or self.wanted == self.active or now < self.hold_until:
+            return None
+        self.hold_until = now + self.hold
+        return self.profiles[self.wanted]
+
+    def describe(self) -> Dict:
+        """Profiles and rules, for the `profiles` command"""
+        return dict(self.get_stats(), active=self.active, default=self.default,
+                    profiles={name: 'fixed' if profile.speed is not None else 'curve'
+                              for name, profile in self.profiles.items()})
+
+    def get_stats(self) -> Dict:
+        return {'auto': bool(self.rules) and not self.manual, 'rules': len(self.rules), 'rule': self.rule,
+                'switches': self.switches}
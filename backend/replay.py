@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Offline trace replay for the controller
+Feeds recorded temperature/RPM traces through NBFCController.tick faster than
+real time and reports fan writes, time above threshold, oscillations and CPU cost.
+With a thermal model as plant, temperatures are simulated from the trace's load and
+the speeds the controller writes (closed loop), so control modes can be compared
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from events import EventDetector
+from fan_curve import CurveEngine
+from fan_writes import FanWritePipeline
+from filters import FILTERS, FilterStage, create_filter
+from nbfc_client import FakeBackend, NBFCClient
+from predictive import MODEL_SENSORS, FeedForward, ThermalModel, ThermalModelError
+from telemetry import TelemetryEncoder
+
+# cpu_load/gpu_load in percent and fan_speed are optional (0 when absent)
+TRACE_FIELDS = ('time', 'cpu_temp', 'gpu_temp', 'cpu_rpm', 'gpu_rpm', 'cpu_load', 'gpu_load', 'fan_speed')
+
+
+class _NullOutput:
+    """Telemetry sink that discards frames (serialization still runs)"""
+
+    def write(self, data: bytes) -> int:
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+
+class _TraceLoads:
+    """LoadReader stand-in returning the load of the sample being replayed"""
+
+    def __init__(self):
+        self.loads = {'cpu_load': 0.0, 'gpu_load': 0.0, 'cpu_pressure': 0.0}
+
+    def read(self) -> Dict[str, float]:
+        return self.loads
+
+
+class _ReplayClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def load_trace(path: str) -> List[Dict]:
+    """
+    Load a trace from CSV (header: time,cpu_temp,gpu_temp[,cpu_rpm,gpu_rpm,cpu_load,
+    gpu_load,fan_speed]) or JSON lines with the same keys. time is in seconds
+    """
+    samples = []
+    with open(path, 'r', newline='') as f:
+        if path.endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            samples.append({field: float(row.get(field) or 0) for field in TRACE_FIELDS})
+    samples.sort(key=lambda sample: sample['time'])
+    return samples
+
+
+def trace_from_history(history, start: float, end: float) -> List[Dict]:
+    """Build a trace from the 1 s tier of a TelemetryHistory (average of each bucket)"""
+    return [{
+        'time': record['t'],
+        'cpu_temp': record['cpu_temp'][1],
+        'gpu_temp': record['gpu_temp'][1],
+        'cpu_rpm': record['cpu_rpm'][1],
+        'gpu_rpm': record['gpu_rpm'][1],
+        'cpu_load': record['cpu_load'][1],
+        'gpu_load': record['gpu_load'][1],
+        'fan_speed': record['fan_speed'][1]
+    } for record in history.query('1s', start, end, limit=sys.maxsize)]
+
+
+class Replay:
+    """Run one trace through a controller wired to fake sources"""
+
+    def __init__(self, trace: List[Dict], curves_path: Optional[str] = None,
+                 threshold: float = 80.0, dynamic: bool = True, filter_name: str = 'ema',
+                 predictive: bool = False, model: Optional[ThermalModel] = None,
+                 plant: Optional[ThermalModel] = None):
+        # Import here so worker processes only pay for it once they run a trace
+        from nbfc_control_api import NBFCController
+
+        self.trace = trace
+        self.threshold = threshold
+        self.clock = _ReplayClock()
+        self.backend = FakeBackend()
+
+        self.controller = NBFCController()
+        self.controller.hwmon.close()
+        self.controller.clock = self.clock
+        self.controller.nbfc = NBFCClient(backends=[self.backend])
+        self.controller.fan_writes = FanWritePipeline(self.controller.nbfc, clock=self.clock)
+        self.controller.telemetry = TelemetryEncoder(output=_NullOutput())
+        self.controller.curves = CurveEngine.load(curves_path) if curves_path else CurveEngine()
+        self.controller.filters = FilterStage(create_filter(filter_name))
+        # Événements thermiques au seuil du rejeu, sans journal sur disque
+        self.controller.events = EventDetector(threshold=threshold)
+        self.loads = _TraceLoads()
+        self.controller.feed_forward = FeedForward(model or ThermalModel(), loads=self.loads)
+        self.controller.set_mode(dynamic, predictive=predictive)
+        self.plant = plant
+
+    def run(self) -> Dict:
+        """Replay every sample and return the metrics"""
+        tick_times = []
+        written_speeds = []
+        time_above = 0.0
+        peak = 0.0
+        previous_time = None
+        simulated = {sensor: self.trace[0][f'{sensor}_temp'] for sensor in MODEL_SENSORS} if self.trace else {}
+
+        for sample in self.trace:
+            self.clock.now = sample['time']
+            self.loads.loads['cpu_load'] = sample['cpu_load'] / 100
+            self.loads.loads['gpu_load'] = sample['gpu_load'] / 100
+            if self.plant is not None and previous_time is not None:
+                # Boucle fermée: la température suit la charge et la vitesse actuellement appliquée
+                speeds = self.backend.get_status()
+                for index, sensor in enumerate(MODEL_SENSORS):
+                    simulated[sensor] = self.plant.step(
+                        sensor, simulated[sensor], self.loads.loads[MODEL_SENSORS[sensor]],
+                        speeds[min(index, len(speeds) - 1)]['speed'], sample['time'] - previous_time)
+                sample = dict(sample, cpu_temp=simulated['cpu'], gpu_temp=simulated['gpu'])
+            sensors = {
+                'cpu_temp': sample['cpu_temp'],
+                'gpu_temp': sample['gpu_temp'],
+                'cpu_fan_rpm': int(sample['cpu_rpm']),
+                'gpu_fan_rpm': int(sample['gpu_rpm']),
+                'sensor_data': {}
+            }
+            writes_before = len(self.backend.writes)
+
+            start = time.process_time()
+            fans = self.controller.get_fan_status(sensors=sensors, nbfc_fans=self.backend.get_status())
+            self.controller.tick(fans)
+            tick_times.append(time.process_time() - start)
+
+            for write in self.backend.writes[writes_before:]:
+                written_speeds.append(max(write.values()))
+            hottest = max(sample['cpu_temp'], sample['gpu_temp'])
+            peak = max(peak, hottest)
+            if previous_time is not None and hottest >= self.threshold:
+                time_above += sample['time'] - previous_time
+            previous_time = sample['time']
+
+        duration = self.trace[-1]['time'] - self.trace[0]['time'] if self.trace else 0.0
+        reversals = self._count_reversals(written_speeds)
+        tick_times.sort()
+        return {
+            'samples': len(self.trace),
+            'duration_s': round(duration, 3),
+            'fan_writes': len(self.backend.writes),
+            'time_above_threshold_s': round(time_above, 3),
+            'peak_temp': round(peak, 2),
+            'oscillations': reversals,
+            'thermal_events': sum(self.controller.events.counts),
+            'oscillations_per_min': round(reversals / (duration / 60), 3) if duration else 0.0,
+            'cpu_us_per_tick': round(sum(tick_times) / len(tick_times) * 1e6, 2) if tick_times else 0.0,
+            'cpu_us_p99': round(tick_times[int(len(tick_times) * 0.99)] * 1e6, 2) if tick_times else 0.0
+        }
+
+    @staticmethod
+    def _count_reversals(speeds: List[float]) -> int:
+        """Number of times the written speed changed direction"""
+        reversals = 0
+        direction = 0
+        for previous, current in zip(speeds, speeds[1:]):
+            step = (current > previous) - (current < previous)
+            if step and direction and step != direction:
+                reversals += 1
+            if step:
+                direction = step
+        return reversals
+
+
+def replay_file(path: str, curves_path: Optional[str] = None, threshold: float = 80.0,
+                options: Optional[Dict] = None) -> Dict:
+    """Replay one trace file and return its metrics, tagged with the file name (options: Replay arguments)"""
+    metrics = Replay(load_trace(path), curves_path, threshold, **(options or {})).run()
+    metrics['trace'] = path
+    return metrics
+
+
+def replay_many(paths: List[str], curves_path: Optional[str] = None, threshold: float = 80.0,
+                workers: Optional[int] = None, options: Optional[Dict] = None) -> List[Dict]:
+    """Replay many trace files in parallel across processes"""
+    if workers == 1 or len(paths) <= 1:
+        return [replay_file(path, curves_path, threshold, options) for path in paths]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(paths) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(replay_file, paths, [curves_path] * len(paths),
+                             [threshold] * len(paths), [options] * len(paths), chunksize=chunksize))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded thermal traces through the fan controller")
+    parser.add_argument('traces', nargs='+', help="trace files (.csv or JSON lines)")
+    parser.add_argument('--curves', help="fan curve configuration to evaluate")
+    parser.add_argument('--threshold', type=float, default=80.0, help="temperature threshold in °C")
+    parser.add_argument('--filter', choices=list(FILTERS), default='ema', help="sample filter to evaluate")
+    parser.add_argument('--mode', choices=('dynamic', 'predictive'), default='dynamic', help="control mode")
+    parser.add_argument('--model', help="thermal model for the predictive mode (default: built-in)")
+    parser.add_argument('--plant', help="thermal model simulating the temperatures from the trace load "
+                                        "and the written speeds ('default' for the built-in model)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    try:
+        options = {
+            'filter_name': args.filter,
+            'predictive': args.mode == 'predictive',
+            'model': ThermalModel.load(args.model) if args.model else None,
+            'plant': (ThermalModel() if args.plant == 'default' else ThermalModel.load(args.plant)) if args.plant else None
+        }
+    except ThermalModelError as e:
+        parser.error(str(e))
+    results = replay_many(args.traces, args.curves, args.threshold, args.workers, options)
+    for metrics in results:
+        print(json.dumps(metrics))
+
+    if len(results) > 1:
+        print(json.dumps({
+            'traces': len(results),
+            'fan_writes': sum(m['fan_writes'] for m in results),
+            'time_above_threshold_s': round(sum(m['time_above_threshold_s'] for m in results), 3),
+            'peak_temp': max(m['peak_temp'] for m in results),
+            'oscillations': sum(m['oscillations'] for m in results),
+            'thermal_events': sum(m['thermal_events'] for m in results),
+            'cpu_us_per_tick': round(sum(m['cpu_us_per_tick'] for m in results) / len(results), 2)
+        }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Sampling scheduler for the controller loop
+Decides how long to wait between ticks and can be woken early by commands
+"""
+
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+class FixedIntervalPolicy:
+    """Always wait the same interval (the historical 0.5 s loop)"""
+
+    name = 'fixed'
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+
+    def next_interval(self, sample: Dict) -> float:
+        return self.interval
+
+
+class AdaptivePolicy:
+    """
+    Slow down while readings are flat, speed up on temperature slope or load spikes.
+    The interval grows geometrically towards max_interval and drops straight
+    to min_interval as soon as a threshold is crossed.
+    """
+
+    name = 'adaptive'
+
+    def __init__(self, min_interval: float = 0.25, max_interval: float = 2.0,
+                 slope_threshold: float = 1.0, stable_band: float = 0.5,
+                 load_threshold: float = 0.75, growth: float = 1.5, min_dt: float = 0.1):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.slope_threshold = slope_threshold  # °C per second
+        self.stable_band = stable_band  # °C
+        self.load_threshold = load_threshold  # busy share of all CPUs since the last tick
+        self.growth = growth
+        # En dessous, l'échantillon est trop proche du précédent (réveil par une commande)
+        # pour une pente fiable: il ne change ni l'intervalle ni la référence
+        self.min_dt = min_dt
+        self.interval = min_interval
+        self.last_time = None
+        self.last_temperature = None
+        self.last_load = None
+
+    def next_interval(self, sample: Dict) -> float:
+        now = sample.get('time', time.monotonic())
+        temperature = sample.get('temperature')
+        load = sample.get('load')
+
+        if self.last_time is not None and now - self.last_time < self.min_dt:
+            return self.interval
+
+        slope = 0.0
+        delta = 0.0
+        if temperature is not None and self.last_temperature is not None:
+            delta = temperature - self.last_temperature
+            slope = delta / (now - self.last_time)
+
+        load_rising = (load is not None and load >= self.load_threshold
+                       and (self.last_load is None or load > self.last_load))
+
+        if abs(slope) >= self.slope_threshold or load_rising:
+            self.interval = self.min_interval
+        elif abs(delta) <= self.stable_band:
+            self.interval = min(self.max_interval, self.interval * self.growth)
+
+        self.last_time = now
+        if temperature is not None:
+            self.last_temperature = temperature
+        if load is not None:
+            self.last_load = load
+        return self.interval
+
+
+class CpuLoad:
+    """CPU utilization from /proc/stat deltas and CPU pressure (PSI), kept open and re-read with pread"""
+
+    def __init__(self, proc_root: str = '/proc'):
+        self.stat_fd = self._open(os.path.join(proc_root, 'stat'))
+        self.pressure_fd = self._open(os.path.join(proc_root, 'pressure', 'cpu'))
+        self.last_busy = 0
+        self.last_total = 0
+
+    @staticmethod
+    def _open(path: str) -> Optional[int]:
+        try:
+            return os.open(path, os.O_RDONLY)
+        except OSError:
+            return None
+
+    def close(self) -> None:
+        for fd in (self.stat_fd, self.pressure_fd):
+            if fd is not None:
+                os.close(fd)
+        self.stat_fd = self.pressure_fd = None
+
+    def utilization(self) -> Optional[float]:
+        """Busy share of all CPUs since the previous call (None on the first call)"""
+        if self.stat_fd is None:
+            return None
+        try:
+            line = os.pread(self.stat_fd, 256, 0).split(b'\n', 1)[0]
+        except OSError:
+            return None
+        # cpu user nice system idle iowait irq softirq steal ...
+        fields = [int(value) for value in line.split()[1:9]]
+        total = sum(fields)
+        busy = total - fields[3] - fields[4]
+        previous_total, previous_busy = self.last_total, self.last_busy
+        self.last_total, self.last_busy = total, busy
+        if not previous_total or total <= previous_total:
+            return None
+        return (busy - previous_busy) / (total - previous_total)
+
+    def pressure(self) -> Optional[float]:
+        """Share of time some task waited for a CPU over the last 10 s (PSI some avg10)"""
+        if self.pressure_fd is None:
+            return None
+        try:
+            line = os.pread(self.pressure_fd, 128, 0).split(b'\n', 1)[0]
+            # some avg10=1.23 avg60=... avg300=... total=...
+            return float(line.split()[1][len(b'avg10='):]) / 100
+        except (OSError, IndexError, ValueError):
+            return None
+
+
+POLICIES = {
+    FixedIntervalPolicy.name: FixedIntervalPolicy,
+    AdaptivePolicy.name: AdaptivePolicy
+}
+
+
+class SamplingScheduler:
+    """Wait between controller ticks according to a policy"""
+
+    def __init__(self, policy=None, loads: Optional[CpuLoad] = None):
+        self.policy = policy or AdaptivePolicy()
+        # Lecteur /proc/stat et PSI, ouvert au premier échantillon
+        self.loads = loads
+        self.wake_event = threading.Event()
+        # Réveil d'une autre boucle que wait() (p. ex. le cœur asyncio), None: wake_event
+        self.waker: Optional[Callable[[], None]] = None
+        self.interval = 0.0
+        self.ticks = 0
+        self.early_wakeups = 0
+        # Running jitter statistics (Welford) over the timed-out waits, in seconds
+        self.jitter_count = 0
+        self.jitter_mean = 0.0
+        self.jitter_m2 = 0.0
+        self.jitter_max = 0.0
+
+    def set_policy(self, name: str) -> bool:
+        """Switch to one of the registered policies by name"""
+        if name not in POLICIES:
+            return False
+        self.policy = POLICIES[name]()
+        return True
+
+    def read_load(self) -> Optional[float]:
+        """
+        CPU load for the policy: busy share of all CPUs since the previous tick
+        (/proc/stat deltas), or the PSI pressure if higher. Unlike the 1-minute load
+        average it reacts within one tick. None if neither can be read
+        """
+        if self.loads is None:
+            self.loads = CpuLoad()
+        utilization = self.loads.utilization()
+        pressure = self.loads.pressure()
+        if utilization is None and pressure is None:
+            return None
+        return max(utilization or 0.0, pressure or 0.0)
+
+    def wake(self) -> None:
+        """Cut the current wait short, e.g. when a command arrives"""
+        if self.waker is not None:
+            self.waker()
+        else:
+            self.wake_event.set()
+
+    def wait(self, sample: Dict) -> bool:
+        """Wait for the next tick. Returns True if woken early"""
+        self.interval = self.policy.next_interval(sample)
+        self.ticks += 1
+        start = time.monotonic()
+        woken = self.wake_event.wait(self.interval)
+        if woken:
+            self.wake_event.clear()
+            self.early_wakeups += 1
+            return True
+
+        jitter = time.monotonic() - start - self.interval
+        self.jitter_count += 1
+        delta = jitter - self.jitter_mean
+        self.jitter_mean += delta / self.jitter_count
+        self.jitter_m2 += delta * (jitter - self.jitter_mean)
+        self.jitter_max = max(self.jitter_max, abs(jitter))
+        return False
+
+    def get_stats(self) -> Dict:
+        """Current interval and jitter statistics, in milliseconds"""
+        variance = self.jitter_m2 / (self.jitter_count - 1) if self.jitter_count > 1 else 0.0
+        return {
+            'policy': self.policy.name,
+            'interval_ms': round(self.interval * 1000, 1),
+            'ticks': self.ticks,
+            'early_wakeups': self.early_wakeups,
+            'jitter_mean_ms': round(self.jitter_mean * 1000, 3),
+            'jitter_std_ms': round(math.sqrt(variance) * 1000, 3),
+            'jitter_max_ms': round(self.jitter_max * 1000, 3)
+        }
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Telemetry server for headless mode
+Serves the telemetry stream and the stdin command set to any number of clients over a
+Unix socket or TCP. Frames are encoded once per tick and shared by every client; they
+may be written from another thread than the event loop's (the asyncio core ticks in one)
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from telemetry import TelemetryEncoder
+
+# Bytes queued for one client above which it stops receiving deltas until it catches up
+DEFAULT_HIGH_WATER = 256 * 1024
+
+
+def parse_address(address: str) -> Tuple[str, ...]:
+    """
+    'unix:/path/to.sock' -> ('unix', path); 'tcp:host:port' or 'host:port' -> ('tcp', host, port).
+    Without a host (':port') only the loopback is used: binding every interface takes an explicit 0.0.0.0
+    """
+    if address.startswith('unix:'):
+        return ('unix', address[len('unix:'):])
+    if address.startswith('tcp:'):
+        address = address[len('tcp:'):]
+    host, sep, port = address.rpartition(':')
+    if not sep or not port.isdigit():
+        raise ValueError(f"Invalid address {address!r}: expected unix:PATH or [tcp:]HOST:PORT")
+    return ('tcp', host.strip('[]') or '127.0.0.1', int(port))
+
+
+async def open_connection(address: str, limit: int = 2 ** 20):
+    """Connect to a unix:/tcp: address, returning (reader, writer)"""
+    parsed = parse_address(address)
+    if parsed[0] == 'unix':
+        return await asyncio.open_unix_connection(parsed[1], limit=limit)
+    return await asyncio.open_connection(parsed[1], parsed[2], limit=limit)
+
+
+class _Client:
+    """One connected consumer and its position in the shared stream"""
+
+    __slots__ = ('writer', 'name', 'needs_keyframe', 'skipped')
+
+    def __init__(self, writer: asyncio.StreamWriter, name: str):
+        self.writer = writer
+        self.name = name
+        # Un nouveau client (ou un client qui a pris du retard) repart d'une trame complète
+        self.needs_keyframe = True
+        self.skipped = 0
+
+
+class TelemetryServer:
+    """
+    Broadcast telemetry to socket clients; a drop-in for the controller's TelemetryEncoder
+    (write, write_message, request_keyframe, bytes_sent)
+    """
+
+    def __init__(self, target, address: str, encoding: str = 'json',
+                 handle_command: Optional[Callable] = None, high_water: int = DEFAULT_HIGH_WATER):
+        self.target = target
+        self.address = address
+        self.encoder = TelemetryEncoder(encoding=encoding)
+        self.handle_command = handle_command
+        self.high_water = high_water
+        self.clients: Dict[asyncio.StreamWriter, _Client] = {}
+        # Client dont la commande est en cours de traitement: reçoit la réponse seul.
+        # Propre à chaque thread: la boucle accuse réception pendant que le tick répond
+        self._routing = threading.local()
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread: Optional[int] = None
+        self.bytes_sent = 0
+        self.connections = 0
+        self.frames_skipped = 0
+
+    @property
+    def current(self) -> Optional[_Client]:
+        return getattr(self._routing, 'client', None)
+
+    @current.setter
+    def current(self, client: Optional[_Client]) -> None:
+        self._routing.client = client
+
+    async def start(self) -> None:
+        """Start listening"""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        parsed = parse_address(self.address)
+        if parsed[0] == 'unix':
+            path = parsed[1]
+            if os.path.exists(path):
+                os.unlink(path)
+            self.server = await asyncio.start_unix_server(self._serve_client, path)
+        else:
+            self.server = await asyncio.start_server(self._serve_client, parsed[1], parsed[2])
+        print(f"Serving telemetry on {self.address}", file=sys.stderr)
+
+    async def close(self) -> None:
+        """Stop listening and disconnect every client"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for writer in list(self.clients):
+            writer.close()
+        self.clients.clear()
+
+    @property
+    def encoding(self) -> str:
+        return self.encoder.encoding
+
+    def _call(self, send: Callable, *args) -> Optional[int]:
+        """Run send now on the loop's thread, else hand it to the loop (transports are not thread-safe)"""
+        if self.loop is None or threading.get_ident() == self.loop_thread:
+            return send(*args)
+        self.loop.call_soon_threadsafe(send, *args)
+        return None
+
+    def write(self, data: Dict) -> int:
+        """
+        Encode one tick once and send it to every client that keeps up. Returns the bytes
+        sent, or the frame size when called from another thread than the loop's
+        """
+        frame = self.encoder.encode(data)
+        keyframe = None
+        if any(client.needs_keyframe for client in list(self.clients.values())):
+            # Trame complète encodée ici, au même numéro de séquence que le delta
+            keyframe = self.encoder.keyframe() or frame
+        sent = self._call(self._broadcast, frame, keyframe)
+        return len(frame) if sent is None else sent
+
+    def _broadcast(self, frame: bytes, keyframe: Optional[bytes]) -> int:
+        sent = 0
+        for client in list(self.clients.values()):
+            transport = client.writer.transport
+            if transport.is_closing():
+                continue
+            if transport.get_write_buffer_size() > self.high_water:
+                # Client trop lent: sauter les deltas, il repartira d'une trame complète
+                client.needs_keyframe = True
+                client.skipped += 1
+                self.frames_skipped += 1
+                continue
+            if client.needs_keyframe:
+                if keyframe is None:
+                    # Arrivé après l'encodage de cette trame: servi à la suivante
+                    continue
+                payload = keyframe
+                client.needs_keyframe = False
+            else:
+                payload = frame
+            client.writer.write(payload)
+            sent += len(payload)
+        self.bytes_sent += sent
+        return sent
+
+    def write_message(self, message: Dict) -> int:
+        """Send a standalone message to the client whose command is being handled, else to all"""
+        payload = self.encoder.encode_message(message)
+        clients = [self.current] if self.current is not None else list(self.clients.values())
+        self._call(self._send, payload, clients)
+        return len(payload)
+
+    def _send(self, payload: bytes, clients) -> int:
+        for client in clients:
+            if not client.writer.transport.is_closing():
+                client.writer.write(payload)
+        self.bytes_sent += len(payload) * len(clients)
+        return len(payload)
+
+    def request_keyframe(self) -> None:
+        """Resend a full frame to the requesting client (every client outside a command)"""
+        clients = [self.current] if self.current is not None else self.clients.values()
+        for client in clients:
+            client.needs_keyframe = True
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info('peername') or 'unix'
+        client = _Client(writer, str(peer))
+        self.clients[writer] = client
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if self.handle_command is None:
+                    continue
+                self.current = client
+                try:
+                    self.handle_command(self.target, line.decode(errors='replace'))
+                finally:
+                    self.current = None
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.clients.pop(writer, None)
+            writer.close()
+
+    def get_stats(self) -> Dict:
+        return {
+            'clients': len(self.clients),
+            'connections': self.connections,
+            'frames_skipped': self.frames_skipped,
+            'bytes_sent': self.bytes_sent
+        }
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Telemetry stream encoder
+Versioned frames: a full frame first, then only the fields that changed
+"""
+
+import json
+import struct
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+PROTOCOL_VERSION = 1
+# Binary frames: magic, protocol version, payload length (big endian), msgpack payload
+BINARY_MAGIC = b'NF'
+BINARY_HEADER = struct.Struct('>2sBI')
+
+ENCODINGS = ('json', 'msgpack', 'legacy')
+
+# Encodeur JSON construit une fois: json.dumps avec des options en recrée un à chaque appel.
+# UTF-8 brut plutôt que des échappements \uXXXX ("°C" dans sensor_data: 2 octets au lieu de 6)
+_JSON_ENCODER = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+# Sentinel for keys absent from the previous frame (None is a valid value)
+_MISSING = object()
+
+
+def _round_floats(value, digits: int):
+    """Round every float of a frame so sensor noise below the precision is not sent"""
+    if isinstance(value, float):
+        return round(value, digits)
+    if isinstance(value, dict):
+        return {key: _round_floats(item, digits) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_round_floats(item, digits) for item in value]
+    return value
+
+
+def update(state: Dict, new: Dict, digits: int) -> Tuple[Dict, List[List]]:
+    """
+    Bring state (the last frame sent, floats already rounded) up to new, in place.
+    Returns (changed, removed): a nested dict of the new or modified values, rounded
+    to digits, and the key paths that no longer exist
+    """
+    removed = []
+    return _update(state, new, digits, (), removed), removed
+
+
+def _update(state: Dict, new: Dict, digits: int, path: Tuple, removed: List[List]) -> Dict:
+    # Un seul passage sur new, un test de type par champ: ni copie de l'état ni
+    # ensemble des items à chaque trame
+    changed = {}
+    get = state.get
+    for key, value in new.items():
+        previous = get(key, _MISSING)
+        cls = type(value)
+        if cls is float:
+            value = round(value, digits)
+            if previous == value and type(previous) is float:
+                continue
+        elif cls is dict:
+            if type(previous) is dict:
+                # Sous-arbre inchangé (valeurs déjà arrondies): une comparaison en C suffit.
+                # 1 == 1.0 ici, mais JSON ne les distingue pas pour le frontend
+                if value == previous:
+                    continue
+                sub_changed = _update(previous, value, digits, path + (key,), removed)
+                if sub_changed:
+                    changed[key] = sub_changed
+                continue
+            # Copie arrondie: l'état ne doit pas partager les dicts de l'appelant
+            value = _round_floats(value, digits)
+        elif cls is list:
+            value = _round_floats(value, digits)
+            if previous == value and type(previous) is list:
+                continue
+        elif previous == value and type(previous) is cls:
+            continue
+        state[key] = value
+        changed[key] = value
+
+    if len(state) > len(new):
+        for key in [key for key in state if key not in new]:
+            del state[key]
+            removed.append(list(path + (key,)))
+    return changed
+
+
+def apply_delta(state: Dict, changed: Dict, removed: List[List]) -> Dict:
+    """Apply a delta produced by diff() to a decoded state, in place"""
+    for key_path in removed:
+        target = state
+        for key in key_path[:-1]:
+            target = target.get(key, {})
+        target.pop(key_path[-1], None)
+    _merge(state, changed)
+    return state
+
+
+def _merge(state: Dict, changed: Dict) -> None:
+    for key, value in changed.items():
+        if isinstance(value, dict) and isinstance(state.get(key), dict):
+            _merge(state[key], value)
+        else:
+            state[key] = value
+
+
+class TelemetryEncoder:
+    """Turn successive telemetry dicts into full/delta frames"""
+
+    def __init__(self, encoding: str = 'json', keyframe_interval: int = 120,
+                 float_digits: int = 2, output=None):
+        if encoding == 'msgpack' and msgpack is None:
+            print("msgpack is not installed, falling back to JSON telemetry", file=sys.stderr)
+            encoding = 'json'
+        self.encoding = encoding
+        self.keyframe_interval = keyframe_interval
+        self.float_digits = float_digits
+        self.output = output
+        self.state: Optional[Dict] = None
+        self.seq = 0
+        self.frames_since_keyframe = 0
+        self.bytes_sent = 0
+        # Les acquittements partent du thread stdin pendant que la boucle écrit ses trames
+        self.write_lock = threading.Lock()
+
+    def request_keyframe(self) -> None:
+        """Send a full frame next time (e.g. after a consumer lost a delta)"""
+        self.state = None
+
+    def build_frame(self, data: Dict) -> Dict:
+        """Return the frame to send for this tick (an empty delta still acts as a heartbeat)"""
+        if self.encoding == 'legacy':
+            return data
+
+        self.seq += 1
+        if self.state is None or self.frames_since_keyframe >= self.keyframe_interval:
+            self.state = _round_floats(data, self.float_digits)
+            self.frames_since_keyframe = 0
+            return {'v': PROTOCOL_VERSION, 'type': 'full', 'seq': self.seq, 'data': self.state}
+
+        changed, removed = update(self.state, data, self.float_digits)
+        self.frames_since_keyframe += 1
+        frame = {'v': PROTOCOL_VERSION, 'type': 'delta', 'seq': self.seq}
+        if changed:
+            frame['set'] = changed
+        if removed:
+            frame['del'] = removed
+        return frame
+
+    def keyframe(self) -> Optional[bytes]:
+        """
+        Full frame of the current state at the current sequence number, for a consumer
+        joining the stream: the next delta applies on top of it. None before the first tick
+        """
+        if self.encoding == 'legacy' or self.state is None:
+            return None
+        return self._serialize({'v': PROTOCOL_VERSION, 'type': 'full', 'seq': self.seq, 'data': self.state})
+
+    def encode(self, data: Dict) -> bytes:
+        """Encode one tick as bytes ready to be written to the stream"""
+        return self._serialize(self.build_frame(data))
+
+    def encode_message(self, message: Dict) -> bytes:
+        """Encode a standalone message (reply, event...) outside the delta stream"""
+        return self._serialize(dict(message, v=PROTOCOL_VERSION))
+
+    def _serialize(self, frame: Dict) -> bytes:
+        if self.encoding == 'msgpack':
+            payload = msgpack.packb(frame, use_bin_type=True)
+            return BINARY_HEADER.pack(BINARY_MAGIC, PROTOCOL_VERSION, len(payload)) + payload
+        return _JSON_ENCODER.encode(frame).encode() + b'\n'
+
+    def write_message(self, message: Dict) -> int:
+        """Write a standalone message, e.g. a command reply, to the output stream"""
+        return self._write(self.encode_message(message))
+
+    def write(self, data: Dict) -> int:
+        """Encode one tick and write it to the output stream. Returns the number of bytes"""
+        return self._write(self.encode(data))
+
+    def _write(self, encoded: bytes) -> int:
+        output = self.output or sys.stdout.buffer
+        with self.write_lock:
+            output.write(encoded)
+            output.flush()
+            self.bytes_sent += len(encoded)
+        return len(encoded)
+
+
+class TelemetryDecoder:
+    """Rebuild the telemetry state from a framed byte stream"""
+
+    def __init__(self):
+        self.buffer = b''
+        self.state: Optional[Dict] = None
+        self.seq = None
+        self.needs_keyframe = False
+
+    def feed(self, chunk: bytes) -> List[Dict]:
+        """Consume a chunk of the stream, returning the full states it completes"""
+        self.buffer += chunk
+        states = []
+        for frame in self._frames():
+            state = self.apply(frame)
+            if state is not None:
+                states.append(state)
+        return states
+
+    def apply(self, frame: Dict) -> Optional[Dict]:
+        """Apply one decoded frame, returning the updated state or None if a keyframe is needed"""
+        if 'v' not in frame:
+            # Trame héritée: le dict complet sans enveloppe
+            self.state = frame
+            return frame
+        if frame['type'] not in ('full', 'delta'):
+            # Message hors flux (réponse à une commande...): ne modifie pas l'état
+            return None
+        if frame['type'] == 'full':
+            self.state = frame['data']
+        elif self.state is None or frame['seq'] != self.seq + 1:
+            self.needs_keyframe = True
+            self.seq = frame['seq']
+            return None
+        else:
+            apply_delta(self.state, frame.get('set', {}), frame.get('del', []))
+        self.seq = frame['seq']
+        self.needs_keyframe = False
+        return self.state
+
+    def _frames(self):
+        while self.buffer:
+            if self.buffer.startswith(BINARY_MAGIC):
+                if len(self.buffer) < BINARY_HEADER.size:
+                    return
+                _, _, length = BINARY_HEADER.unpack_from(self.buffer)
+                end = BINARY_HEADER.size + length
+                if len(self.buffer) < end:
+                    return
+                payload = self.buffer[BINARY_HEADER.size:end]
+                self.buffer = self.buffer[end:]
+                if msgpack is not None:
+                    yield msgpack.unpackb(payload, raw=False)
+                continue
+
+            newline = self.buffer.find(b'\n')
+            if newline == -1:
+                return
+            line = self.buffer[:newline].strip()
+            self.buffer = self.buffer[newline + 1:]
+            if line.startswith(b'{'):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+@pytest.fixture
+def controller():
+    """NBFCController on fake sources (no sysfs, in-memory NBFC service), dynamic mode"""
+    from benchmarks.suite import make_controller
+    controller = make_controller()
+    yield controller
+    controller.hwmon.close()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import threading
+import time
+
+from async_core import AsyncController
+from fan_writes import FanWritePipeline
+from nbfc_client import FakeBackend, NBFCClient
+from nbfc_control_api import handle_command
+from scheduler import FixedIntervalPolicy
+from server import TelemetryServer, open_connection
+
+
+def slow_nbfc(controller, latency: float) -> None:
+    """NBFC service answering reads and writes after latency seconds"""
+    controller.nbfc = NBFCClient(backends=[FakeBackend(['CPU Fan', 'GPU Fan'], latency=latency)])
+    controller.fan_writes = FanWritePipeline(controller.nbfc, metrics=controller.metrics)
+    controller.scheduler.policy = FixedIntervalPolicy(0.1)
+
+
+def record_frames(controller, threads=None):
+    frames = []
+
+    def write(data):
+        frames.append((time.monotonic(), data))
+        if threads is not None:
+            threads.add(threading.get_ident())
+    controller.telemetry.write = write
+    return frames
+
+
+def run_for(controller, seconds: float, commands=(), timeout: float = 0.5):
+    """Run the async core for a while, feeding text commands halfway; returns it and the shutdown time"""
+    async def scenario():
+        reader = asyncio.StreamReader()
+        core = AsyncController(controller, timeout=timeout, handle_command=handle_command)
+        task = asyncio.create_task(core.run(reader))
+        await asyncio.sleep(seconds / 2)
+        for command in commands:
+            reader.feed_data(command.encode() + b'\n')
+        await asyncio.sleep(seconds / 2)
+        reader.feed_eof()
+        stop = time.monotonic()
+        await task
+        return core, time.monotonic() - stop
+    return asyncio.run(scenario())
+
+
+def test_slow_nbfc_does_not_hold_back_frames(controller):
+    slow_nbfc(controller, latency=1.0)
+    frames = record_frames(controller)
+    core, _ = run_for(controller, 1.6)
+    gaps = [b[0] - a[0] for a, b in zip(frames, frames[1:])]
+    # Trames à la cadence de l'ordonnanceur (0,1 s + budget de lecture), pas à celle de NBFC
+    assert len(frames) >= 8
+    assert max(gaps) < 0.4
+    # La lecture lente a fini par aboutir et les trames suivantes l'utilisent
+    assert core.last_nbfc_time is not None
+    assert frames[-1][1]['async']['nbfc_age_s'] < 1.0
+    assert core.timeouts == 1
+
+
+def test_commands_applied_while_nbfc_hangs(controller):
+    slow_nbfc(controller, latency=30.0)
+    frames = record_frames(controller)
+    core, shutdown = run_for(controller, 1.0, commands=['set_mode fixed', 'set_all_fans_speed 70'])
+    assert frames[-1][1]['fanSpeed'] == 70
+    assert frames[-1][1]['status'] == 'Fixed'
+    assert core.last_nbfc_time is None
+    # Lecture et écriture bloquées: abandonnées à l'arrêt au lieu de bloquer la sortie
+    assert shutdown < 1.0
+
+
+def test_hung_read_is_not_restarted(controller):
+    slow_nbfc(controller, latency=30.0)
+    calls = []
+    get_status = controller.nbfc.get_status
+    controller.nbfc.get_status = lambda: calls.append(1) or get_status()
+    record_frames(controller)
+    core, _ = run_for(controller, 1.0)
+    assert len(calls) == 1
+    assert core.get_stats()['timeouts'] == 1
+
+
+def test_slow_command_is_killed(controller):
+    core = AsyncController(controller, timeout=0.2)
+    start = time.monotonic()
+    assert asyncio.run(core.run_command(['sleep', '5'])) is None
+    assert time.monotonic() - start < 2.0
+    assert core.timeouts == 1
+
+
+def test_tick_runs_off_the_event_loop_and_hooks_are_explicit(controller):
+    controller.scheduler.policy = FixedIntervalPolicy(0.1)
+    threads = set()
+    frames = record_frames(controller, threads)
+    core, _ = run_for(controller, 0.6, commands=['set_mode fixed', 'set_all_fans_speed 55'])
+    assert frames[-1][1]['fanSpeed'] == 55
+    # asyncio.run tourne dans ce thread: les trames ont été produites ailleurs
+    assert threading.get_ident() not in threads
+    # Crochets posés puis retirés, sans remplacer de méthode du contrôleur
+    assert 'write_fan_speed' not in vars(controller)
+    assert 'wake' not in vars(controller.scheduler)
+    assert controller.scheduler.waker is None
+    assert controller.fan_writes.inline and controller.fan_writes.notify is None
+
+
+def test_headless_replies_go_to_the_requesting_client(controller, tmp_path):
+    controller.scheduler.policy = FixedIntervalPolicy(0.1)
+
+    async def read_messages(reader, until):
+        messages = []
+        while not any(until(message) for message in messages):
+            line = await asyncio.wait_for(reader.readline(), 2.0)
+            messages.append(json.loads(line))
+        return messages
+
+    async def scenario():
+        server = TelemetryServer(controller, f'unix:{tmp_path}/nbfc.sock', handle_command=handle_command)
+        core = AsyncController(controller, handle_command=handle_command)
+        task = asyncio.create_task(core.run(server=server))
+        while server.loop is None:
+            await asyncio.sleep(0.01)
+        first, _ = await open_connection(server.address)
+        second, writer = await open_connection(server.address)
+        await asyncio.sleep(0.2)
+        writer.write(b'{"id": 7, "cmd": "set_mode", "args": ["fixed"]}\n')
+        replies = await read_messages(second, lambda message: message['type'] == 'result')
+        # Jusqu'à une trame postérieure à la réponse: une réponse mal routée serait passée avant
+        last_seq = max(message.get('seq', 0) for message in replies)
+        others = await read_messages(first, lambda message: message.get('seq', 0) > last_seq)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return replies, others
+
+    replies, others = asyncio.run(scenario())
+    assert replies[-1]['id'] == 7 and replies[-1]['ok']
+    assert {'full', 'ack'} <= {message['type'] for message in replies}
+    # Trames pour tous, réponse au seul client qui a envoyé la commande
+    assert others[0]['type'] == 'full'
+    assert not [message for message in others if message['type'] in ('ack', 'result')]
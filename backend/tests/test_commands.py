@@ -0,0 +1,124 @@
+import pytest
+
+from commands import MAX_BATCH, CommandError, CommandQueue, parse_request
+from nbfc_control_api import handle_command
+
+
+def capture(controller):
+    messages = []
+    controller.telemetry.write_message = lambda message: messages.append(message) or 0
+    return messages
+
+
+def test_text_command():
+    request = parse_request('  set_mode dynamic \n')
+    assert request.request_id is None and not request.batch
+    assert request.commands == [('set_mode', ['dynamic'])]
+    assert parse_request('   \n') is None
+
+
+def test_json_command():
+    request = parse_request('{"id": 3, "cmd": "set_fan_speed", "args": [0, 50]}')
+    assert request.request_id == 3 and not request.batch
+    assert request.commands == [('set_fan_speed', [0, 50])]
+    # Argument seul: mis en liste
+    assert parse_request('{"cmd": "apply_profile", "args": "Silent"}').commands == [('apply_profile', ['Silent'])]
+
+
+def test_batch():
+    request = parse_request('{"id": "b1", "batch": [{"cmd": "set_mode", "args": ["fixed"]}, '
+                            '{"cmd": "set_all_fans_speed", "args": [40]}]}')
+    assert request.batch and request.request_id == 'b1'
+    assert [name for name, _ in request.commands] == ['set_mode', 'set_all_fans_speed']
+
+
+def test_batch_cap():
+    batch = ','.join(['{"cmd": "stats"}'] * MAX_BATCH)
+    assert len(parse_request(f'{{"id": 1, "batch": [{batch}]}}').commands) == MAX_BATCH
+    with pytest.raises(CommandError) as error:
+        parse_request(f'{{"id": 2, "batch": [{batch}, {{"cmd": "stats"}}]}}')
+    assert error.value.request_id == 2
+
+
+@pytest.mark.parametrize('line, request_id', [
+    ('{"id": 7, "cmd": "set_mode", "args": [', 7),
+    ('{"cmd": "x", "id": "abc"', 'abc'),
+    ('{"cmd": "x"', None),
+    ('{"id": 4, "batch": []}', 4),
+    ('{"id": 5, "args": [1]}', 5),
+    ('{}', None),
+])
+def test_malformed_requests_keep_their_id(line, request_id):
+    with pytest.raises(CommandError) as error:
+        parse_request(line)
+    assert error.value.request_id == request_id
+
+
+def test_queue_refuses_a_request_that_does_not_fit():
+    queue = CommandQueue(size=3)
+    assert queue.put(parse_request('{"batch": [{"cmd": "a"}, {"cmd": "b"}]}'))
+    assert not queue.put(parse_request('{"batch": [{"cmd": "c"}, {"cmd": "d"}]}'))
+    assert queue.put(parse_request('e'))
+    assert len(queue) == 3
+    assert queue.get_stats() == {'pending': 3, 'received': 3, 'rejected': 2}
+    assert [r.commands[0][0] for r in queue.take()] == ['a', 'e']
+    assert len(queue) == 0 and queue.take() == []
+
+
+def test_ack_and_result_messages(controller):
+    messages = capture(controller)
+    controller.fan_writes.max_writes_per_second = 0
+    handle_command(controller, '{"id": 1, "cmd": "set_all_fans_speed", "args": [40]}\n')
+    handle_command(controller, '{"id": 2, "batch": [{"cmd": "set_mode", "args": ["fixed"]}, '
+                               '{"cmd": "nope"}]}\n')
+    assert messages == [{'type': 'ack', 'id': 1, 'ok': True, 'queued': 1},
+                        {'type': 'ack', 'id': 2, 'ok': True, 'queued': 3}]
+
+    messages.clear()
+    assert controller.apply_commands() == 2
+    single, batch = messages
+    assert single['type'] == 'result' and single['id'] == 1 and single['ok']
+    assert single['result'] == 'applied'
+    assert single['queue_ms'] >= 0
+    assert batch['id'] == 2 and not batch['ok']
+    assert batch['results'][0] == {'ok': True, 'result': None}
+    assert not batch['results'][1]['ok'] and 'unknown command' in batch['results'][1]['error']
+
+
+def test_speed_result_reports_queued_and_failed_writes(controller):
+    messages = capture(controller)
+    # Limiteur: la deuxième écriture attend la fenêtre suivante
+    controller.fan_writes.max_writes_per_second = 1
+    handle_command(controller, '{"id": 1, "cmd": "set_fan_speed", "args": [0, 30]}')
+    handle_command(controller, '{"id": 2, "cmd": "set_fan_speed", "args": [0, 60]}')
+    controller.apply_commands()
+    results = {m['id']: m for m in messages if m['type'] == 'result'}
+    assert results[1]['result'] == 'applied'
+    assert results[2]['ok'] and results[2]['result'] == 'queued'
+
+    # NBFC rejette l'écriture: échec signalé, pas « ok »
+    messages.clear()
+    controller.nbfc.backends[0].set_speeds = lambda speeds: False
+    controller.fan_writes.next_write_time = 0.0
+    handle_command(controller, '{"id": 3, "cmd": "set_all_fans_speed", "args": [80]}')
+    controller.apply_commands()
+    result = next(m for m in messages if m['type'] == 'result')
+    assert not result['ok'] and 'rejected' in result['error']
+
+
+def test_invalid_json_with_id_gets_a_negative_ack(controller):
+    messages = capture(controller)
+    handle_command(controller, '{"id": 9, "cmd": "set_mode", "args": [\n')
+    assert messages == [{'type': 'ack', 'id': 9, 'ok': False, 'error': messages[0]['error']}]
+    assert messages[0]['error'].startswith('invalid JSON')
+    assert len(controller.commands) == 0
+
+
+def test_full_queue_rejects_with_an_error_ack(controller):
+    messages = capture(controller)
+    controller.commands = CommandQueue(size=1)
+    handle_command(controller, '{"id": 1, "cmd": "stats"}')
+    handle_command(controller, '{"id": 2, "cmd": "stats"}')
+    handle_command(controller, 'stats')
+    assert messages[1] == {'type': 'ack', 'id': 2, 'ok': False, 'error': 'command queue full'}
+    assert controller.commands.get_stats()['rejected'] == 2
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from fan_curve import CurveConfigError, CurveEngine
+from predictive import DEFAULT_WEIGHTS, THERMAL_MODEL_VERSION, ThermalModel, ThermalModelError
+from profiles import ProfileConfigError, ProfileEngine
+
+
+def write(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content if isinstance(content, str) else json.dumps(content))
+    return str(path)
+
+
+def test_thermal_model_roundtrip(tmp_path):
+    model = ThermalModel({'cpu': (1.0, 2.0, -0.5, -0.03)}, horizon=8.0)
+    path = str(tmp_path / 'thermal_model.json')
+    model.save(path)
+    loaded = ThermalModel.load(path)
+    assert loaded.fitted
+    assert loaded.horizon == 8.0
+    assert loaded.weights['cpu'] == (1.0, 2.0, -0.5, -0.03)
+    assert loaded.weights['gpu'] == tuple(DEFAULT_WEIGHTS)
+
+
+def test_thermal_model_missing_or_other_version_uses_defaults(tmp_path):
+    assert not ThermalModel.load(str(tmp_path / 'absent.json')).fitted
+    path = write(tmp_path, 'old.json', {'version': THERMAL_MODEL_VERSION + 1, 'weights': 'anything'})
+    assert not ThermalModel.load(path).fitted
+
+
+@pytest.mark.parametrize('content', [
+    '{not json',
+    [1, 2, 3],
+    {'version': THERMAL_MODEL_VERSION, 'weights': [1, 2, 3, 4]},
+    {'version': THERMAL_MODEL_VERSION, 'weights': {'cpu': [1, 2, 3]}},
+    {'version': THERMAL_MODEL_VERSION, 'weights': {'cpu': [1, 2, 'x', 4]}},
+    {'version': THERMAL_MODEL_VERSION, 'weights': {'fan': [1, 2, 3, 4]}},
+    {'version': THERMAL_MODEL_VERSION, 'weights': {}, 'horizon': -1},
+])
+def test_thermal_model_malformed_raises_config_error(tmp_path, content):
+    with pytest.raises(ThermalModelError):
+        ThermalModel.load(write(tmp_path, 'thermal_model.json', content))
+
+
+@pytest.mark.parametrize('load, error', [
+    (ThermalModel.load, ThermalModelError),
+    (CurveEngine.load, CurveConfigError),
+    (ProfileEngine.load, ProfileConfigError),
+])
+def test_config_path_is_a_directory(tmp_path, load, error):
+    # Lecture impossible (OSError) même en root: un répertoire à la place du fichier
+    with pytest.raises(error):
+        load(str(tmp_path))
@@ -0,0 +1,157 @@
+import time
+
+from nbfc_client import FakeBackend, NBFCClient
+
+
+class CliOnlyBackend(FakeBackend):
+    """Fake service reached through a forking backend, like nbfc-linux's CLI"""
+    forks = True
+
+
+def test_wait_for_service_polls_systemctl_without_socket(controller):
+    # Seul le CLI parle au service: service_ready() reste faux, systemctl passe actif au 3e appel
+    controller.nbfc = NBFCClient(backends=[CliOnlyBackend()])
+    calls = []
+
+    def run_command(cmd):
+        if cmd[0] == 'systemctl':
+            calls.append(time.monotonic())
+            return 'active' if len(calls) >= 3 else 'inactive'
+        return None
+    controller.run_command = run_command
+
+    assert controller.wait_for_service(timeout=5.0)
+    assert len(calls) == 3
+    # Attente doublée entre deux essais: 0.05 s puis 0.1 s
+    assert calls[2] - calls[0] >= 0.14
+
+
+def test_wait_for_service_gives_up_after_timeout(controller):
+    controller.nbfc = NBFCClient(backends=[CliOnlyBackend()])
+    calls = []
+    controller.run_command = lambda cmd: calls.append(cmd) or 'inactive'
+
+    start = time.monotonic()
+    assert not controller.wait_for_service(timeout=0.3)
+    assert time.monotonic() - start < 1.0
+    # Backoff: quelques essais seulement, pas une boucle serrée
+    assert 2 <= len(calls) <= 5
+
+
+def hwmon_sample(cpu_rpm: int, gpu_rpm: int = 2500) -> dict:
+    return {'cpu_temp': 60.0, 'gpu_temp': 55.0, 'cpu_fan_rpm': cpu_rpm, 'gpu_fan_rpm': gpu_rpm,
+            'temps': {}, 'fan_rpms': {'fan1': cpu_rpm, 'fan2': gpu_rpm}, 'sensor_data': {}}
+
+
+def run_ticks(controller, now, rpms, step: float = 1.0):
+    """Tick once per RPM reading of the CPU fan, step seconds apart on the clock now[0]"""
+    controller.clock = lambda: now[0]
+    messages = []
+    controller.telemetry.write_message = lambda message: messages.append(message) or 0
+    frames = []
+    for rpm in rpms:
+        controller.read_sensors = lambda rpm=rpm: hwmon_sample(rpm)
+        frames.append(controller.tick())
+        now[0] += step
+    return [m for m in messages if m.get('type') == 'event'], frames
+
+
+def test_measured_zero_rpm_with_speed_raises_fan_stall(controller):
+    controller.set_mode(False)
+    for fan in controller.nbfc.backends[0].fans:
+        fan['speed'] = 50.0
+    stall_time = controller.events.stall_time
+    now = [1000.0]
+
+    # Tachymètre à 3000 puis à 0 alors que NBFC annonce 50 %: rien avant stall_time
+    events, _ = run_ticks(controller, now, [3000] * 3 + [0] * int(stall_time))
+    assert not [e for e in events if e['event'] == 'fan_stall']
+
+    events, frames = run_ticks(controller, now, [0, 0])
+    stalls = [e for e in events if e['event'] == 'fan_stall']
+    assert len(stalls) == 1
+    assert stalls[0]['state'] == 'start' and stalls[0]['channel'] == controller.model.fans[0].name
+    # Le régime mesuré n'est pas remplacé par celui déduit de la vitesse
+    assert controller.model.fans[0].measured_rpm == 0
+    assert frames[-1]['cpu']['rpm'] < 3000
+
+    # Le ventilateur repart: fin du calage
+    events, _ = run_ticks(controller, now, [3000])
+    assert [(e['event'], e['state']) for e in events] == [('fan_stall', 'end')]
+
+
+def test_rpm_derived_from_speed_without_tachometer(controller):
+    controller.set_mode(False)
+    for fan in controller.nbfc.backends[0].fans:
+        fan['speed'] = 50.0
+    sample = hwmon_sample(0)
+    del sample['fan_rpms']['fan1']
+    controller.read_sensors = lambda: sample
+    fans = controller.get_fan_status()
+    assert fans.fans[0].measured_rpm is None
+    assert fans.fans[0].rpm == int(0.5 * controller.max_rpm)
+    assert fans.fans[1].measured_rpm == fans.fans[1].rpm == 2500
+
+
+def test_auto_profile_needs_rules(controller):
+    from profiles import ProfileEngine
+
+    # Sans profiles.json: pas de règle, Auto est refusé et signalé au frontend
+    assert controller.tick()['profiles']['rules'] == 0
+    assert controller.apply_profile('Auto') is False
+    assert controller.apply_profile('Silent')
+    assert controller.profiles.manual
+
+    controller.profiles = ProfileEngine.from_config({'rules': [{'profile': 'Turbo', 'when': {'time': '22:00-07:00'}}]})
+    assert controller.tick()['profiles']['rules'] == 1
+    assert controller.apply_profile('Auto') is True
+    assert not controller.profiles.manual
+
+
+THREE_FAN_SENSORS = """coretemp-isa-0000
+Adapter: ISA adapter
+Package id 0:  +61.0°C
+Core 0:        +58.0°C
+
+nvme-pci-0100
+Adapter: PCI adapter
+Composite:     +44.0°C
+
+acer-isa-0000
+Adapter: ISA adapter
+fan1:        2100 RPM
+fan2:        2300 RPM
+fan3:        1900 RPM
+temp2:        +55.0°C
+"""
+
+
+def test_three_fans_and_named_sources_are_kept_apart(tmp_path):
+    from benchmarks.suite import make_controller
+
+    # Même machine lue par sysfs puis par `sensors`: mêmes sources "pilote:libellé"
+    root = tmp_path / 'hwmon'
+    for directory, files in (('hwmon0', {'name': 'coretemp', 'temp1_label': 'Package id 0', 'temp1_input': '61000',
+                                          'temp2_label': 'Core 0', 'temp2_input': '58000'}),
+                             ('hwmon1', {'name': 'nvme', 'temp1_label': 'Composite', 'temp1_input': '44000'}),
+                             ('hwmon2', {'name': 'acer', 'fan1_input': '2100', 'fan2_input': '2300',
+                                         'fan3_input': '1900', 'temp2_input': '55000'})):
+        (root / directory).mkdir(parents=True)
+        for name, value in files.items():
+            (root / directory / name).write_text(value + '\n')
+
+    models = []
+    for controller in (make_controller(sysfs_root=str(root), fans=3),
+                       make_controller(sensors_dump=THREE_FAN_SENSORS, fans=3)):
+        controller.set_mode(False)
+        controller.model.map_sensor(2, 'nvme:Composite')
+        model = controller.get_fan_status()
+        models.append(model)
+        controller.hwmon.close()
+
+    for model in models:
+        assert len(model.fans) == 3
+        assert [fan.measured_rpm for fan in model.fans] == [2100, 2300, 1900]
+        assert [fan.temperature for fan in model.fans] == [58.0, 55.0, 44.0]
+        assert model.temperature('coretemp:Package id 0') == 61.0
+    assert models[0].temperatures() == models[1].temperatures()
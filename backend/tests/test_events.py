@@ -0,0 +1,108 @@
+"""EventDetector on hand-built samples: threshold, sustained heat, stalls and layout changes"""
+
+from events import EventDetector, EventLog
+from model import SensorModel
+
+
+def make_model():
+    # Le modèle garde toujours au moins deux ventilateurs; seul le premier reçoit des lectures
+    return SensorModel(['Fan 1', 'Fan 2'])
+
+
+def sample(model, temperature=50.0, speed=50.0, rpm=None, sources=None):
+    model.begin_sample()
+    model.set_temperatures(sources or {}, 0.0, 0.0)
+    fan = model.fans[0]
+    fan.temperature = temperature
+    fan.speed = speed
+    fan.measured_rpm = rpm
+    return model
+
+
+def kinds(events, fan='Fan 1'):
+    return [(e['event'], e['state']) for e in events if e['channel'] == fan]
+
+
+def test_threshold_confirmed_then_cleared_below_hysteresis():
+    detector = EventDetector(threshold=85.0, hysteresis=5.0, confirm=2, wall_clock=lambda: 0.0)
+    model = make_model()
+    # Un échantillon isolé au-dessus du seuil ne suffit pas
+    assert not detector.run(sample(model, 90.0), 0.0)
+    assert not detector.run(sample(model, 70.0), 1.0)
+    assert not detector.run(sample(model, 90.0), 2.0)
+    assert kinds(detector.run(sample(model, 90.0), 3.0)) == [('threshold', 'start')]
+    # Dans la bande d'hystérésis: toujours actif
+    assert not detector.run(sample(model, 81.0), 4.0)
+    assert kinds(detector.run(sample(model, 79.0), 5.0)) == [('threshold', 'end')]
+    assert detector.get_stats()['threshold'] == 1
+    assert detector.get_stats()['active'] == 0
+
+
+def test_sustained_needs_the_full_duration():
+    detector = EventDetector(threshold=200.0, sustained_level=80.0, sustained_time=30.0,
+                             hysteresis=5.0, wall_clock=lambda: 0.0)
+    model = make_model()
+    now = 0.0
+    assert not detector.run(sample(model, 82.0), now)
+    # Une baisse dans l'hystérésis ne remet pas le compteur à zéro
+    assert not detector.run(sample(model, 77.0), now + 10)
+    assert not detector.run(sample(model, 82.0), now + 29)
+    assert kinds(detector.run(sample(model, 82.0), now + 30)) == [('sustained', 'start')]
+    assert not detector.run(sample(model, 82.0), now + 60)
+    assert kinds(detector.run(sample(model, 70.0), now + 61)) == [('sustained', 'end')]
+
+
+def test_stall_starts_after_stall_time_and_ends_on_rpm():
+    detector = EventDetector(stall_time=5.0, wall_clock=lambda: 0.0)
+    model = make_model()
+    # Jamais de régime lu: un 0 n'est pas un calage
+    assert not detector.run(sample(model, rpm=0), 0.0)
+    assert not detector.run(sample(model, rpm=0), 10.0)
+    assert not detector.run(sample(model, rpm=2000), 11.0)
+    assert not detector.run(sample(model, rpm=0), 12.0)
+    assert not detector.run(sample(model, rpm=0), 16.0)
+    assert kinds(detector.run(sample(model, rpm=0), 17.0)) == [('fan_stall', 'start')]
+    assert kinds(detector.run(sample(model, rpm=1800), 18.0)) == [('fan_stall', 'end')]
+
+
+def test_stall_ends_when_the_fan_is_stopped_or_loses_its_tachometer():
+    detector = EventDetector(stall_time=1.0, wall_clock=lambda: 0.0)
+    model = make_model()
+
+    def stall(start):
+        detector.run(sample(model, rpm=2000), start)
+        detector.run(sample(model, rpm=0), start + 1)
+        assert kinds(detector.run(sample(model, rpm=0), start + 2)) == [('fan_stall', 'start')]
+
+    stall(0.0)
+    assert kinds(detector.run(sample(model, speed=0.0, rpm=0), 3.0)) == [('fan_stall', 'end')]
+    stall(10.0)
+    assert kinds(detector.run(sample(model, rpm=None), 13.0)) == [('fan_stall', 'end')]
+    assert detector.get_stats()['active'] == 0
+
+
+def test_layout_change_ends_active_conditions():
+    detector = EventDetector(threshold=85.0, confirm=2, stall_time=0.0, wall_clock=lambda: 0.0)
+    model = make_model()
+    detector.run(sample(model, 90.0, rpm=2000), 0.0)
+    detector.run(sample(model, 90.0, rpm=0), 1.0)
+    detector.run(sample(model, 90.0, rpm=0), 2.0)
+    assert detector.get_stats()['active'] == 2
+
+    # Une nouvelle source change la disposition des canaux
+    events = detector.run(sample(model, 90.0, rpm=0, sources={'nvme': 40.0}), 3.0)
+    assert sorted(kinds(events)) == [('fan_stall', 'end'), ('threshold', 'end')]
+    # Le seuil est redétecté sur la nouvelle disposition, le calage attend un nouveau régime
+    assert kinds(detector.run(sample(model, 90.0, rpm=0, sources={'nvme': 40.0}), 4.0)) == \
+        [('threshold', 'start')]
+    assert detector.get_stats()['active'] == 1
+
+
+def test_events_are_logged(tmp_path):
+    log = EventLog(str(tmp_path / 'events.log'))
+    detector = EventDetector(threshold=85.0, confirm=1, log=log, wall_clock=lambda: 42.0)
+    model = make_model()
+    detector.run(sample(model, 90.0), 0.0)
+    assert detector.recent() == [{'type': 'event', 'event': 'threshold', 'state': 'start',
+                                  'channel': 'Fan 1', 'value': 90.0, 'time': 42.0}]
+    log.close()
@@ -0,0 +1,104 @@
+import pytest
+
+from fan_curve import CurveConfigError, CurveEngine, FanCurve, FanCurveController, LUT_STEP
+
+POINTS = [(40, 20), (60, 60), (80, 100)]
+
+
+def test_lut_interpolates_between_points():
+    curve = FanCurve(POINTS)
+    assert curve.evaluate(50) == pytest.approx(40)
+    assert curve.evaluate(70) == pytest.approx(80)
+    # Au pas de la table près
+    assert curve.evaluate(47.33) == pytest.approx(34.66, abs=2 * LUT_STEP)
+    # Plat hors des points, y compris hors de la table
+    assert curve.evaluate(10) == 20
+    assert curve.evaluate(-20) == 20
+    assert curve.evaluate(95) == 100
+    assert curve.evaluate(500) == 100
+
+
+def test_evaluate_batch_matches_evaluate():
+    engine = CurveEngine.from_config({'curves': {'steep': POINTS},
+                                      'fans': {'0': {}, '1': {'curve': 'steep'}}})
+    temps = [30.0, 45.5, 62.0, 79.9, 130.0]
+    batch = engine.evaluate_batch({0: temps, 1: temps})
+    for fan_index, speeds in batch.items():
+        curve = engine.controllers[fan_index].curve
+        assert [float(s) for s in speeds] == [curve.evaluate(t) for t in temps]
+
+
+def test_hysteresis_bands():
+    controller = FanCurveController(FanCurve(POINTS), hysteresis_up=2.0, hysteresis_down=3.0,
+                                    rate_up=1000, rate_down=1000, min_change=0)
+    # Montée: la courbe est évaluée 2 °C plus bas (50 °C -> 48 °C -> 36 %)
+    assert controller.step(50, 0) == pytest.approx(36)
+    assert controller.step(51, 1) == pytest.approx(38)
+    # Descente: évaluée 3 °C plus haut, la vitesse tient jusqu'à 46 °C inclus
+    assert controller.step(50, 2) == pytest.approx(38)
+    assert controller.step(46, 3) == pytest.approx(38)
+    assert controller.step(44, 4) == pytest.approx(34)
+
+
+def test_rate_limit_per_second():
+    controller = FanCurveController(FanCurve(POINTS), hysteresis_down=0, rate_up=10, rate_down=5,
+                                    min_change=0)
+    controller.step(40, 0)
+    assert controller.step(80, 2) == pytest.approx(40)   # +10 %/s pendant 2 s
+    assert controller.step(80, 10) == pytest.approx(100)  # cible atteinte, pas dépassée
+    assert controller.step(40, 11) == pytest.approx(95)   # -5 %/s
+
+
+def test_min_change_except_at_the_ends():
+    controller = FanCurveController(FanCurve([(40, 0), (60, 100)]), hysteresis_down=0,
+                                    rate_up=1000, rate_down=1000, min_change=5)
+    controller.step(50, 0)
+    assert controller.pending_write() == pytest.approx(50)
+    controller.applied = 50
+    controller.step(50.6, 1)
+    assert controller.pending_write() is None
+    controller.step(51, 2)
+    assert controller.pending_write() == pytest.approx(55)
+    controller.applied = 98
+    controller.step(61, 3)
+    # 100 % s'écrit même à moins de min_change de la dernière écriture
+    assert controller.pending_write() == 100
+
+
+@pytest.mark.parametrize('config, message', [
+    ([], 'must be an object'),
+    ({'curves': []}, "'curves'"),
+    ({'curves': {'bad': [[40, 20]]}}, 'at least two points'),
+    ({'curves': {'bad': [[60, 20], [40, 30]]}}, 'strictly increasing'),
+    ({'curves': {'bad': [[40, 20], [60, 120]]}}, 'outside 0-100'),
+    ({'curves': {'bad': [['x', 20], [60, 30]]}}, 'pairs'),
+    ({'fans': {}}, "'fans'"),
+    ({'fans': {'cpu': {}}}, 'Invalid fan index'),
+    ({'fans': {'0': {'curve': 'missing'}}}, 'unknown curve'),
+    ({'fans': {'0': {'sensor': ''}}}, 'sensor'),
+    ({'fans': {'0': {'hysteresis': {'up': 'high'}}}}, 'must be numbers'),
+    ({'fans': {'0': {'min_change': -1}}}, '>= 0'),
+])
+def test_from_config_validation(config, message):
+    with pytest.raises(CurveConfigError, match=message):
+        CurveEngine.from_config(config)
+
+
+def test_engine_writes_only_after_confirmation(controller):
+    # NBFC rejette les écritures: la courbe ne doit pas croire le ventilateur à la bonne vitesse
+    backend = controller.nbfc.backends[0]
+    backend.set_speeds = lambda speeds: False
+    controller.model.set_temperatures({}, 65.0, 65.0)
+    controller.read_sensors = lambda: {'cpu_temp': 65.0, 'gpu_temp': 65.0, 'cpu_fan_rpm': 0,
+                                       'gpu_fan_rpm': 0, 'sensor_data': {}}
+    controller.tick()
+    assert all(c.applied is None for c in controller.curves.controllers.values())
+    tracked = controller.curves.controllers[0].speed
+    assert controller.fan_writes.get_stats()['failed'] > 0
+
+    # NBFC répond de nouveau: l'écriture remise en attente passe et devient la référence
+    del backend.set_speeds
+    controller.fan_writes.next_write_time = 0.0
+    controller.tick()
+    controller.tick()
+    assert controller.curves.controllers[0].applied == pytest.approx(tracked)
@@ -0,0 +1,142 @@
+from fan_writes import RETRY_DELAY, FanWritePipeline
+
+
+class RecordingClient:
+    """NBFCClient stand-in: records each flushed batch, rejects them while failing is set"""
+
+    def __init__(self):
+        self.queued = {}
+        self.batches = []
+        self.failing = False
+
+    def queue_fan_speed(self, fan_index, speed):
+        self.queued[fan_index] = speed
+
+    def flush(self):
+        batch, self.queued = self.queued, {}
+        if self.failing:
+            return False
+        self.batches.append(batch)
+        return True
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_pipeline(rate=4.0):
+    client, clock = RecordingClient(), Clock()
+    return FanWritePipeline(client, max_writes_per_second=rate, clock=clock), client, clock
+
+
+def test_latest_request_per_fan_wins():
+    pipeline, client, _ = make_pipeline()
+    for speed in (20, 30, 40):
+        pipeline.submit(0, speed)
+    pipeline.submit(1, 55)
+    assert pipeline.flush()
+    assert client.batches == [{0: 40, 1: 55}]
+    stats = pipeline.get_stats()
+    assert (stats['requested'], stats['coalesced'], stats['applied']) == (4, 2, 2)
+
+
+def test_global_write_replaces_pending_per_fan_writes():
+    pipeline, client, _ = make_pipeline()
+    pipeline.submit(0, 20)
+    pipeline.submit(1, 30)
+    pipeline.submit(None, 60)
+    pipeline.flush()
+    assert client.batches == [{None: 60}]
+    assert pipeline.get_stats()['coalesced'] == 2
+    assert pipeline.confirmed(0) == pipeline.confirmed(None) == 60
+
+
+def test_write_equal_to_last_applied_is_skipped():
+    pipeline, client, clock = make_pipeline(rate=0)
+    pipeline.submit(None, 50)
+    pipeline.flush()
+    # Déjà appliqué par l'écriture globale: aucune écriture NBFC
+    pipeline.submit(0, 50)
+    pipeline.flush()
+    pipeline.submit(0, 70)
+    pipeline.flush()
+    assert client.batches == [{None: 50}, {0: 70}]
+    assert pipeline.get_stats()['duplicates'] == 1
+    # Un ventilateur diverge: la vitesse globale n'est plus connue
+    assert pipeline.confirmed(None) is None
+    assert pipeline.confirmed(1) == 50
+
+
+def test_rate_limit_holds_writes_until_next_write_time():
+    pipeline, client, clock = make_pipeline(rate=2.0)
+    pipeline.submit(0, 30)
+    pipeline.submit(1, 40)
+    pipeline.flush()
+    # Deux écritures à 2 par seconde: la fenêtre suivante s'ouvre dans 1 s
+    assert pipeline.delay() is None
+    pipeline.submit(0, 80)
+    assert pipeline.delay() == 1.0
+    pipeline.flush()
+    assert len(client.batches) == 1
+    clock.now += 0.99
+    pipeline.flush()
+    assert len(client.batches) == 1
+    clock.now += 0.01
+    pipeline.flush()
+    assert client.batches[-1] == {0: 80}
+    assert pipeline.get_stats()['pending'] == 0
+
+
+def test_rejected_batch_is_retried():
+    pipeline, client, clock = make_pipeline(rate=0)
+    client.failing = True
+    pipeline.submit(0, 45)
+    assert not pipeline.flush()
+    stats = pipeline.get_stats()
+    assert (stats['failed'], stats['retried'], stats['pending']) == (1, 1, 1)
+    assert pipeline.confirmed(0) is None
+
+    # Pas de nouvel essai avant RETRY_DELAY, même sans limite de débit
+    client.failing = False
+    pipeline.flush()
+    assert client.batches == []
+    clock.now += RETRY_DELAY
+    assert pipeline.flush()
+    assert client.batches == [{0: 45}]
+    assert pipeline.confirmed(0) == 45
+
+
+def test_rejected_write_does_not_override_newer_request():
+    pipeline, client, clock = make_pipeline(rate=0)
+    client.failing = True
+    pipeline.submit(0, 45)
+    pipeline.submit(1, 45)
+    pipeline.flush()
+    pipeline.submit(0, 90)
+    pipeline.submit(0, 90)
+    client.failing = False
+    clock.now += RETRY_DELAY
+    pipeline.flush()
+    assert client.batches == [{0: 90, 1: 45}]
+    # 45 remis en attente puis remplacé par 90; 90 redemandé alors qu'il attend ne compte pas
+    assert pipeline.get_stats()['coalesced'] == 1
+
+
+def test_hand_off_notifies_instead_of_flushing():
+    pipeline, client, _ = make_pipeline()
+    notified = []
+    pipeline.hand_off(lambda: notified.append(1))
+    assert not pipeline.inline
+    pipeline.submit(0, 40)
+    pipeline.submit(0, 40)
+    # Demande identique déjà en attente: personne à réveiller
+    assert notified == [1]
+    assert client.batches == []
+    pipeline.hand_off(None)
+    assert pipeline.inline
+    pipeline.submit(1, 60)
+    assert notified == [1]
@@ -0,0 +1,111 @@
+import random
+import statistics
+from array import array
+
+import pytest
+
+from filters import EMAFilter, FilterStage, KalmanFilter, MedianFilter, SignalFilter, create_filter
+from model import SensorModel
+
+
+def sample(model, rpms, speeds, temperature=50.0):
+    model.begin_sample()
+    model.set_temperatures({}, temperature, temperature)
+    for fan, rpm, speed in zip(model.fans, rpms, speeds):
+        fan.temperature = temperature
+        fan.rpm = rpm
+        fan.speed = speed
+
+
+def test_zero_rpm_is_valid_when_fan_is_stopped():
+    model = SensorModel()
+    stage = FilterStage(SignalFilter())
+    sample(model, rpms=(0, 0), speeds=(0.0, 40.0))
+    stage.run(model)
+    # Ventilateur CPU à 0 %: 0 RPM est une lecture; ventilateur GPU à 40 %: RPM absent
+    assert model.fans[0].missing == ()
+    assert model.fans[1].missing == ('rpm',)
+    assert stage.get_stats()['missing'] == 1
+
+
+def test_dropout_counted_once_per_loss():
+    model = SensorModel()
+    stage = FilterStage(SignalFilter())
+    for rpm in (2000, 0, 0, 0, 2100, 0, 0):
+        sample(model, rpms=(rpm, 2000), speeds=(50.0, 50.0))
+        stage.run(model)
+    stats = stage.get_stats()
+    assert stats['missing'] == 5
+    # Deux pertes (2000 -> 0 puis 2100 -> 0), pas une par tick
+    assert stats['dropouts'] == 2
+
+
+def test_missing_from_start_is_not_a_dropout():
+    model = SensorModel()
+    stage = FilterStage(SignalFilter())
+    for _ in range(3):
+        sample(model, rpms=(0, 0), speeds=(50.0, 50.0))
+        stage.run(model)
+    assert stage.get_stats()['dropouts'] == 0
+    assert not stage.dropped_out(0)
+
+
+def run_filter(signal_filter, readings, valid=None):
+    """Feed one channel through a filter, returning its outputs"""
+    signal_filter.resize(1)
+    outputs = []
+    for i, reading in enumerate(readings):
+        values = array('d', [reading])
+        signal_filter.apply(values, bytearray([1 if valid is None else valid[i]]))
+        outputs.append(values[0])
+    return outputs
+
+
+def test_ema_alpha():
+    assert run_filter(EMAFilter(alpha=0.5), [10, 20, 20, 20]) == [10, 15, 17.5, 18.75]
+    # alpha = 1: pas de lissage
+    assert run_filter(EMAFilter(alpha=1.0), [10, 20, 30]) == [10, 20, 30]
+    # Lecture absente: valeur et état inchangés
+    assert run_filter(EMAFilter(alpha=0.5), [10, 0, 20], valid=[1, 0, 1]) == [10, 0, 15]
+    for alpha in (0, -0.1, 1.5):
+        with pytest.raises(ValueError):
+            EMAFilter(alpha=alpha)
+
+
+def test_median_rejects_isolated_spikes():
+    assert run_filter(MedianFilter(window=5), [50, 50, 95, 50, 50, 0.5, 50]) == [50, 50, 50, 50, 50, 50, 50]
+    # Fenêtre incomplète et paire: moyenne des deux valeurs centrales
+    assert run_filter(MedianFilter(window=5), [50, 60])[1] == 55
+    # Un vrai changement de niveau passe après la moitié de la fenêtre
+    assert run_filter(MedianFilter(window=5), [50] * 5 + [70] * 3) == [50] * 5 + [50, 50, 70]
+    with pytest.raises(ValueError):
+        MedianFilter(window=0)
+
+
+def test_kalman_converges_and_reduces_noise():
+    rng = random.Random(7)
+    readings = [60 + rng.gauss(0, 1.0) for _ in range(400)]
+    outputs = run_filter(KalmanFilter(process_noise=0.01, measurement_noise=1.0), readings)
+    assert statistics.mean(outputs[200:]) == pytest.approx(60, abs=0.3)
+    assert statistics.pstdev(outputs[200:]) < 0.3 * statistics.pstdev(readings[200:])
+
+    # Saut de 60 à 70 °C: suivi en quelques dizaines d'échantillons
+    outputs = run_filter(KalmanFilter(), [60.0] * 50 + [70.0] * 30)
+    assert outputs[50] < 65
+    assert outputs[-1] == pytest.approx(70, abs=0.5)
+
+
+def test_kalman_trusts_the_reading_after_a_gap():
+    kalman = KalmanFilter()
+    steady = run_filter(kalman, [60.0] * 50 + [70.0])[-1]
+    gap = run_filter(KalmanFilter(), [60.0] * 50 + [0.0] * 20 + [70.0], valid=[1] * 50 + [0] * 20 + [1])[-1]
+    # La variance a grandi pendant le manque: la lecture suivante pèse plus
+    assert 60 < steady < gap < 70
+    with pytest.raises(ValueError):
+        KalmanFilter(process_noise=0)
+
+
+def test_create_filter():
+    assert isinstance(create_filter('median'), MedianFilter)
+    with pytest.raises(ValueError):
+        create_filter('lowpass')
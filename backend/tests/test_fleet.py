@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+import pytest
+
+from aggregator import Aggregator, handle_aggregator_command
+from benchmarks.bench_fleet import SimulatedBackend
+from server import TelemetryServer, open_connection, parse_address
+from telemetry import TelemetryDecoder
+
+HOSTS = 5
+
+
+def test_parse_address_defaults_to_loopback():
+    assert parse_address(':8765') == ('tcp', '127.0.0.1', 8765)
+    assert parse_address('tcp::8765') == ('tcp', '127.0.0.1', 8765)
+    # Écouter sur toutes les interfaces doit être demandé explicitement
+    assert parse_address('0.0.0.0:8765') == ('tcp', '0.0.0.0', 8765)
+    assert parse_address('[::1]:8765') == ('tcp', '::1', 8765)
+    assert parse_address('unix:/run/nbfc.sock') == ('unix', '/run/nbfc.sock')
+    with pytest.raises(ValueError):
+        parse_address('localhost')
+
+
+async def wait_until(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        await asyncio.sleep(0.05)
+    return condition()
+
+
+def test_fleet_merged_view_and_command_delivery(tmp_path):
+    async def scenario():
+        backends = [SimulatedBackend(f'host{i}', f'unix:{tmp_path}/host{i}.sock', seed=i) for i in range(HOSTS)]
+        for backend in backends:
+            await backend.server.start()
+        tickers = [asyncio.create_task(backend.run(20.0)) for backend in backends]
+
+        aggregator = Aggregator({backend.name: backend.server.address for backend in backends})
+        server = TelemetryServer(aggregator, f'unix:{tmp_path}/fleet.sock')
+        server.handle_command = lambda target, line: handle_aggregator_command(target, line, server)
+        await server.start()
+        await aggregator.start()
+        try:
+            assert await wait_until(lambda: aggregator.merged_view()['fleet']['online'] == HOSTS)
+
+            # Figer les hôtes pour comparer la vue fusionnée au dernier état émis
+            for task in tickers:
+                task.cancel()
+            await asyncio.gather(*tickers, return_exceptions=True)
+            for backend in backends:
+                backend.server.write(backend.tick())
+            assert await wait_until(lambda: all(
+                aggregator.host_view(backend.name)['cpu']['temperature'] == round(backend.cpu, 2)
+                for backend in backends))
+
+            merged = aggregator.merged_view()
+            cpus = [round(backend.cpu, 2) for backend in backends]
+            gpus = [round(backend.gpu, 2) for backend in backends]
+            hottest = max(backends, key=lambda backend: max(round(backend.cpu, 2), round(backend.gpu, 2)))
+            assert merged['fleet']['hosts'] == merged['fleet']['online'] == HOSTS
+            assert merged['fleet']['cpu_mean'] == pytest.approx(sum(cpus) / HOSTS)
+            assert merged['fleet']['gpu_mean'] == pytest.approx(sum(gpus) / HOSTS)
+            assert merged['fleet']['hottest_host'] == hottest.name
+            assert merged['hosts']['host3']['cpu'] == cpus[3]
+            assert merged['hosts']['host3']['profile'] == 'Balanced'
+
+            # Client de l'agrégateur: reçoit la vue fusionnée, envoie des commandes aux hôtes
+            reader, writer = await open_connection(server.address)
+            decoder = TelemetryDecoder()
+            assert await wait_until(lambda: server.clients)
+            server.write(aggregator.merged_view())
+            states = []
+            while not states:
+                states = decoder.feed(await asyncio.wait_for(reader.read(65536), 2.0))
+            assert states[-1]['fleet']['online'] == HOSTS
+
+            writer.write(b'host host2 apply_profile Silent\nall set_mode dynamic\n')
+            await writer.drain()
+            assert await wait_until(lambda: all(backend.commands for backend in backends)
+                                    and len(backends[2].commands) == 2)
+            assert backends[2].commands == ['apply_profile Silent\n', 'set_mode dynamic\n']
+            for backend in backends[:2] + backends[3:]:
+                assert backend.commands == ['set_mode dynamic\n']
+            writer.close()
+
+            # Hôte arrêté: hors ligne dans la vue fusionnée, les autres restent comptés
+            await backends[0].server.close()
+            assert await wait_until(lambda: not aggregator.merged_view()['hosts']['host0']['online'])
+            assert aggregator.merged_view()['fleet']['online'] == HOSTS - 1
+        finally:
+            await aggregator.stop()
+            await server.close()
+            for backend in backends:
+                await backend.server.close()
+
+    asyncio.run(scenario())
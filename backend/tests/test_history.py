@@ -0,0 +1,59 @@
+import time
+
+from history import TelemetryHistory
+
+TIERS = (('1s', 1, 600), ('1m', 60, 60))
+
+
+def open_history(path) -> TelemetryHistory:
+    return TelemetryHistory(str(path), channels=('cpu_temp',), tiers=TIERS)
+
+
+def test_rollups(tmp_path):
+    history = open_history(tmp_path / 'h.ring')
+    for second in range(120):
+        history.append(1_000_040.0 + second, (40.0 + second % 10,))
+    records = history.query('1m', 0, 2_000_000)
+    assert [record['n'] for record in records] == [40, 60, 20]
+    assert records[1]['cpu_temp'] == [40.0, 44.5, 49.0]
+    assert len(history.query('1s', 1_000_050, 1_000_059)) == 10
+    history.close()
+
+
+def test_backwards_clock_step_keeps_records_sorted(tmp_path):
+    history = open_history(tmp_path / 'h.ring')
+    for second in range(10):
+        history.append(1_000_000.0 + second, (50.0,))
+    # L'horloge murale recule d'une heure
+    for second in range(5):
+        history.append(996_400.0 + second, (60.0,))
+    times = [record['t'] for record in history.query('1s', 0, 2_000_000)]
+    assert times == sorted(times)
+    # Le premier échantillon après le saut a rejoint le dernier bucket au lieu d'en créer un plus ancien
+    assert history.query('1s', 1_000_009, 1_000_009)[0]['n'] == 6
+    history.close()
+
+
+def test_now_ignores_wall_clock_steps(tmp_path, monkeypatch):
+    history = open_history(tmp_path / 'h.ring')
+    before = history.now()
+    monkeypatch.setattr(time, 'time', lambda: 0.0)
+    assert history.now() >= before
+    history.close()
+
+
+def test_reopen_after_clock_went_back(tmp_path):
+    path = tmp_path / 'h.ring'
+    history = open_history(path)
+    future = float(int(time.time()) + 86400)
+    history.append(future, (55.0,))
+    history.close()
+    # Enregistrement plus récent que l'horloge actuelle: la suite reprend après lui
+    history = open_history(path)
+    assert history.now() >= future
+    history.append(history.now(), (56.0,))
+    history.append(history.now() + 1, (57.0,))
+    records = history.query('1s', 0, future + 3600)
+    assert [record['t'] for record in records] == [future, future + 1]
+    assert records[0]['n'] == 2
+    history.close()
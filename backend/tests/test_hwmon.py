@@ -0,0 +1,98 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import FIXTURES
+from hwmon import HwmonReader
+
+SYSFS = os.path.join(FIXTURES, 'sysfs')
+
+
+@pytest.fixture
+def sysfs(tmp_path):
+    """Writable copy of the fixture tree, for tests that unplug or break a sensor"""
+    root = tmp_path / 'sysfs'
+    shutil.copytree(SYSFS, root)
+    return root
+
+
+def open_reader(root) -> HwmonReader:
+    reader = HwmonReader(root=os.path.join(root, 'hwmon'), thermal_root=os.path.join(root, 'thermal'))
+    assert reader.open()
+    return reader
+
+
+def test_reads_temperatures():
+    reader = open_reader(SYSFS)
+    values = reader.read()
+    # Moyenne des cœurs (le capteur "Package id 0" n'est pas un cœur)
+    assert values['cpu_temp'] == pytest.approx(60.0)
+    assert values['gpu_temp'] == pytest.approx(54.0)
+    assert values['temps']['coretemp:Package id 0'] == pytest.approx(61.0)
+    assert values['sensor_data']['edge'] == '+54.0°C'
+    reader.close()
+
+
+def test_reads_fan_rpms():
+    reader = open_reader(SYSFS)
+    values = reader.read()
+    assert values['cpu_fan_rpm'] == 3120
+    # Un ventilateur arrêté rapporte 0 RPM: c'est une vraie lecture
+    assert values['gpu_fan_rpm'] == 0
+    assert values['sensor_data']['cpu_fan'] == '3120 RPM'
+    reader.close()
+
+
+def test_unreadable_input_is_skipped_at_open():
+    reader = open_reader(SYSFS)
+    # fan3_input est vide (connecteur sans ventilateur)
+    assert 'fan3' not in reader.read()['fan_rpms']
+    assert [(i.kind, i.index) for i in reader.inputs if i.chip == 'acer'] == [('fan', 1), ('fan', 2)]
+    reader.close()
+
+
+def test_thermal_zones():
+    reader = open_reader(SYSFS)
+    assert reader.read_thermal_zone(0) == pytest.approx(47.0)
+    # thermal_zone1 n'existe pas dans l'arborescence
+    assert reader.read_thermal_zone(1) == 0
+    reader.close()
+
+
+def test_sensor_failing_after_open(sysfs):
+    reader = open_reader(sysfs)
+    (sysfs / 'hwmon' / 'hwmon1' / 'temp1_input').write_text('garbage\n')
+    values = reader.read()
+    assert values['gpu_temp'] == 0
+    assert 'amdgpu:edge' not in values['temps']
+    assert values['cpu_temp'] == pytest.approx(60.0)
+    reader.close()
+
+
+def test_cached_layout_reopens_without_scan(sysfs):
+    reader = open_reader(sysfs)
+    layout = reader.layout()
+    reader.close()
+    assert reader.open_layout(layout)
+    assert reader.read()['cpu_fan_rpm'] == 3120
+    reader.close()
+
+
+def test_cached_layout_with_unplugged_sensor(sysfs):
+    reader = open_reader(sysfs)
+    layout = reader.layout()
+    reader.close()
+    shutil.rmtree(sysfs / 'hwmon' / 'hwmon1')
+    assert not reader.open_layout(layout)
+    assert reader.inputs == [] and not reader.opened
+    # Un nouveau scan retrouve les capteurs restants
+    assert reader.open()
+    assert reader.read()['gpu_temp'] == 0
+    reader.close()
+
+
+def test_missing_root():
+    reader = HwmonReader(root='/nonexistent/hwmon', thermal_root='/nonexistent/thermal')
+    assert not reader.open()
+    assert reader.read()['cpu_temp'] == 0
@@ -0,0 +1,119 @@
+"""Hardware inventory cache: hits, misses, machine key changes and forks on a warm start"""
+
+import subprocess
+
+import pytest
+
+import nbfc_control_api
+from benchmarks.suite import make_controller, make_sysfs
+from inventory import INVENTORY_VERSION, load_inventory, machine_key, save_inventory
+
+KEY = {'board_name': 'AN515-54', 'bios_version': '1.30', 'kernel': '6.8.0'}
+LSPCI = "01:00.0 VGA compatible controller: NVIDIA Corporation TU117M [GeForce GTX 1650 Mobile]\n"
+
+
+def test_load_inventory_hit_and_miss(tmp_path):
+    path = str(tmp_path / 'cache' / 'inventory.json')
+    assert load_inventory(path, KEY) is None
+    assert save_inventory(path, {'key': KEY, 'cpu_model': 'i5', 'fans': ['CPU fan']})
+    assert load_inventory(path, KEY) == {'key': KEY, 'cpu_model': 'i5', 'fans': ['CPU fan'],
+                                         'version': INVENTORY_VERSION}
+    # Autre BIOS ou autre noyau: le cache ne vaut plus
+    assert load_inventory(path, dict(KEY, bios_version='1.31')) is None
+    assert load_inventory(path, dict(KEY, kernel='6.9.0')) is None
+
+
+def test_load_inventory_rejects_other_versions_and_garbage(tmp_path):
+    path = tmp_path / 'inventory.json'
+    path.write_text('{"version": 0, "key": {}}')
+    assert load_inventory(str(path), {}) is None
+    path.write_text('{"version": 1, "key"')
+    assert load_inventory(str(path), {}) is None
+    path.write_text('[]')
+    assert load_inventory(str(path), {}) is None
+
+
+def test_machine_key_reads_dmi(tmp_path):
+    (tmp_path / 'board_name').write_text('AN515-54\n')
+    key = machine_key(str(tmp_path))
+    assert key['board_name'] == 'AN515-54'
+    # Attribut illisible: vide plutôt qu'une erreur
+    assert key['bios_version'] == ''
+    assert key['kernel']
+
+
+@pytest.fixture
+def forks(monkeypatch):
+    """Every subprocess the controller runs, answered with a canned lspci output"""
+    calls = []
+
+    def run(cmd, **kwargs):
+        calls.append(cmd[0])
+        return subprocess.CompletedProcess(cmd, 0, stdout=LSPCI if cmd[0] == 'lspci' else '', stderr='')
+    monkeypatch.setattr(nbfc_control_api.subprocess, 'run', run)
+    return calls
+
+
+@pytest.fixture
+def start(tmp_path, forks):
+    """Start a controller on the same fake machine, as a new process would"""
+    sysfs = make_sysfs(str(tmp_path / 'sysfs'), fans=3)
+    controllers = []
+
+    def start(rescan=False):
+        controller = make_controller(sysfs_root=None, fans=3)
+        controller.hwmon.root = sysfs
+        # Le vrai run_command, pour compter les processus lancés
+        del controller.run_command
+        controller.inventory_path = str(tmp_path / 'inventory.json')
+        controllers.append(controller)
+        return controller, controller.discover_hardware(rescan)
+
+    yield start
+    for controller in controllers:
+        controller.hwmon.close()
+
+
+def test_cold_start_detects_and_caches(start, forks):
+    controller, cached = start()
+    assert not cached and controller.startup['inventory'] == 'detected'
+    assert forks == ['lspci']
+    assert controller.hardware[1] == 'NVIDIA Corporation TU117M [GeForce GTX 1650 Mobile]'
+    assert [fan.name for fan in controller.model.fans] == ['Fan 0', 'Fan 1', 'Fan 2']
+    assert controller.hwmon.inputs
+
+
+def test_warm_start_uses_the_cache_without_forking(start, forks):
+    cold, _ = start()
+    forks.clear()
+    warm, cached = start()
+    assert cached and warm.startup['inventory'] == 'cached'
+    assert forks == []
+    assert warm.hardware == cold.hardware
+    assert [fan.name for fan in warm.model.fans] == ['Fan 0', 'Fan 1', 'Fan 2']
+    assert [hw_input.path for hw_input in warm.hwmon.inputs] == [hw_input.path for hw_input in cold.hwmon.inputs]
+
+
+def test_key_mismatch_forces_rediscovery(start, forks, monkeypatch):
+    start()
+    forks.clear()
+    key = machine_key()
+    monkeypatch.setattr(nbfc_control_api, 'machine_key', lambda: dict(key, kernel='other'))
+    controller, cached = start()
+    assert not cached and forks == ['lspci']
+    # Le cache est réécrit pour la nouvelle machine
+    assert load_inventory(controller.inventory_path, dict(key, kernel='other')) is not None
+
+
+def test_rescan_and_vanished_hwmon_force_rediscovery(start, forks, tmp_path):
+    start()
+    forks.clear()
+    assert start(rescan=True)[1] is False
+    assert forks == ['lspci']
+
+    # hwmonN renuméroté: la disposition en cache ne s'ouvre plus
+    (tmp_path / 'sysfs' / 'hwmon1').rename(tmp_path / 'sysfs' / 'hwmon7')
+    forks.clear()
+    controller, cached = start()
+    assert not cached and forks == ['lspci']
+    assert controller.hwmon.inputs
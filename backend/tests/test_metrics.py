@@ -0,0 +1,105 @@
+"""Latency histograms, their Prometheus export and the `stats` command reply"""
+
+import os
+
+import pytest
+
+from metrics import LATENCY_BUCKETS, Histogram, Metrics
+from nbfc_control_api import handle_command
+
+
+def test_histogram_buckets_are_upper_inclusive():
+    histogram = Histogram()
+    # Une durée égale à une borne compte dans ce bucket (le « le » de Prometheus)
+    histogram.observe(LATENCY_BUCKETS[0])
+    histogram.observe(LATENCY_BUCKETS[0] * 1.1)
+    histogram.observe(60.0)
+    assert histogram.counts[0] == 1
+    assert histogram.counts[1] == 1
+    assert histogram.counts[-1] == 1
+    assert histogram.count == 3 and histogram.max == 60.0
+
+
+def test_histogram_quantiles():
+    histogram = Histogram()
+    assert histogram.quantile(0.5) == 0.0
+    for _ in range(90):
+        histogram.observe(0.0004)
+    for _ in range(10):
+        histogram.observe(0.02)
+    # Borne haute du bucket, sans dépasser le maximum observé
+    assert histogram.quantile(0.5) == 0.0005
+    assert histogram.quantile(0.9) == 0.0005
+    assert histogram.quantile(0.99) == 0.02
+    summary = histogram.summary()
+    assert summary == {'count': 100, 'mean_ms': pytest.approx(2.36), 'p50_ms': 0.5, 'p99_ms': 20.0,
+                       'max_ms': 20.0}
+
+    # Au-delà du dernier bucket: le maximum
+    histogram.observe(30.0)
+    assert histogram.quantile(1.0) == 30.0
+
+
+def parse_prometheus(text):
+    samples = {}
+    for line in text.splitlines():
+        if not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_prometheus_text():
+    metrics = Metrics()
+    metrics.observe('tick', 0.0004)
+    metrics.observe('tick', 0.003)
+    metrics.incr('commands', label='stats')
+    metrics.incr('commands', 2, label='set_mode')
+    metrics.incr('tick_overruns')
+    text = metrics.prometheus_text({'ticks': 7})
+    assert text.endswith('\n')
+    assert '# TYPE nbfc_stage_seconds histogram' in text
+    assert '# TYPE nbfc_commands_total counter' in text
+
+    samples = parse_prometheus(text)
+    # Buckets cumulés
+    assert samples['nbfc_stage_seconds_bucket{stage="tick",le="0.0001"}'] == 0
+    assert samples['nbfc_stage_seconds_bucket{stage="tick",le="0.0005"}'] == 1
+    assert samples['nbfc_stage_seconds_bucket{stage="tick",le="0.005"}'] == 2
+    assert samples['nbfc_stage_seconds_bucket{stage="tick",le="+Inf"}'] == 2
+    assert samples['nbfc_stage_seconds_count{stage="tick"}'] == 2
+    assert samples['nbfc_stage_seconds_sum{stage="tick"}'] == pytest.approx(0.0034)
+    assert samples['nbfc_commands_total{name="set_mode"}'] == 2
+    assert samples['nbfc_commands_total{name="stats"}'] == 1
+    assert samples['nbfc_tick_overruns_total'] == 1
+    assert samples['nbfc_ticks_total'] == 7
+
+
+def test_write_prometheus(tmp_path):
+    metrics = Metrics()
+    metrics.incr('ticks')
+    path = tmp_path / 'nbfc.prom'
+    assert metrics.write_prometheus(str(path))
+    assert path.read_text() == metrics.prometheus_text()
+    assert os.listdir(tmp_path) == ['nbfc.prom']
+    assert not metrics.write_prometheus(str(tmp_path / 'missing' / 'nbfc.prom'))
+
+
+def test_stats_command_reply(controller):
+    messages = []
+    controller.telemetry.write_message = lambda message: messages.append(message) or 0
+    controller.tick()
+    handle_command(controller, '{"id": 4, "cmd": "stats"}')
+    controller.apply_commands()
+
+    stats = next(m for m in messages if m['type'] == 'stats')
+    assert set(stats) == {'type', 'uptime_s', 'stages', 'counters'}
+    assert stats['stages']['nbfc_status']['count'] == 1
+    assert set(stats['stages']['nbfc_status']) == {'count', 'mean_ms', 'p50_ms', 'p99_ms', 'max_ms'}
+    counters = stats['counters']
+    assert counters['commands'] == {'stats': 1}
+    assert counters['commands_received'] == 1
+    for key in ('fan_writes_requested', 'fan_writes_applied', 'fan_writes_retried', 'ticks', 'telemetry_bytes'):
+        assert key in counters
+    assert next(m for m in messages if m['type'] == 'result') == \
+        {'type': 'result', 'id': 4, 'ok': True, 'result': None, 'queue_ms': messages[-1]['queue_ms']}
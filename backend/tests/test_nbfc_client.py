@@ -0,0 +1,96 @@
+import json
+import os
+import time
+
+import pytest
+
+from benchmarks.suite import FakeSocketService
+from nbfc_client import CLIBackend, FakeBackend, NBFCClient, SocketBackend, StateFileBackend
+
+NBFC_STATUS = """Fan Display Name         : CPU fan
+Current Fan Speed        : 42.00
+Target Fan Speed         : 42.00
+"""
+
+
+def write_state(tmp_path, state) -> str:
+    path = os.path.join(tmp_path, 'nbfc_service.state.json')
+    with open(path, 'w') as f:
+        json.dump(state, f)
+    return path
+
+
+def make_client(path, calls):
+    def run_command(cmd):
+        calls.append(cmd)
+        return NBFC_STATUS
+    return NBFCClient(backends=[StateFileBackend([path]), CLIBackend(run_command)])
+
+
+def test_state_file_read_without_forking(tmp_path):
+    calls = []
+    client = make_client(write_state(tmp_path, {'Fans': [
+        {'Name': 'CPU fan', 'CurrentSpeed': 30.0, 'TargetSpeed': 35.0}]}), calls)
+    assert client.get_status() == [{'name': 'CPU fan', 'speed': 30.0, 'target': 35.0}]
+    assert client.last_backend == 'state-file'
+    assert client.service_ready()
+    assert calls == []
+
+
+def test_state_without_fans_falls_back_to_cli(tmp_path):
+    for state in ({'Pid': 1234}, {'Fans': None}, {'Fans': 'CPU'}, [1, 2]):
+        calls = []
+        client = make_client(write_state(tmp_path, state), calls)
+        assert not client.service_ready()
+        fans = client.get_status()
+        assert client.last_backend == 'cli'
+        assert fans[0]['speed'] == 42.0
+        assert len(calls) == 1
+
+
+def test_stale_state_file_is_ignored(tmp_path):
+    path = write_state(tmp_path, {'Fans': []})
+    old = time.time() - 60
+    os.utime(path, (old, old))
+    backend = StateFileBackend([path])
+    assert backend.available()
+    assert backend.get_status() is None
+
+
+@pytest.fixture
+def service(tmp_path):
+    """Fake nbfc-linux service listening on a Unix socket"""
+    service = FakeSocketService(str(tmp_path / 'nbfc_service.socket'), FakeBackend(['CPU fan', 'GPU fan']))
+    service.start()
+    yield service
+    service.close()
+
+
+def test_socket_status_and_writes(service, tmp_path):
+    calls = []
+    client = NBFCClient(backends=[SocketBackend([str(tmp_path / 'missing.socket'), service.path]),
+                                  CLIBackend(lambda cmd: calls.append(cmd))])
+    assert client.service_ready()
+    assert client.get_status() == [{'name': 'CPU fan', 'speed': 0.0, 'target': 0.0},
+                                   {'name': 'GPU fan', 'speed': 0.0, 'target': 0.0}]
+    assert client.last_backend == 'socket'
+
+    client.queue_fan_speed(None, 40.0)
+    client.queue_fan_speed(1, 65.0)
+    assert client.flush()
+    assert service.backend.writes == [{None: 40.0}, {1: 65.0}]
+    assert [fan['speed'] for fan in client.get_status()] == [40.0, 65.0]
+    # Tout est passé par le socket, sans lancer le CLI
+    assert calls == []
+
+
+def test_socket_errors(service):
+    backend = SocketBackend([service.path], timeout=0.5)
+    assert backend.available()
+    # Ventilateur inconnu: le service répond par une erreur
+    assert not backend.set_speeds({5: 50.0})
+    service.close()
+    # Service arrêté: plus de lecture, le chemin sera recherché à nouveau
+    assert backend.get_status() is None
+    assert backend.path is None
+    assert not backend.available()
@@ -0,0 +1,98 @@
+import pytest
+
+import parsers
+from parsers import parse_nbfc_status, parse_sensors_output, tokenize
+
+SENSORS = """coretemp-isa-0000
+Adapter: ISA adapter
+Package id 0:  +52.0°C  (high = +100.0°C, crit = +100.0°C)
+Core 0:        +45.0°C  (high = +100.0°C, crit = +100.0°C)
+Core 1:        +47.0°C  (high = +100.0°C, crit = +100.0°C)
+
+acer-isa-0000
+Adapter: ISA adapter
+fan1:        2100 RPM
+fan2:           0 RPM  (min = 0 RPM)
+fan3:         N/A
+temp1:        +45.0°C
+temp2:        +55.0°C
+temp3:        +51.0°C
+
+odd-virtual-0
+Adapter: Virtual device
+edge:   N/A  +38.5°C\t
+"""
+
+NBFC = """Read-only               : false
+Selected Config Name    : Acer Nitro AN515-54
+
+Fan Display Name        : CPU fan
+Current Fan Speed       : 42.35
+Target Fan Speed        : 50.00
+
+Fan Display Name        : GPU fan
+Current Fan Speed       : n/a
+"""
+
+
+def test_sensors_temperatures():
+    values = parse_sensors_output(SENSORS)
+    assert values['cpu_temps'] == [45.0, 47.0]
+    assert values['cpu_temp'] == pytest.approx(46.0)
+    assert values['gpu_temps'] == [55.0, 51.0]
+    # Mêmes clés que HwmonReader: "pilote:libellé"
+    assert values['temps']['coretemp:Package id 0'] == 52.0
+    assert values['temps']['acer:temp1'] == 45.0
+    # Température qui ne commence pas la valeur
+    assert values['temps']['odd:edge'] == 38.5
+
+
+def test_sensors_fans():
+    values = parse_sensors_output(SENSORS)
+    assert values['fan_rpms'] == {'fan1': 2100, 'fan2': 0}
+    assert values['cpu_fan_rpm'] == 2100
+    assert values['gpu_fan_rpm'] == 0
+
+
+def test_sensors_first_chip_wins_for_fans():
+    # Même règle que HwmonReader: le premier composant qui expose fanN le garde
+    second = "thinkpad-isa-0000\nAdapter: ISA adapter\nfan1:        4800 RPM\n"
+    assert parse_sensors_output(SENSORS + "\n" + second)['fan_rpms']['fan1'] == 2100
+
+
+def test_tokenize():
+    assert list(tokenize("a: 1\n  b c :  two words \n\nchip-isa-0000\n: empty key\nd:\n")) == [
+        ('a', '1'), ('b c', 'two words'), ('chip-isa-0000', None), ('d', '')
+    ]
+
+
+def test_parsers_share_tokenize(monkeypatch):
+    calls = []
+
+    def counting(text):
+        calls.append(text)
+        return tokenize(text)
+    monkeypatch.setattr(parsers, 'tokenize', counting)
+    parse_sensors_output(SENSORS)
+    parse_nbfc_status(NBFC)
+    assert calls == [SENSORS, NBFC]
+
+
+def test_sensors_raw_values():
+    data = parse_sensors_output(SENSORS)['sensor_data']
+    assert 'Adapter' not in data
+    assert data['fan3'] == 'N/A'
+    assert data['edge'] == 'N/A  +38.5°C'
+    assert data['Core 0'] == '+45.0°C  (high = +100.0°C, crit = +100.0°C)'
+
+
+def test_empty_sensors_output():
+    values = parse_sensors_output('')
+    assert values['cpu_temp'] == 0 and values['gpu_temp'] == 0 and values['sensor_data'] == {}
+
+
+def test_nbfc_status():
+    assert parse_nbfc_status(NBFC) == [
+        {'name': 'CPU fan', 'speed': 42.35, 'target': 50.0},
+        {'name': 'GPU fan', 'speed': None, 'target': None}
+    ]
@@ -0,0 +1,118 @@
+"""ProcessSampler on a fake /proc tree: CPU shares, PID reuse, read budget and idle slices"""
+
+import pytest
+
+from processes import CLOCK_TICKS, ProcessSampler
+
+
+class FakeProc:
+    """/proc/<pid>/stat files with settable CPU time and start time"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def set(self, pid: int, name: str = 'idle', ticks: int = 0, start: int = 100) -> None:
+        # Champs après la ')': état, puis utime et stime en 12e/13e position, starttime en 20e
+        fields = ['S'] + ['0'] * 10 + [str(ticks), '0'] + ['0'] * 6 + [str(start)] + ['0'] * 5
+        directory = self.root / str(pid)
+        directory.mkdir(exist_ok=True)
+        (directory / 'stat').write_text(f"{pid} ({name}) {' '.join(fields)}\n")
+
+    def add(self, pid: int, cpu: float) -> None:
+        """Let a process use cpu % of a core for one second"""
+        stat = (self.root / str(pid) / 'stat').read_text()
+        name = stat[stat.find('(') + 1:stat.rfind(')')]
+        fields = stat[stat.rfind(')') + 2:].split()
+        self.set(pid, name, int(fields[11]) + int(CLOCK_TICKS * cpu / 100), int(fields[19]))
+
+
+@pytest.fixture
+def proc(tmp_path):
+    return FakeProc(tmp_path)
+
+
+def make_sampler(proc, **options):
+    options.setdefault('interval', 1.0)
+    options.setdefault('rescan_interval', 1000.0)
+    return ProcessSampler(proc_root=str(proc.root), **options)
+
+
+def test_top_consumers_in_order(proc):
+    for pid, name in ((10, 'compiler'), (11, 'browser'), (12, 'game'), (13, 'shell')):
+        proc.set(pid, name)
+    sampler = make_sampler(proc, top=2)
+    assert sampler.sample(0.0)
+    assert sampler.top == []
+    # Pas de nouvel échantillon avant l'intervalle
+    assert not sampler.sample(0.5)
+
+    for pid, cpu in ((10, 50), (11, 20), (12, 90)):
+        proc.add(pid, cpu)
+    assert sampler.sample(1.0)
+    assert [entry[:2] for entry in sampler.top] == [[12, 'game'], [10, 'compiler']]
+    assert sampler.top[0][2] == pytest.approx(90, abs=1)
+    assert sampler.blame('cpu', 95.04) == sampler.top
+    stats = sampler.get_stats()
+    assert stats['tracked'] == 4 and stats['spike']['value'] == 95.0
+
+
+def test_reused_pid_starts_from_a_new_reference(proc):
+    proc.set(20, 'old', ticks=1000, start=100)
+    sampler = make_sampler(proc)
+    sampler.sample(0.0)
+    # Même PID, autre processus: son temps CPU ne se compare pas à celui de l'ancien
+    proc.set(20, 'new', ticks=5000, start=900)
+    sampler.sample(1.0)
+    process = sampler.table[20]
+    assert process.name == 'new' and process.cpu == 0.0
+    proc.add(20, 40)
+    sampler.sample(2.0)
+    assert sampler.top == [[20, 'new', pytest.approx(40, abs=1)]]
+
+
+def test_reads_stay_within_budget(proc):
+    for pid in range(100, 150):
+        proc.set(pid)
+    sampler = make_sampler(proc, max_reads=10)
+    for now in range(6):
+        reads = sampler.reads
+        sampler.sample(float(now))
+        assert sampler.reads - reads <= 10
+
+
+def test_idle_processes_are_read_a_slice_at_a_time(proc):
+    for pid in range(100, 120):
+        proc.set(pid)
+    sampler = make_sampler(proc, hot_samples=3, idle_cycle=5)
+    # Nouveaux processus lus deux fois (référence puis confirmation), puis retirés des actifs
+    sampler.sample(0.0)
+    sampler.sample(1.0)
+    assert not sampler.hot
+
+    # Ensuite une tranche de 20 / 5 processus inactifs par échantillon
+    reads = sampler.reads
+    sampler.sample(2.0)
+    assert sampler.reads - reads == 4
+
+    # Un processus qui se réveille est repris dans un cycle au plus, puis lu à chaque échantillon
+    proc.add(119, 60)
+    for now in range(3, 8):
+        sampler.sample(float(now))
+        if 119 in sampler.hot:
+            break
+    assert 119 in sampler.hot
+    proc.add(119, 60)
+    sampler.sample(now + 1.0)
+    assert sampler.top[0][0] == 119
+
+
+def test_exited_processes_are_forgotten(proc):
+    proc.set(30)
+    proc.set(31)
+    sampler = make_sampler(proc, rescan_interval=2.0)
+    sampler.sample(0.0)
+    (proc.root / '31' / 'stat').unlink()
+    (proc.root / '31').rmdir()
+    sampler.sample(1.0)
+    sampler.sample(2.0)
+    assert set(sampler.table) == {30}
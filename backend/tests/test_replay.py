@@ -0,0 +1,34 @@
+"""Trace replay on a fixture trace: the metrics the controller is tuned against"""
+
+import os
+
+from conftest import FIXTURES
+from replay import Replay, load_trace, replay_many
+
+# 5 min à 2 Hz: montée de 50 à 88 °C, plateau, refroidissement puis un second pic à 82 °C
+TRACE = os.path.join(FIXTURES, 'trace_heatup.csv')
+
+
+def test_replay_metrics_on_fixture_trace():
+    trace = load_trace(TRACE)
+    metrics = Replay(trace).run()
+    assert metrics['samples'] == 601 and metrics['duration_s'] == 300.0
+    assert metrics['peak_temp'] == 88.0
+    # Au-dessus de 80 °C de 77.5 s à 167 s puis de 237.5 s à 244.5 s, par pas de 0.5 s
+    assert metrics['time_above_threshold_s'] == 97.5
+    # Valeurs de référence de la configuration par défaut: une régression de la
+    # courbe, de l'hystérésis ou du limiteur d'écritures les change
+    assert metrics['fan_writes'] == 14
+    assert metrics['oscillations'] == 3
+
+
+def test_replay_is_deterministic_and_parallel_safe():
+    first, second = replay_many([TRACE, TRACE], workers=2)
+    for key in ('fan_writes', 'time_above_threshold_s', 'oscillations', 'thermal_events'):
+        assert first[key] == second[key]
+    assert first['trace'] == TRACE
+
+
+def test_reversals_counted_on_direction_changes():
+    assert Replay._count_reversals([40, 50, 50, 60, 45, 45, 55, 30]) == 3
+    assert Replay._count_reversals([40, 50, 60]) == 0
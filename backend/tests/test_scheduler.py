@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from nbfc_control_api import execute_command
+from commands import CommandError
+from scheduler import AdaptivePolicy, CpuLoad, FixedIntervalPolicy, SamplingScheduler
+
+STAT = "cpu  {busy} 0 0 {idle} 0 0 0 0 0 0\ncpu0 0 0 0 0 0 0 0 0 0 0\n"
+
+
+def write_stat(root, busy: int, idle: int) -> None:
+    with open(os.path.join(root, 'stat'), 'w') as f:
+        f.write(STAT.format(busy=busy, idle=idle))
+
+
+def test_load_follows_proc_stat_deltas(tmp_path):
+    write_stat(tmp_path, 1000, 9000)
+    scheduler = SamplingScheduler(loads=CpuLoad(proc_root=str(tmp_path)))
+    # Premier échantillon: pas encore d'écart
+    assert scheduler.read_load() is None
+    write_stat(tmp_path, 1100, 9900)
+    assert scheduler.read_load() == pytest.approx(0.1)
+    # Pic de charge: visible dès l'échantillon suivant
+    write_stat(tmp_path, 1190, 9910)
+    assert scheduler.read_load() == pytest.approx(0.9)
+
+
+def test_pressure_wins_when_higher(tmp_path):
+    write_stat(tmp_path, 1000, 9000)
+    (tmp_path / 'pressure').mkdir()
+    (tmp_path / 'pressure' / 'cpu').write_text("some avg10=42.00 avg60=10.00 avg300=5.00 total=123\n")
+    loads = CpuLoad(proc_root=str(tmp_path))
+    assert SamplingScheduler(loads=loads).read_load() == pytest.approx(0.42)
+    loads.close()
+
+
+def test_early_wakeup_does_not_skew_the_slope():
+    policy = AdaptivePolicy(min_dt=0.1)
+    now = 0.0
+    for _ in range(10):
+        interval = policy.next_interval({'time': now, 'temperature': 50.0})
+        now += interval
+    assert interval == policy.max_interval
+    # Réveil 10 ms après le dernier échantillon: +0.3 °C ferait 30 °C/s, ignoré
+    assert policy.next_interval({'time': now - interval + 0.01, 'temperature': 50.3}) == policy.max_interval
+    # La pente suivante part toujours du dernier échantillon complet: +0.4 °C en 2 s
+    assert policy.next_interval({'time': now, 'temperature': 50.4}) == policy.max_interval
+    # Une vraie montée reste détectée
+    assert policy.next_interval({'time': now + 1.0, 'temperature': 52.0}) == policy.min_interval
+
+
+def test_load_spike_drops_interval():
+    policy = AdaptivePolicy()
+    now = 0.0
+    for _ in range(10):
+        interval = policy.next_interval({'time': now, 'temperature': 50.0, 'load': 0.1})
+        now += interval
+    assert interval == policy.max_interval
+    assert policy.next_interval({'time': now, 'temperature': 50.0, 'load': 0.95}) == policy.min_interval
+
+
+def test_set_poll_policy(controller):
+    execute_command(controller, 'set_poll_policy', ['fixed'])
+    assert isinstance(controller.scheduler.policy, FixedIntervalPolicy)
+    with pytest.raises(CommandError):
+        execute_command(controller, 'set_poll_policy', ['turbo'])
+    assert isinstance(controller.scheduler.policy, FixedIntervalPolicy)
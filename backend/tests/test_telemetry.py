@@ -0,0 +1,63 @@
+import json
+
+from telemetry import TelemetryDecoder, TelemetryEncoder
+
+
+def roundtrip(ticks, **options):
+    encoder = TelemetryEncoder(**options)
+    decoder = TelemetryDecoder()
+    states = []
+    for tick in ticks:
+        states.extend(json.loads(json.dumps(state)) for state in decoder.feed(encoder.encode(tick)))
+    return encoder, states
+
+
+def test_deltas_rebuild_every_tick():
+    ticks = [
+        {'cpu': {'temperature': 45.123, 'rpm': 3000}, 'status': 'Dynamic', 'fans': [{'speed': 40.0}],
+         'sensor_data': {'temp1': '+45.0°C', 'temp2': '+50.0°C'}},
+        {'cpu': {'temperature': 45.124, 'rpm': 3100}, 'status': 'Dynamic', 'fans': [{'speed': 41.5}],
+         'sensor_data': {'temp1': '+46.0°C'}},
+        {'cpu': {'temperature': 47.0}, 'status': 'Fixed', 'fans': [{'speed': 41.5}],
+         'sensor_data': {'temp1': '+46.0°C'}, 'events': {'active': 1}},
+        {'cpu': 'gone', 'status': True, 'fans': []}
+    ]
+    _, states = roundtrip(ticks)
+    assert states == [
+        {'cpu': {'temperature': 45.12, 'rpm': 3000}, 'status': 'Dynamic', 'fans': [{'speed': 40.0}],
+         'sensor_data': {'temp1': '+45.0°C', 'temp2': '+50.0°C'}},
+        {'cpu': {'temperature': 45.12, 'rpm': 3100}, 'status': 'Dynamic', 'fans': [{'speed': 41.5}],
+         'sensor_data': {'temp1': '+46.0°C'}},
+        {'cpu': {'temperature': 47.0}, 'status': 'Fixed', 'fans': [{'speed': 41.5}],
+         'sensor_data': {'temp1': '+46.0°C'}, 'events': {'active': 1}},
+        {'cpu': 'gone', 'status': True, 'fans': []}
+    ]
+
+
+def test_unchanged_tick_is_an_empty_delta():
+    encoder = TelemetryEncoder()
+    tick = {'cpu': {'temperature': 45.0}, 'hardware': {'cpu_model': 'i7'}}
+    encoder.encode(tick)
+    assert encoder.build_frame({'cpu': {'temperature': 45.001}, 'hardware': {'cpu_model': 'i7'}}) == {
+        'v': 1, 'type': 'delta', 'seq': 2}
+
+
+def test_state_does_not_share_caller_dicts():
+    encoder = TelemetryEncoder()
+    startup = {'first_frame_ms': None}
+    encoder.encode({'startup': startup})
+    startup['first_frame_ms'] = 12.5
+    # Le même dict modifié sur place doit apparaître dans le delta suivant
+    assert encoder.build_frame({'startup': startup})['set'] == {'startup': {'first_frame_ms': 12.5}}
+
+
+def test_frames_are_utf8_json_lines():
+    encoded = TelemetryEncoder().encode({'sensor_data': {'temp1': '+45.0°C'}})
+    assert encoded.endswith(b'\n') and encoded.count(b'\n') == 1
+    assert '°C'.encode() in encoded
+
+
+def test_keyframe_interval():
+    encoder, _ = roundtrip([{'t': float(i)} for i in range(5)], keyframe_interval=2)
+    frames = [encoder.build_frame({'t': float(i)})['type'] for i in range(10, 16)]
+    assert frames.count('full') == 2
@@ -27,6 +27,13 @@ if (!fs.existsSync(pythonScriptPath)) {
 
 let mainWindow;
 let pythonProcess = null;
+let stdoutBuffer = '';
+let telemetryState = null;
+let telemetrySeq = 0;
+let resyncRequested = false;
+// Structured commands: id -> { commands, sentAt } until the backend sends the result
+let nextCommandId = 1;
+const pendingCommands = new Map();
 
 // Create the main window
 function createWindow() {
@@ -69,20 +76,20 @@ function startPythonBackend() {
     pythonProcess = spawn(pythonExecutable, [pythonScriptPath]);
     
     // Handle output from the Python script
+    // The stream is newline-delimited: a chunk may hold several frames or a partial one
+    stdoutBuffer = '';
+    telemetryState = null;
+    // Frames are raw UTF-8 ("°C"): decode across chunk boundaries
+    pythonProcess.stdout.setEncoding('utf8');
     pythonProcess.stdout.on('data', (data) => {
-      try {
-        const message = data.toString().trim();
-        // If it's JSON, send it to the frontend
-        if (message.startsWith('{')) {
-          const jsonData = JSON.parse(message);
-          if (mainWindow) {
-            mainWindow.webContents.send('fan-data', jsonData);
-          }
-        } else {
-          console.log(`[Python] ${message}`);
+      stdoutBuffer += data;
+      let newline;
+      while ((newline = stdoutBuffer.indexOf('\n')) !== -1) {
+        const message = stdoutBuffer.slice(0, newline).trim();
+        stdoutBuffer = stdoutBuffer.slice(newline + 1);
+        if (message) {
+          handlePythonMessage(message);
         }
-      } catch (err) {
-        console.error('[Main] Error processing Python data:', err.message);
       }
     });
 
@@ -93,6 +100,7 @@ function startPythonBackend() {
     pythonProcess.on('close', (code) => {
       console.log(`[Main] Python process exited with code: ${code}`);
       pythonProcess = null;
+      pendingCommands.clear();
     });
 
   } catch (err) {
@@ -100,6 +108,136 @@ function startPythonBackend() {
   }
 }
 
+// Handle one line of output from the Python script
+function handlePythonMessage(message) {
+  try {
+    // If it's JSON, rebuild the telemetry state and send it to the frontend
+    if (message.startsWith('{')) {
+      const frame = JSON.parse(message);
+      if (frame.type === 'history') {
+        if (mainWindow) mainWindow.webContents.send('history-data', frame);
+        return;
+      }
+      if (frame.type === 'stats') {
+        console.log(`[Python] stats ${JSON.stringify(frame)}`);
+        return;
+      }
+      if (frame.type === 'event') {
+        // Thermal event (threshold, sustained, fan_stall, dropout): start or end of a condition
+        console.log(`[Python] ${frame.event} ${frame.state} on ${frame.channel} (${frame.value})`);
+        if (mainWindow) mainWindow.webContents.send('thermal-event', frame);
+        return;
+      }
+      if (frame.type === 'events') {
+        if (mainWindow) mainWindow.webContents.send('event-log', frame.events);
+        return;
+      }
+      if (frame.type === 'profiles') {
+        // Available profiles, active one and the rule that picked it
+        if (mainWindow) mainWindow.webContents.send('profiles', frame);
+        return;
+      }
+      if (frame.type === 'ack' || frame.type === 'result') {
+        handleCommandReply(frame);
+        return;
+      }
+      const jsonData = applyTelemetryFrame(frame);
+      if (jsonData && mainWindow) {
+        mainWindow.webContents.send('fan-data', jsonData);
+      }
+    } else {
+      console.log(`[Python] ${message}`);
+    }
+  } catch (err) {
+    console.error('[Main] Error processing Python data:', err.message);
+  }
+}
+
+// Send one command, or several as a batch applied in order, without waiting for the previous ones
+function sendCommands(commands) {
+  if (!pythonProcess) return null;
+  const id = nextCommandId++;
+  const request = commands.length === 1
+    ? { id, cmd: commands[0].cmd, args: commands[0].args || [] }
+    : { id, batch: commands.map(({ cmd, args }) => ({ cmd, args: args || [] })) };
+  pendingCommands.set(id, { commands, sentAt: Date.now() });
+  pythonProcess.stdin.write(JSON.stringify(request) + '\n');
+  return id;
+}
+
+function sendCommand(cmd, ...args) {
+  return sendCommands([{ cmd, args }]);
+}
+
+// Acks arrive on receipt, results once the control loop applied the command
+function handleCommandReply(frame) {
+  const pending = pendingCommands.get(frame.id);
+  if (!pending) return;
+  const names = pending.commands.map((command) => command.cmd).join(', ');
+  if (frame.type === 'ack') {
+    if (!frame.ok) {
+      console.error(`[Main] Command ${names} rejected: ${frame.error}`);
+      pendingCommands.delete(frame.id);
+    }
+    return;
+  }
+  pendingCommands.delete(frame.id);
+  if (!frame.ok) {
+    const errors = frame.results
+      ? frame.results.filter((reply) => !reply.ok).map((reply) => reply.error)
+      : [frame.error];
+    console.error(`[Main] Command ${names} failed: ${errors.join('; ')}`);
+  }
+}
+
+// Apply a versioned telemetry frame (full or delta) and return the complete state
+function applyTelemetryFrame(frame) {
+  // Legacy backends send the complete state without an envelope
+  if (frame.v === undefined) {
+    return frame;
+  }
+
+  if (frame.type === 'full') {
+    telemetryState = frame.data;
+    resyncRequested = false;
+  } else if (frame.type === 'delta') {
+    if (!telemetryState || frame.seq !== telemetrySeq + 1) {
+      // A delta was lost: ask the backend for a full frame
+      telemetrySeq = frame.seq;
+      telemetryState = null;
+      if (pythonProcess && !resyncRequested) {
+        sendCommand('resync');
+        resyncRequested = true;
+      }
+      return null;
+    }
+    for (const keyPath of frame.del || []) {
+      let target = telemetryState;
+      for (const key of keyPath.slice(0, -1)) {
+        target = target[key] || {};
+      }
+      delete target[keyPath[keyPath.length - 1]];
+    }
+    mergeTelemetry(telemetryState, frame.set || {});
+  } else {
+    return null;
+  }
+
+  telemetrySeq = frame.seq;
+  return telemetryState;
+}
+
+function mergeTelemetry(target, changes) {
+  for (const [key, value] of Object.entries(changes)) {
+    if (value && typeof value === 'object' && !Array.isArray(value)
+        && target[key] && typeof target[key] === 'object' && !Array.isArray(target[key])) {
+      mergeTelemetry(target[key], value);
+    } else {
+      target[key] = value;
+    }
+  }
+}
+
 // Stop the Python script
 function stopPythonBackend() {
   if (pythonProcess) {
@@ -137,21 +275,35 @@ ipcMain.on('set-fan-speed', (event, data) => {
   // Send a command to the Python script
   if (data.fanId !== undefined) {
     // Set speed for a specific fan
-    pythonProcess.stdin.write(`set_fan_speed ${data.fanId} ${data.speed}\n`);
+    sendCommand('set_fan_speed', data.fanId, data.speed);
   } else {
     // Set speed for all fans
-    pythonProcess.stdin.write(`set_all_fans_speed ${data.speed}\n`);
+    sendCommand('set_all_fans_speed', data.speed);
   }
 });
 
 ipcMain.on('set-mode', (event, isDynamic) => {
   if (!pythonProcess) return;
-  pythonProcess.stdin.write(`set_mode ${isDynamic ? 'dynamic' : 'fixed'}\n`);
+  sendCommand('set_mode', isDynamic ? 'dynamic' : 'fixed');
 });
 
 ipcMain.on('apply-profile', (event, profile) => {
   if (!pythonProcess) return;
-  pythonProcess.stdin.write(`apply_profile ${profile}\n`);
+  sendCommand('apply_profile', profile);
+});
+
+ipcMain.on('request-history', (event, query) => {
+  if (!pythonProcess) return;
+  const { tier = '1m', start = -3600, end = 0 } = query || {};
+  sendCommand('history', tier, start, end);
+});
+
+ipcMain.on('request-profiles', () => {
+  sendCommand('profiles');
+});
+
+ipcMain.on('request-events', (event, count) => {
+  sendCommand('events', count || 100);
 });
 
 // Window controls
@@ -13,6 +13,7 @@ let isManualMode = false;
 let updateInterval = null;
 let lastCpuSpeed = 0;
 let lastGpuSpeed = 0;
+let backendReady = false;
 
 // DOM Elements
 const cpuTemp = document.getElementById('cpu-temp');
@@ -35,9 +36,14 @@ const gpuSliderValue = document.getElementById('gpu-slider-value');
 const statusValue = document.getElementById('status-value');
 const modeToggle = document.getElementById('mode-toggle');
 const modeLabel = document.getElementById('mode-label');
-const profileButtons = document.querySelectorAll('.profile-btn');
+const profileButtonsContainer = document.querySelector('.profile-buttons');
+let profileButtons = document.querySelectorAll('.profile-btn');
+const autoButton = document.querySelector('.profile-btn[data-profile="Auto"]');
 const chartButtons = document.querySelectorAll('.chart-btn');
 
+const eventList = document.getElementById('event-list');
+const maxEvents = 20;
+
 const resetBtn = document.getElementById('reset-btn');
 const defaultBtn = document.getElementById('default-btn');
 
@@ -234,6 +240,15 @@ function updateUI(data) {
         }
     }
     
+    // Highlight the active profile (Auto while the rules pick it)
+    if (data.profile) {
+        const active = data.profiles?.auto ? 'Auto' : data.profile;
+        profileButtons.forEach(btn => btn.classList.toggle('active', btn.dataset.profile === active));
+    }
+    if (data.profiles?.rules !== undefined) {
+        updateAutoButton(data.profiles.rules);
+    }
+    
     // Update status
     statusValue.textContent = data.status || 'Connected';
 }
@@ -357,13 +372,7 @@ function setupEventListeners() {
     });
 
     // Profile Buttons
-    profileButtons.forEach(btn => {
-        btn.addEventListener('click', () => {
-            profileButtons.forEach(b => b.classList.remove('active'));
-            btn.classList.add('active');
-            ipcRenderer.send('apply-profile', btn.dataset.profile);
-        });
-    });
+    profileButtons.forEach(bindProfileButton);
 
     // Mode Toggle
     modeToggle.addEventListener('change', () => {
@@ -426,22 +435,129 @@ function setupEventListeners() {
             }
             
             updateChart();
+            requestHistory();
         });
     });
 }
 
+function bindProfileButton(btn) {
+    btn.addEventListener('click', () => {
+        profileButtons.forEach(b => b.classList.remove('active'));
+        btn.classList.add('active');
+        ipcRenderer.send('apply-profile', btn.dataset.profile);
+    });
+}
+
+// Backfill the chart from the on-disk history (one point every 5 s, like live samples)
+function requestHistory() {
+    ipcRenderer.send('request-history', { tier: '1s', start: -chartTimeRange * 60, end: 0 });
+}
+
+function loadHistory(frame) {
+    const records = (frame.records || []).filter((record, i) => i % 5 === 0);
+    if (records.length === 0) return;
+
+    temperatureData = { labels: [], cpu: [], gpu: [] };
+    records.forEach(record => {
+        const time = new Date(record.t * 1000);
+        temperatureData.labels.push(time.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit', second: '2-digit' }));
+        // [min, avg, max] par canal: tracer la moyenne
+        temperatureData.cpu.push(record.cpu_temp ? record.cpu_temp[1] : null);
+        temperatureData.gpu.push(record.gpu_temp ? record.gpu_temp[1] : null);
+    });
+    updateChart();
+}
+
+function formatEvent(event) {
+    const time = new Date(event.time * 1000).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+    const label = event.event.replace('_', ' ');
+    return `${time} ${label} ${event.state} (${event.channel} ${event.value})`;
+}
+
+function addEvent(event, prepend = true) {
+    const empty = eventList.querySelector('.event-empty');
+    if (empty) empty.remove();
+
+    const item = document.createElement('li');
+    item.className = event.state;
+    item.textContent = formatEvent(event);
+    if (prepend) {
+        eventList.prepend(item);
+    } else {
+        eventList.append(item);
+    }
+
+    while (eventList.children.length > maxEvents) {
+        eventList.lastChild.remove();
+    }
+}
+
+// Auto hands the choice to the rules of profiles.json: useless without any
+function updateAutoButton(rules) {
+    autoButton.disabled = rules === 0;
+    autoButton.title = rules === 0 ? 'No switching rules: add some to profiles.json' : '';
+}
+
+// Add buttons for profiles defined in profiles.json and mark the active one
+function updateProfiles(frame) {
+    Object.keys(frame.profiles || {}).forEach(name => {
+        if (profileButtonsContainer.querySelector(`[data-profile="${CSS.escape(name)}"]`)) return;
+        const btn = document.createElement('button');
+        btn.className = 'profile-btn';
+        btn.dataset.profile = name;
+        btn.textContent = name;
+        profileButtonsContainer.append(btn);
+        bindProfileButton(btn);
+    });
+    profileButtons = document.querySelectorAll('.profile-btn');
+
+    const active = frame.auto ? 'Auto' : frame.active;
+    profileButtons.forEach(btn => btn.classList.toggle('active', btn.dataset.profile === active));
+    updateAutoButton(frame.rules);
+}
+
 
 // Listen for data from the main process
 ipcRenderer.on('fan-data', (event, data) => {
     try {
         console.log("Data received:", data);
         updateUI(data);
+
+        // First frame: the backend is up, load what it kept (profiles, events, history)
+        if (!backendReady) {
+            backendReady = true;
+            ipcRenderer.send('request-profiles');
+            ipcRenderer.send('request-events', maxEvents);
+            requestHistory();
+        }
     } catch (error) {
         console.error("Error updating UI:", error);
         statusValue.textContent = "UI Error";
     }
 });
 
+ipcRenderer.on('history-data', (event, frame) => {
+    try {
+        loadHistory(frame);
+    } catch (error) {
+        console.error("Error loading history:", error);
+    }
+});
+
+// Thermal events pushed live (threshold, sustained, fan_stall, dropout)
+ipcRenderer.on('thermal-event', (event, frame) => {
+    addEvent(frame);
+});
+
+// Last events from the log, oldest first
+ipcRenderer.on('event-log', (event, events) => {
+    events.slice(-maxEvents).forEach(frame => addEvent(frame));
+});
+
+ipcRenderer.on('profiles', (event, frame) => {
+    updateProfiles(frame);
+});
+
 // Setup auto-refresh
 function setupAutoRefresh() {
     // Clear any existing interval